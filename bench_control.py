@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Round-trip latency of recorder daemon control calls.
+
+Runs a Daemon in this process on a private control socket and a TCP
+listener, then times ping / status / pause+resume / flush calls over
+one kept-open ControlClient connection: first idle, then while agent
+processes (see bench_listener.py) stream events at the listener.
+
+    python bench_control.py --calls 500 --agents 4 --events 4000000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from bench_listener import agent
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "p50_us": round(pick(0.50) * 1e6, 1),
+        "p99_us": round(pick(0.99) * 1e6, 1),
+        "max_us": round(samples[-1] * 1e6, 1),
+    }
+
+
+def time_calls(client, calls):
+    """
+    RTT of each kind of control call, ``calls`` times each; the kinds
+    take turns so they all see the same load.
+    """
+    def pause_resume():
+        client.call("pause")
+        client.call("resume")
+
+    # A flush answers with a handle once the window is frozen; the
+    # write itself runs on the engine's flush thread
+    handles = []
+    kinds = {
+        "ping": lambda: client.call("ping"),
+        "status": lambda: client.call("status"),
+        "pause_resume": pause_resume,
+        "flush": lambda: handles.append(client.call("flush", reason="bench", last=0.01)),
+    }
+    samples = {name: [] for name in kinds}
+    for _ in range(calls):
+        for name, fn in kinds.items():
+            t0 = time.perf_counter()
+            fn()
+            samples[name].append(time.perf_counter() - t0)
+
+    for h in handles:
+        client.call("result", id=h["id"])
+        os.unlink(h["path"])
+    return {name: percentiles(s) for name, s in samples.items()}
+
+
+def run(calls, agents, events):
+    from ttfr_cli.daemon import ControlClient, Daemon
+    from ttfr_cli.engine import TTFR_Engine
+
+    tmp = tempfile.mkdtemp()
+    control = os.path.join(tmp, "control.sock")
+    daemon = Daemon(control, ["tcp:127.0.0.1:0"], engine=TTFR_Engine(buffer_mb=512))
+
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda: asyncio.run(daemon.serve(ready)), daemon=True)
+    thread.start()
+    ready.wait()
+    addr = daemon.listener.addresses[0]
+
+    import ttfr_cli.trigger as trigger
+    trigger.SNAP_DIR = tmp      # keep the benchmark's snapshots out of snapshots/
+
+    result = {"calls": calls, "agents": agents}
+    with ControlClient(control) as client:
+        result["idle"] = time_calls(client, calls)
+
+        per_agent = events // agents
+        procs = [
+            multiprocessing.Process(target=agent, args=("tcp", addr, i, per_agent, "line"))
+            for i in range(agents)
+        ]
+        for p in procs:
+            p.start()
+        # Let the agents build their payloads and start sending
+        start = client.call("status")["received"]
+        while client.call("status")["received"] == start:
+            time.sleep(0.01)
+        result["under_load"] = time_calls(client, calls)
+        received = client.call("status")["received"]
+        for p in procs:
+            p.join()
+
+        # All events sent means the load ended before the calls did
+        result["events_during_calls"] = received - start
+        client.call("stop")
+    thread.join()
+    return result
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--calls", type=int, default=500, help="calls of each kind per phase")
+    p.add_argument("--agents", type=int, default=4)
+    p.add_argument("--events", type=int, default=4_000_000, help="total across agents")
+    args = p.parse_args()
+    print(json.dumps(run(args.calls, args.agents, args.events), indent=4))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Load generator for the `ttfr start` network listener.
+
+Starts a Listener in this process (or targets a running one with
+--target) and has N agent processes blast newline- or length-framed
+events at it over UDP, TCP or a Unix socket, then reports the ingest
+rate, drops and backpressure pauses.
+
+    python bench_listener.py --transport tcp --agents 16 --events 2000000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import tempfile
+import time
+
+WRITE_BYTES = 64 * 1024     # stream agents send this much per call
+DATAGRAM_BYTES = 8 * 1024   # UDP agents pack events up to this size
+
+
+def frame(events, framing):
+    if framing == "line":
+        return [e + b"\n" for e in events]
+    return [struct.pack(">I", len(e)) + e for e in events]
+
+
+def chunks(framed, limit):
+    out, size = [], 0
+    for f in framed:
+        if size + len(f) > limit and out:
+            yield b"".join(out)
+            out, size = [], 0
+        out.append(f)
+        size += len(f)
+    if out:
+        yield b"".join(out)
+
+
+def agent(kind, addr, agent_id, n, framing):
+    events = [
+        b"<134>host=agent%d pid=%d proc=svchost.exe cmd=heartbeat seq=%d" % (agent_id, 4000 + i % 64, i)
+        for i in range(n)
+    ]
+    framed = frame(events, framing)
+    if kind == "udp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for dgram in chunks(framed, DATAGRAM_BYTES):
+            sock.sendto(dgram, addr)
+    else:
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.connect(addr)
+        for data in chunks(framed, WRITE_BYTES):
+            sock.sendall(data)
+    sock.close()
+
+
+def run(kind, agents, events, framing, target=None):
+    listener = None
+    if target is None:
+        from ttfr_cli.engine import TTFR_Engine
+        from ttfr_cli.listener import Listener
+
+        if kind == "unix":
+            spec = "unix:" + os.path.join(tempfile.mkdtemp(), "ttfr.sock")
+        else:
+            spec = f"{kind}:127.0.0.1:0"
+        listener = Listener([spec], TTFR_Engine(buffer_mb=512), framing=framing).start()
+        addr = listener.addresses[0]
+    else:
+        from ttfr_cli.listener import parse_listen
+        kind, addr = parse_listen(target)
+
+    per_agent = events // agents
+    procs = [
+        multiprocessing.Process(target=agent, args=(kind, addr, i, per_agent, framing))
+        for i in range(agents)
+    ]
+    t0 = time.time()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    sent = time.time() - t0
+
+    result = {
+        "transport": kind,
+        "framing": framing,
+        "agents": agents,
+        "events_sent": per_agent * agents,
+        "send_seconds": round(sent, 3),
+    }
+    if listener is None:
+        return result
+
+    # Wait until everything is accounted for, or nothing moves for 1s
+    # (UDP datagrams the kernel dropped never arrive)
+    stats = listener.stats
+    total = per_agent * agents
+    accounted = lambda: stats.ingested + stats.dropped + stats.rejected
+    last, idle = -1, time.time()
+    while accounted() < total:
+        if accounted() != last:
+            last, idle = accounted(), time.time()
+        elif time.time() - idle > 1.0:
+            break
+        time.sleep(0.01)
+    done = (idle if accounted() < total else time.time()) - t0
+    listener.stop()
+
+    result.update(stats.as_dict())
+    result["seconds"] = round(done, 3)
+    result["events_per_sec"] = int(stats.ingested / done) if done else 0
+    result["lost_in_kernel"] = total - stats.received
+    return result
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--transport", choices=["udp", "tcp", "unix", "all"], default="all")
+    p.add_argument("--agents", type=int, default=16)
+    p.add_argument("--events", type=int, default=1_000_000, help="total across agents")
+    p.add_argument("--framing", choices=["line", "length"], default="line")
+    p.add_argument("--target", default=None, help="send to a running listener (udp:HOST:PORT, ...)")
+    args = p.parse_args()
+
+    kinds = ["udp", "tcp", "unix"] if args.transport == "all" else [args.transport]
+    for kind in kinds:
+        print(json.dumps(run(kind, args.agents, args.events, args.framing, args.target), indent=4))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Throughput of the shared-memory ingest ring.
+
+N producer processes each attach a SharedProducer to one SharedRing
+and push events in batches; this process drains the ring into a
+TTFR_Engine, as the recorder daemon does. Reports the end-to-end rate
+(first push to last event in the engine) and each producer's push rate.
+
+    python bench_shared.py --producers 1 2 4 8 --events 2000000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+
+def producer(path, agent_id, n, batch, start, rates):
+    from ttfr_fastlog import SharedProducer
+
+    events = [
+        b"<134>host=agent%d pid=%d proc=svchost.exe cmd=heartbeat seq=%d" % (agent_id, 4000 + i % 64, i)
+        for i in range(n)
+    ]
+    # Wait for room rather than drop: the benchmark measures the drain rate
+    with SharedProducer(path, timeout=60.0) as p:
+        start.wait()
+        t0 = time.perf_counter()
+        for i in range(0, n, batch):
+            p.push_many(events[i : i + batch])
+        rates[agent_id] = n / (time.perf_counter() - t0)
+
+
+def run(producers, events, batch=256, lane_mb=8):
+    from ttfr_cli.engine import TTFR_Engine
+    from ttfr_fastlog import SharedRing
+
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    path = os.path.join(shm, f"ttfr-bench-{os.getpid()}")
+    ring = SharedRing(path, lanes=producers, lane_bytes=lane_mb << 20)
+    engine = TTFR_Engine(buffer_mb=512)
+
+    per = events // producers
+    start = multiprocessing.Event()
+    rates = multiprocessing.Manager().dict()
+    procs = [
+        multiprocessing.Process(target=producer, args=(path, i, per, batch, start, rates))
+        for i in range(producers)
+    ]
+    for p in procs:
+        p.start()
+    while ring.stats()["producers"] < producers:
+        time.sleep(0.01)
+
+    total = per * producers
+    moved = 0
+    t0 = time.perf_counter()
+    start.set()
+    while moved < total:
+        n = ring.pump(engine)
+        moved += n
+        if not n:
+            time.sleep(0.0001)
+    dt = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+
+    stats = ring.stats()
+    ring.close(unlink=True)
+    return {
+        "producers": producers,
+        "events": total,
+        "batch": batch,
+        "seconds": round(dt, 3),
+        "events_per_sec": int(total / dt),
+        "push_events_per_sec": [int(rates[i]) for i in range(producers)],
+        "dropped": stats["dropped"],
+        "in_engine": len(engine.buffer),
+    }
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--producers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--events", type=int, default=2_000_000, help="total across producers")
+    p.add_argument("--batch", type=int, default=256, help="events per push_many")
+    args = p.parse_args()
+    for n in args.producers:
+        print(json.dumps(run(n, args.events, args.batch), indent=4))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the `ttfr` CLI.
+
+Runs `python -X importtime -m ttfr_cli.ttfr ARGS` for `--help` and
+`status` (no recorder needs to be running) several times each and
+reports the median wall time and the median time spent importing, plus
+the modules that cost the most. Exits with status 1 when a command's
+import time is over the budget, so it can gate CI:
+
+    python bench_startup.py --runs 20 --budget-ms 60
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = {"help": ["--help"], "status": ["status"]}
+
+
+def run_once(args):
+    """(wall seconds, {module: (self_us, cumulative_us)}) of one run."""
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "ttfr_cli.ttfr", *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env, check=True,
+    )
+    wall = time.perf_counter() - t0
+
+    modules = {}
+    for line in proc.stderr.decode().splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown by indentation; only top-level entries add up
+        modules[name.strip()] = (int(self_us), int(cum_us), not name[1:].startswith(" "))
+    return wall, modules
+
+
+def measure(args, runs):
+    walls, imports, selfs = [], [], {}
+    run_once(args)      # warm the .pyc cache
+    for _ in range(runs):
+        wall, modules = run_once(args)
+        walls.append(wall)
+        imports.append(sum(cum for _, cum, top in modules.values() if top))
+        for name, (self_us, _, _) in modules.items():
+            selfs.setdefault(name, []).append(self_us)
+    heaviest = sorted(selfs, key=lambda n: statistics.median(selfs[n]), reverse=True)[:5]
+    return {
+        "wall_ms": round(statistics.median(walls) * 1e3, 1),
+        "imports_ms": round(statistics.median(imports) / 1e3, 1),
+        "modules": len(selfs),
+        "heaviest_ms": {n: round(statistics.median(selfs[n]) / 1e3, 2) for n in heaviest},
+    }
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--budget-ms", type=float, default=60.0,
+                   help="max median import time per command")
+    args = p.parse_args()
+
+    result = {name: measure(argv, args.runs) for name, argv in COMMANDS.items()}
+    over = [name for name, r in result.items() if r["imports_ms"] > args.budget_ms]
+    result["budget_ms"] = args.budget_ms
+    result["over_budget"] = over
+    print(json.dumps(result, indent=4))
+    sys.exit(1 if over else 0)
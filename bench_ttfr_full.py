@@ -7,7 +7,7 @@ import lzma
 import zlib
 from statistics import mean
 
-from ttfr_fastlog import compress_json, decompress_json
+from ttfr_fastlog import compress_json, decompress_json, compress_columns, decompress_columns
 from ttfr_fastlog import RingBuffer   # if not exposed yet, can comment out
 
 
@@ -47,6 +47,18 @@ def bench_compression(events):
         "latency": t1 - t0,
     }
 
+    # Fastlog, columnar block (what snapshots store)
+    records = [(e["ts"], e["msg"].encode()) for e in events]
+    t0 = time.time()
+    cblob = compress_columns(records)
+    t1 = time.time()
+
+    results["fastlog_columnar"] = {
+        "size": len(cblob),
+        "ratio": len(cblob) / len(input_json),
+        "latency": t1 - t0,
+    }
+
     # gzip
     t0 = time.time()
     gz = gzip.compress(input_json)
@@ -83,11 +95,11 @@ def bench_compression(events):
 # ------------------------------------------------------------
 # 2. Decode Benchmark
 # ------------------------------------------------------------
-def bench_decode(blob, trials=20):
+def bench_decode(blob, trials=20, decode=decompress_json):
     times = []
     for _ in range(trials):
         t0 = time.time()
-        _ = decompress_json(blob)
+        _ = decode(blob)
         t1 = time.time()
         times.append(t1 - t0)
 
@@ -183,6 +195,42 @@ def bench_mitre_replay():
     }
 
 
+# ------------------------------------------------------------
+# 6. MITRE matcher throughput (batched, compiled ruleset)
+# ------------------------------------------------------------
+def bench_mitre_matcher(n_events=1_000_000, n_techniques=300):
+    from ttfr_cli.triggers import MitreMatcher
+
+    rules = {
+        f"T{1000 + i}": [f"evil_tool_{i}.exe", f"--payload-{i}", f"c2-{i}.example.com"]
+        for i in range(n_techniques)
+    }
+    t0 = time.time()
+    matcher = MitreMatcher(rules)
+    t1 = time.time()
+
+    events = [
+        b'{"pid":%d,"cmd":"C:\\Windows\\System32\\svchost.exe -k netsvcs","host":"ws-%d"}'
+        % (i, i % 500)
+        for i in range(n_events)
+    ]
+    for i in range(0, n_events, 1000):
+        events[i] = b"run evil_tool_%d.exe now" % (i % n_techniques)
+
+    t2 = time.time()
+    hits = matcher.match(events)
+    t3 = time.time()
+
+    return {
+        "events": n_events,
+        "techniques": n_techniques,
+        "compile_s": t1 - t0,
+        "match_s": t3 - t2,
+        "events_per_sec": n_events / (t3 - t2),
+        "hits": sum(len(v) for v in hits.values()),
+    }
+
+
 # ------------------------------------------------------------
 # MAIN
 # ------------------------------------------------------------
@@ -202,7 +250,16 @@ if __name__ == "__main__":
     banner("2. Decode Benchmark")
     blob = compress_json(test_events)
     dec_results = bench_decode(blob)
-    print(dec_results)
+    print("json:    ", dec_results)
+    cblob = compress_columns([(e["ts"], e["msg"].encode()) for e in test_events])
+    dec_columnar = bench_decode(cblob, decode=decompress_columns)
+    print("columnar:", dec_columnar)
+    try:
+        from ttfr_fastlog.arrays import columns_arrays
+        dec_arrays = bench_decode(cblob, decode=columns_arrays)
+    except RuntimeError:
+        dec_arrays = None   # numpy not installed
+    print("arrays:  ", dec_arrays if dec_arrays else "Skipped")
 
     banner("3. Ingest Throughput Benchmark")
     ingest = bench_ingest()
@@ -216,12 +273,19 @@ if __name__ == "__main__":
     mitre = bench_mitre_replay()
     print(mitre)
 
+    banner("6. MITRE Matcher Benchmark")
+    matcher = bench_mitre_matcher()
+    print(matcher)
+
     banner("SUMMARY")
     print(json.dumps({
         "compression": comp_results,
         "decode": dec_results,
+        "decode_columnar": dec_columnar,
+        "decode_arrays": dec_arrays,
         "ingest": ingest,
         "snapshot": snap,
-        "mitre": mitre
+        "mitre": mitre,
+        "matcher": matcher
     }, indent=4))
 
@@ -1,6 +1,7 @@
-import json, time, gzip, zlib, lzma
+import json, os, time, tempfile, gzip, zlib, lzma
+import lz4.block
 import lz4.frame
-from fastlog_py import compress_json, decompress_json
+from fastlog_py import Codec, compress_json, decompress_json, compress_columns, decompress_columns
 
 # ======================================================
 # SECTION 1 — FASTLOG vs gzip/zlib/lzma/lz4 comparisons
@@ -30,6 +31,19 @@ def bench_compression():
         "latency_ms": round(t_fast * 1000, 3)
     }
 
+    # --- FASTLOG codecs ---------------------------------
+    dict_codec = Codec.train([l.encode() for l in lines[:5000]], level=3)
+    for codec in [Codec("lz4:8"), Codec("lz4hc"), Codec("zstd:3"), Codec("zstd:19"), dict_codec]:
+        t0 = time.time()
+        c = compress_json(json_obj, codec)
+        t = (time.time() - t0)
+
+        results[f"fastlog_{codec.name}:{codec.level}"] = {
+            "compressed": len(c),
+            "ratio": round(len(c) / len(raw_text), 4),
+            "latency_ms": round(t * 1000, 3)
+        }
+
     # --- gzip -------------------------------------------
     t0 = time.time()
     c_gz = gzip.compress(raw_text)
@@ -99,13 +113,38 @@ def bench_fastlog_scaling():
         restored = decompress_json(blob)
         dt = time.time() - t1
 
+        # Pure-Python fallback path (json module + lz4.block) for reference
+        t2 = time.time()
+        py_blob = lz4.block.compress(json.dumps(events).encode())
+        py_ct = time.time() - t2
+
+        t3 = time.time()
+        json.loads(lz4.block.decompress(py_blob))
+        py_dt = time.time() - t3
+
+        # Columnar block of the same events
+        records = [(e["ts"], e["msg"].encode()) for e in events]
+        t4 = time.time()
+        col_blob = compress_columns(records)
+        col_ct = time.time() - t4
+
+        t5 = time.time()
+        col_restored = decompress_columns(col_blob)
+        col_dt = time.time() - t5
+
         summary[n] = {
             "raw": len(raw),
             "compressed": len(blob),
             "ratio": round(len(blob)/len(raw), 4),
             "compress_ms": round(ct * 1000, 3),
             "decompress_ms": round(dt * 1000, 3),
-            "ok": restored == events
+            "fallback_compress_ms": round(py_ct * 1000, 3),
+            "fallback_decompress_ms": round(py_dt * 1000, 3),
+            "columnar_compressed": len(col_blob),
+            "columnar_ratio": round(len(col_blob)/len(raw), 4),
+            "columnar_compress_ms": round(col_ct * 1000, 3),
+            "columnar_decompress_ms": round(col_dt * 1000, 3),
+            "ok": restored == events and col_restored == events
         }
 
     return summary
@@ -156,6 +195,181 @@ def bench_attack():
     }
 
 
+# ======================================================
+# SECTION 5 — Parallel snapshot flush scaling
+# ======================================================
+
+def bench_flush_scaling(n_events=1_000_000):
+    print("\n[5] Running parallel flush scaling…")
+    import ttfr_fastlog
+
+    records = [
+        (1_700_000_000_000_000_000 + i * 1000, b"pid=%d user=svc cmd=heartbeat seq=%d" % (i % 4096, i))
+        for i in range(n_events)
+    ]
+    raw_mb = sum(len(r) for _, r in records) / (1024 * 1024)
+
+    counts = [0]
+    w = 1
+    while w <= (os.cpu_count() or 1):
+        counts.append(w)
+        w *= 2
+
+    summary = {"backend": ttfr_fastlog.FASTLOG_BACKEND, "events": n_events, "raw_mb": round(raw_mb, 2)}
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "flush.ttfr")
+        base = None
+        for workers in counts:
+            t0 = time.time()
+            ttfr_fastlog.write_snapshot(path, records, workers=workers)
+            dt = time.time() - t0
+            base = base or dt
+            summary[f"workers_{workers}"] = {
+                "seconds": round(dt, 4),
+                "mb_s": round(raw_mb / dt, 2),
+                "speedup": round(base / dt, 2),
+                "snapshot_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+            }
+
+    return summary
+
+
+# ======================================================
+# SECTION 6 — Multi-producer ingest
+# ======================================================
+
+def bench_producers(n_events=200_000, threads=(1, 2, 4, 8, 16), stage_events=256):
+    print("\n[6] Running multi-producer ingest…")
+    import threading
+    import ttfr_fastlog
+    from ttfr_cli.engine import TTFR_Engine
+
+    rings = {"python": ttfr_fastlog.PyRingBuffer}
+    if ttfr_fastlog.FASTLOG_BACKEND == "rust":
+        rings["rust"] = ttfr_fastlog.RingBuffer
+
+    summary = {}
+    for backend, ring in rings.items():
+        for mode, stage in (("locked", 0), ("staged", stage_events)):
+            for n in threads:
+                engine = TTFR_Engine(stage_events=stage, ring=ring(256 * 1024 * 1024))
+                per_thread = n_events // n
+                start = threading.Barrier(n + 1)
+
+                def producer(tid):
+                    msgs = [b"host=%d pid=%d cmd=heartbeat" % (tid, i) for i in range(per_thread)]
+                    start.wait()
+                    for m in msgs:
+                        engine.ingest(m)
+
+                workers = [threading.Thread(target=producer, args=(t,)) for t in range(n)]
+                for w in workers:
+                    w.start()
+                start.wait()
+                t0 = time.time()
+                for w in workers:
+                    w.join()
+                engine.flush_staged()
+                dt = time.time() - t0
+
+                stamps = [ts for ts, _ in engine.buffer.records()]
+                summary[f"{backend}_{mode}_{n}"] = {
+                    "events": len(stamps),
+                    "seconds": round(dt, 4),
+                    "events_per_sec": int(len(stamps) / dt),
+                    "ordered": all(a <= b for a, b in zip(stamps, stamps[1:])),
+                }
+
+    return summary
+
+
+# ======================================================
+# SECTION 7 — Crash-durable ring
+# ======================================================
+
+def bench_durable(n_events=500_000, capacity_mb=64, batch=256, sync_intervals=(None, 1.0, 0.01)):
+    print("\n[7] Running durable ring writes…")
+    import ttfr_fastlog
+
+    msgs = [b"host=web01 pid=%d user=svc cmd=heartbeat seq=%d" % (i % 64, i) for i in range(n_events)]
+    batches = [msgs[i : i + batch] for i in range(0, n_events, batch)]
+    tmp = tempfile.mkdtemp()
+
+    def rate(ring):
+        t0 = time.perf_counter()
+        for m in msgs[: n_events // 5]:
+            ring.ingest(m)
+        single = (n_events // 5) / (time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        for b in batches:
+            ring.push_many(b)
+        return {
+            "ingest_events_per_sec": int(single),
+            "push_many_events_per_sec": int(n_events / (time.perf_counter() - t0)),
+        }
+
+    summary = {"memory": rate(ttfr_fastlog.PyRingBuffer(capacity_mb << 20))}
+    for interval in sync_intervals:
+        path = os.path.join(tmp, f"ring-{interval}")
+        ring = ttfr_fastlog.DurableRingBuffer(path, capacity_mb << 20, sync_interval=interval)
+        summary[f"durable_sync_{interval}"] = rate(ring)
+        ring.close()
+
+        t0 = time.perf_counter()
+        ring = ttfr_fastlog.DurableRingBuffer(path)
+        summary[f"durable_sync_{interval}"]["recover_seconds"] = round(time.perf_counter() - t0, 3)
+        summary[f"durable_sync_{interval}"]["recovered_events"] = len(ring)
+        ring.close()
+        os.unlink(path)
+
+    return summary
+
+
+# ======================================================
+# SECTION 8 — Ring allocation (lazy / hugepages / prefault)
+# ======================================================
+
+def bench_allocation(capacity_mb=512, n_events=1_000_000, batch=4096):
+    print("\n[8] Running ring allocation modes…")
+    import gc
+    import ttfr_fastlog
+
+    msgs = [b"cpu=3%% net=14kb msg=heartbeat seq=%06d" % i for i in range(batch)]
+    modes = {
+        "bytearray": lambda n: ttfr_fastlog.PyRingBuffer(n, buffer=bytearray(n)),
+        "lazy": lambda n: ttfr_fastlog.PyRingBuffer(n),
+        "hugepages": lambda n: ttfr_fastlog.PyRingBuffer(n, hugepages=True),
+        "prefault": lambda n: ttfr_fastlog.PyRingBuffer(n, prefault=True),
+        "hugepages_prefault": lambda n: ttfr_fastlog.PyRingBuffer(n, hugepages=True, prefault=True),
+    }
+
+    summary = {}
+    for name, make in modes.items():
+        gc.collect()
+        before = ttfr_fastlog.memory_report()
+        t0 = time.perf_counter()
+        ring = make(capacity_mb << 20)
+        init = time.perf_counter() - t0
+        built = ttfr_fastlog.memory_report()
+
+        t0 = time.perf_counter()
+        for _ in range(n_events // batch):
+            ring.push_many(msgs)
+        fill = time.perf_counter() - t0
+        after = ttfr_fastlog.memory_report()
+
+        summary[name] = {
+            "init_ms": round(init * 1e3, 2),
+            "rss_after_init_mb": (built["rss_bytes"] - before["rss_bytes"]) >> 20,
+            "push_many_events_per_sec": int(n_events / fill),
+            "rss_after_push_mb": (after["rss_bytes"] - before["rss_bytes"]) >> 20,
+            "minor_faults": after["minor_faults"] - before["minor_faults"],
+            "hugepage_mb": after["hugepage_bytes"] >> 20 if after["hugepage_bytes"] is not None else None,
+        }
+        del ring
+    return summary
+
+
 # ======================================================
 # MAIN
 # ======================================================
@@ -177,5 +391,17 @@ if __name__ == "__main__":
     print("\n### MITRE Snapshot ###")
     print(json.dumps(bench_attack(), indent=4))
 
+    print("\n### Parallel Flush ###")
+    print(json.dumps(bench_flush_scaling(), indent=4))
+
+    print("\n### Multi-Producer Ingest ###")
+    print(json.dumps(bench_producers(), indent=4))
+
+    print("\n### Durable Ring ###")
+    print(json.dumps(bench_durable(), indent=4))
+
+    print("\n### Ring Allocation ###")
+    print(json.dumps(bench_allocation(), indent=4))
+
     print("\n=== Benchmark Complete ===")
 
@@ -0,0 +1 @@
+# Lets pytest import ttfr_fastlog / ttfr_cli from a source checkout.
@@ -0,0 +1,159 @@
+use std::fmt;
+use std::io::Read;
+use std::str::FromStr;
+
+use lz4::block::{compress, decompress, CompressionMode};
+
+/// Block codecs FastLog can compress with. The numeric id is what
+/// snapshots record in their header; the two LZ4 variants share one
+/// block format, so either decodes the other.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub enum Codec {
+    /// LZ4 fast mode; higher acceleration trades ratio for speed
+    Lz4 { acceleration: i32 },
+    /// LZ4 high-compression mode, level 1-12
+    Lz4Hc { level: i32 },
+    /// zstd frame, level 1-22
+    Zstd { level: i32 },
+    /// zstd frame compressed against a shared dictionary
+    ZstdDict { level: i32, dictionary: Vec<u8> },
+}
+
+pub const CODEC_LZ4: u8 = 0;
+pub const CODEC_LZ4HC: u8 = 1;
+pub const CODEC_ZSTD: u8 = 2;
+pub const CODEC_ZSTD_DICT: u8 = 3;
+
+impl Default for Codec {
+    fn default() -> Self {
+        Codec::Lz4 { acceleration: 1 }
+    }
+}
+
+impl Codec {
+    /// Codec from its name (`lz4`, `lz4hc`, `zstd`, `zstd-dict`) and
+    /// level (acceleration for `lz4`); `None` picks the default level
+    pub fn new(name: &str, level: Option<i32>, dictionary: Option<Vec<u8>>) -> Result<Self, String> {
+        if dictionary.is_some() && name != "zstd-dict" {
+            return Err(format!("codec '{name}' takes no dictionary"));
+        }
+        Ok(match name {
+            "lz4" => Codec::Lz4 { acceleration: level.unwrap_or(1).max(1) },
+            "lz4hc" => Codec::Lz4Hc { level: level.unwrap_or(9).clamp(1, 12) },
+            "zstd" => Codec::Zstd { level: level.unwrap_or(3) },
+            "zstd-dict" => Codec::ZstdDict {
+                level: level.unwrap_or(3),
+                dictionary: dictionary.ok_or("zstd-dict needs a dictionary")?,
+            },
+            _ => return Err(format!("unknown codec '{name}' (lz4, lz4hc, zstd, zstd-dict)")),
+        })
+    }
+
+    /// Codec recorded as `id`/`level` in a snapshot header
+    pub fn from_id(id: u8, level: i32, dictionary: Option<Vec<u8>>) -> Result<Self, String> {
+        let name = match id {
+            CODEC_LZ4 => "lz4",
+            CODEC_LZ4HC => "lz4hc",
+            CODEC_ZSTD => "zstd",
+            CODEC_ZSTD_DICT => "zstd-dict",
+            _ => return Err(format!("unknown codec id {id}")),
+        };
+        Codec::new(name, Some(level), dictionary)
+    }
+
+    /// zstd-dict codec with a dictionary trained on `samples`
+    /// (e.g. recent events), at most `max_size` bytes
+    pub fn train<S: AsRef<[u8]>>(samples: &[S], max_size: usize, level: i32) -> Result<Self, String> {
+        let dictionary = zstd::dict::from_samples(samples, max_size)
+            .map_err(|e| format!("zstd dictionary training failed: {e}"))?;
+        Ok(Codec::ZstdDict { level, dictionary })
+    }
+
+    pub fn id(&self) -> u8 {
+        match self {
+            Codec::Lz4 { .. } => CODEC_LZ4,
+            Codec::Lz4Hc { .. } => CODEC_LZ4HC,
+            Codec::Zstd { .. } => CODEC_ZSTD,
+            Codec::ZstdDict { .. } => CODEC_ZSTD_DICT,
+        }
+    }
+
+    pub fn name(&self) -> &'static str {
+        match self {
+            Codec::Lz4 { .. } => "lz4",
+            Codec::Lz4Hc { .. } => "lz4hc",
+            Codec::Zstd { .. } => "zstd",
+            Codec::ZstdDict { .. } => "zstd-dict",
+        }
+    }
+
+    /// Compression level (acceleration for `lz4`)
+    pub fn level(&self) -> i32 {
+        match *self {
+            Codec::Lz4 { acceleration } => acceleration,
+            Codec::Lz4Hc { level } | Codec::Zstd { level } | Codec::ZstdDict { level, .. } => level,
+        }
+    }
+
+    pub fn dictionary(&self) -> Option<&[u8]> {
+        match self {
+            Codec::ZstdDict { dictionary, .. } => Some(dictionary),
+            _ => None,
+        }
+    }
+
+    pub fn compress(&self, data: &[u8]) -> Result<Vec<u8>, String> {
+        match self {
+            Codec::Lz4 { acceleration } => compress(data, Some(CompressionMode::FAST(*acceleration)), true)
+                .map_err(|e| format!("LZ4 compress error: {e}")),
+            Codec::Lz4Hc { level } => compress(data, Some(CompressionMode::HIGHCOMPRESSION(*level)), true)
+                .map_err(|e| format!("LZ4 compress error: {e}")),
+            Codec::Zstd { level } => {
+                zstd::bulk::compress(data, *level).map_err(|e| format!("zstd compress error: {e}"))
+            }
+            Codec::ZstdDict { level, dictionary } => zstd::bulk::Compressor::with_dictionary(*level, dictionary)
+                .and_then(|mut c| c.compress(data))
+                .map_err(|e| format!("zstd compress error: {e}")),
+        }
+    }
+
+    pub fn decompress(&self, data: &[u8]) -> Result<Vec<u8>, String> {
+        match self {
+            Codec::Lz4 { .. } | Codec::Lz4Hc { .. } => {
+                decompress(data, None).map_err(|e| format!("LZ4 decompress error: {e}"))
+            }
+            Codec::Zstd { .. } => {
+                zstd::stream::decode_all(data).map_err(|e| format!("zstd decompress error: {e}"))
+            }
+            Codec::ZstdDict { dictionary, .. } => {
+                let mut out = Vec::new();
+                zstd::stream::read::Decoder::with_dictionary(data, dictionary)
+                    .and_then(|mut d| d.read_to_end(&mut out))
+                    .map_err(|e| format!("zstd decompress error: {e}"))?;
+                Ok(out)
+            }
+        }
+    }
+}
+
+/// `name` or `name:level`, e.g. `lz4:8` or `zstd:19`
+impl FromStr for Codec {
+    type Err = String;
+
+    fn from_str(spec: &str) -> Result<Self, String> {
+        let (name, level) = match spec.split_once(':') {
+            Some((name, level)) => {
+                let level = level.parse().map_err(|_| format!("invalid codec level in '{spec}'"))?;
+                (name, Some(level))
+            }
+            None => (spec, None),
+        };
+        Codec::new(name, level, None)
+    }
+}
+
+impl fmt::Display for Codec {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "{}:{}", self.name(), self.level())
+    }
+}
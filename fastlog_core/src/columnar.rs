@@ -0,0 +1,209 @@
+//! Columnar event blocks.
+//!
+//! A block of `(ts, msg)` events is split into columns that are each
+//! compressed on their own:
+//!
+//! ```text
+//! u32 events | u32 distinct messages
+//! ts     zigzag varint deltas (the first from 0)
+//! lens   varint byte length of each distinct message
+//! data   the distinct messages back to back, in first-seen order
+//! ids    varint message id per event; empty when every message is distinct
+//! ```
+//!
+//! each section stored as `u32 size | codec blob`. Timestamps shrink to
+//! a byte or two and a repeated message is stored once.
+
+use std::collections::HashMap;
+
+use crate::codec::Codec;
+
+/// Decoded block: message `i` is `data[offsets[i]..offsets[i + 1]]`
+pub struct Columns {
+    pub ts: Vec<u64>,
+    pub offsets: Vec<usize>,
+    pub data: Vec<u8>,
+    pub ids: Vec<u32>,
+}
+
+impl Columns {
+    pub fn len(&self) -> usize {
+        self.ts.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.ts.is_empty()
+    }
+
+    /// Number of distinct messages
+    pub fn distinct(&self) -> usize {
+        self.offsets.len() - 1
+    }
+
+    pub fn message(&self, id: usize) -> &[u8] {
+        &self.data[self.offsets[id]..self.offsets[id + 1]]
+    }
+
+    /// `(ts, msg)` per event, in block order
+    pub fn events(&self) -> impl Iterator<Item = (u64, &[u8])> + '_ {
+        self.ts.iter().enumerate().map(move |(i, &ts)| {
+            let id = if self.ids.is_empty() { i } else { self.ids[i] as usize };
+            (ts, self.message(id))
+        })
+    }
+}
+
+fn put_varint(out: &mut Vec<u8>, mut v: u64) {
+    while v >= 0x80 {
+        out.push((v as u8) | 0x80);
+        v >>= 7;
+    }
+    out.push(v as u8);
+}
+
+fn get_varint(data: &[u8], pos: &mut usize) -> Result<u64, String> {
+    let mut v = 0u64;
+    let mut shift = 0;
+    loop {
+        let &b = data.get(*pos).ok_or("truncated varint")?;
+        *pos += 1;
+        if shift > 63 {
+            return Err("varint overflow".into());
+        }
+        v |= ((b & 0x7F) as u64) << shift;
+        if b < 0x80 {
+            return Ok(v);
+        }
+        shift += 7;
+    }
+}
+
+fn put_section(out: &mut Vec<u8>, raw: &[u8], codec: &Codec) -> Result<(), String> {
+    if raw.is_empty() {
+        out.extend_from_slice(&0u32.to_le_bytes());
+        return Ok(());
+    }
+    let blob = codec.compress(raw)?;
+    out.extend_from_slice(&(blob.len() as u32).to_le_bytes());
+    out.extend_from_slice(&blob);
+    Ok(())
+}
+
+fn get_u32(data: &[u8], pos: &mut usize) -> Result<u32, String> {
+    let bytes = data.get(*pos..*pos + 4).ok_or("truncated columnar block")?;
+    *pos += 4;
+    Ok(u32::from_le_bytes(bytes.try_into().unwrap()))
+}
+
+fn get_section(data: &[u8], pos: &mut usize, codec: &Codec) -> Result<Vec<u8>, String> {
+    let n = get_u32(data, pos)? as usize;
+    if n == 0 {
+        return Ok(Vec::new());
+    }
+    let blob = data.get(*pos..*pos + n).ok_or("truncated columnar block")?;
+    *pos += n;
+    codec.decompress(blob)
+}
+
+/// Encode and compress one block of `(ts, msg)` events
+pub fn encode_columns<'a, I>(events: I, codec: &Codec) -> Result<Vec<u8>, String>
+where
+    I: IntoIterator<Item = (u64, &'a [u8])>,
+{
+    let mut ts_col = Vec::new();
+    let mut lens = Vec::new();
+    let mut data = Vec::new();
+    let mut ids = Vec::new();
+    let mut seen: HashMap<&'a [u8], u32> = HashMap::new();
+    let mut prev = 0u64;
+    let mut count = 0u32;
+
+    for (ts, msg) in events {
+        let delta = ts.wrapping_sub(prev) as i64;
+        put_varint(&mut ts_col, ((delta << 1) ^ (delta >> 63)) as u64);
+        prev = ts;
+
+        let next = seen.len() as u32;
+        let id = *seen.entry(msg).or_insert_with(|| {
+            put_varint(&mut lens, msg.len() as u64);
+            data.extend_from_slice(msg);
+            next
+        });
+        ids.push(id);
+        count += 1;
+    }
+
+    let distinct = seen.len() as u32;
+    let mut id_col = Vec::new();
+    if distinct < count {
+        for id in ids {
+            put_varint(&mut id_col, id as u64);
+        }
+    }
+
+    let mut out = Vec::with_capacity(8 + data.len() / 2);
+    out.extend_from_slice(&count.to_le_bytes());
+    out.extend_from_slice(&distinct.to_le_bytes());
+    put_section(&mut out, &ts_col, codec)?;
+    put_section(&mut out, &lens, codec)?;
+    put_section(&mut out, &data, codec)?;
+    put_section(&mut out, &id_col, codec)?;
+    Ok(out)
+}
+
+/// Inverse of encode_columns
+pub fn decode_columns(block: &[u8], codec: &Codec) -> Result<Columns, String> {
+    let mut pos = 0;
+    let count = get_u32(block, &mut pos)? as usize;
+    let distinct = get_u32(block, &mut pos)? as usize;
+    let ts_col = get_section(block, &mut pos, codec)?;
+    let lens = get_section(block, &mut pos, codec)?;
+    let data = get_section(block, &mut pos, codec)?;
+    let id_col = get_section(block, &mut pos, codec)?;
+    if distinct > count {
+        return Err("corrupt columnar block".into());
+    }
+
+    // Every varint is at least a byte: the header's counts can't ask for
+    // more entries than the sections hold, whatever they claim
+    let mut ts = Vec::with_capacity(count.min(ts_col.len()));
+    let (mut at, mut prev) = (0, 0u64);
+    for _ in 0..count {
+        let z = get_varint(&ts_col, &mut at)?;
+        let delta = ((z >> 1) as i64) ^ -((z & 1) as i64);
+        prev = prev.wrapping_add(delta as u64);
+        ts.push(prev);
+    }
+    if at != ts_col.len() {
+        return Err("corrupt columnar block".into());
+    }
+
+    let mut offsets = Vec::with_capacity(distinct.min(lens.len()) + 1);
+    offsets.push(0);
+    let mut at = 0;
+    for _ in 0..distinct {
+        let end = offsets[offsets.len() - 1].saturating_add(get_varint(&lens, &mut at)? as usize);
+        offsets.push(end);
+    }
+    if at != lens.len() || offsets[distinct] != data.len() {
+        return Err("corrupt columnar block".into());
+    }
+
+    let mut ids = Vec::new();
+    if distinct < count {
+        ids.reserve(count.min(id_col.len()));
+        let mut at = 0;
+        for _ in 0..count {
+            let id = get_varint(&id_col, &mut at)?;
+            if id as usize >= distinct {
+                return Err("corrupt columnar block".into());
+            }
+            ids.push(id as u32);
+        }
+        if at != id_col.len() {
+            return Err("corrupt columnar block".into());
+        }
+    }
+
+    Ok(Columns { ts, offsets, data, ids })
+}
@@ -1,5 +1,6 @@
 use serde::{Serialize, Deserialize};
-use lz4::block::{compress, decompress};
+
+use crate::codec::Codec;
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct JsonEvent {
@@ -8,13 +9,21 @@ pub struct JsonEvent {
 }
 
 pub fn fastlog_compress_json(events: &Vec<JsonEvent>) -> Vec<u8> {
-    let encoded = serde_json::to_vec(events).unwrap();
-    compress(&encoded, None, true).unwrap()
+    fastlog_compress_json_with(events, &Codec::default()).unwrap()
 }
 
 pub fn fastlog_decompress_json(data: &[u8]) -> Result<Vec<JsonEvent>, String> {
-    let decompressed = decompress(data, None)
-        .map_err(|e| format!("LZ4 error {}", e))?;
+    fastlog_decompress_json_with(data, &Codec::default())
+}
+
+pub fn fastlog_compress_json_with(events: &[JsonEvent], codec: &Codec) -> Result<Vec<u8>, String> {
+    let encoded = serde_json::to_vec(events)
+        .map_err(|e| format!("JSON error {}", e))?;
+    codec.compress(&encoded)
+}
+
+pub fn fastlog_decompress_json_with(data: &[u8], codec: &Codec) -> Result<Vec<JsonEvent>, String> {
+    let decompressed = codec.decompress(data)?;
     serde_json::from_slice(&decompressed)
         .map_err(|e| format!("JSON error {}", e))
 }
@@ -1,19 +1,24 @@
+mod codec;
+mod columnar;
 mod fastlog;
 mod ring_buffer;
 mod trigger;
 
-use lz4::block::{compress, decompress};
-
-pub use fastlog::{fastlog_compress_json, fastlog_decompress_json, JsonEvent};
-pub use ring_buffer::RingBuffer;
+pub use codec::{Codec, CODEC_LZ4, CODEC_LZ4HC, CODEC_ZSTD, CODEC_ZSTD_DICT};
+pub use columnar::{decode_columns, encode_columns, Columns};
+pub use fastlog::{
+    fastlog_compress_json, fastlog_compress_json_with, fastlog_decompress_json,
+    fastlog_decompress_json_with, JsonEvent,
+};
+pub use ring_buffer::{now_ns, RingBuffer};
 pub use trigger::trigger_flush;
 
 pub fn compress_raw(data: &[u8]) -> Vec<u8> {
-    compress(data, None, true).expect("LZ4 compression failed")
+    Codec::default().compress(data).expect("LZ4 compression failed")
 }
 
 pub fn decompress_raw(data: &[u8]) -> Vec<u8> {
-    decompress(data, None).expect("LZ4 decompress failed")
+    Codec::default().decompress(data).expect("LZ4 decompress failed")
 }
 
 pub fn fastlog_compress(data: &[u8]) -> Vec<u8> {
@@ -1,88 +1,308 @@
+use std::collections::VecDeque;
+
 use serde::{Serialize, Deserialize};
 use chrono::Utc;
 
-/// A ring buffer storing timestamped event blobs (Vec<u8>)
+/// Per-record header in the slab: timestamp (u64 LE, ns) + length (u32 LE)
+pub const RECORD_HEADER: usize = 12;
+
+/// Current wall-clock time in nanoseconds since the Unix epoch
+pub fn now_ns() -> u64 {
+    Utc::now().timestamp_nanos_opt().unwrap_or(0).max(0) as u64
+}
+
+/// A byte-budgeted ring buffer of timestamped events.
+///
+/// Records live back to back in one preallocated slab as
+/// `[ts: u64][len: u32][payload]`. When a record does not fit in front
+/// of the write position, the oldest records are evicted until it does;
+/// a record that does not fit before the end of the slab starts the next
+/// lap at offset 0.
+///
+/// Timestamps never go backwards inside the ring (an older stamp is
+/// raised to the newest one seen), so the side index of `(ts, offset)`
+/// pairs is sorted and time windows are found by binary search.
+///
+/// Every record also gets a sequence number (0 for the first one ever
+/// pushed), so readers can page through the ring in chunks and tell
+/// which records were evicted in between.
 #[derive(Clone, Serialize, Deserialize)]
 pub struct RingBuffer {
-    pub buffer: Vec<Option<Vec<u8>>>,
-    pub capacity: usize,
-    pub write_index: usize,
-    pub len: usize,
+    slab: Vec<u8>,
+    index: VecDeque<(u64, usize)>,
+    max_records: usize,
+    head: usize,    // offset of the oldest record
+    tail: usize,    // offset of the next write
+    wrap_at: usize, // end of the previous lap while `wrapped`
+    wrapped: bool,  // live data is [head, wrap_at) + [0, tail)
+    used: usize,    // slab bytes held by live records, headers included
+    evicted: u64,   // records dropped so far = sequence number of the oldest
 }
 
 impl RingBuffer {
+    /// Ring bounded to `capacity_events` records (slab sized for ~64-byte events)
     pub fn new(capacity_events: usize) -> Self {
-        let capacity = capacity_events.max(1);
+        let capacity_events = capacity_events.max(1);
+        Self::with_limits(capacity_events * (RECORD_HEADER + 64), capacity_events)
+    }
+
+    /// Ring bounded only by its byte budget
+    pub fn new_bytes(capacity_bytes: usize) -> Self {
+        Self::with_limits(capacity_bytes, usize::MAX)
+    }
 
+    pub fn with_limits(capacity_bytes: usize, max_records: usize) -> Self {
         RingBuffer {
-            buffer: vec![None; capacity],
-            capacity,
-            write_index: 0,
-            len: 0,
+            // vec![0; n] goes through alloc_zeroed (calloc): a large slab
+            // is fresh zero pages from the kernel, committed only as the
+            // write position first reaches them
+            slab: vec![0; capacity_bytes.max(RECORD_HEADER)],
+            index: VecDeque::new(),
+            max_records: max_records.max(1),
+            head: 0,
+            tail: 0,
+            wrap_at: 0,
+            wrapped: false,
+            used: 0,
+            evicted: 0,
         }
     }
 
-    pub fn new_bytes(capacity_bytes: usize) -> Self {
-        // Approx event size: ~64 bytes → we store ~capacity_bytes / 64 events
-        let capacity = (capacity_bytes / 64).max(1);
-        Self::new(capacity)
+    /// Slab size in bytes
+    pub fn capacity(&self) -> usize {
+        self.slab.len()
+    }
+
+    pub fn len(&self) -> usize {
+        self.index.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.index.is_empty()
+    }
+
+    /// Slab bytes held by live records, headers included
+    pub fn used_bytes(&self) -> usize {
+        self.used
     }
 
-    /// Push a new event into the ring
-    pub fn push(&mut self, data: Vec<u8>) {
-        self.buffer[self.write_index] = Some(data);
-        self.write_index = (self.write_index + 1) % self.capacity;
-        self.len = self.len.saturating_add(1).min(self.capacity);
+    /// Payload bytes held by live records
+    pub fn payload_bytes(&self) -> usize {
+        self.used - self.len() * RECORD_HEADER
     }
 
-    /// Return only USED entries (not full allocated space)
-    pub fn dump(&self) -> Vec<Vec<u8>> {
-        let used = self.len;
-        let cap = self.capacity;
+    /// Push a new event into the ring, stamped with the current time.
+    /// Returns false if the event can never fit in the slab.
+    pub fn push<T: AsRef<[u8]>>(&mut self, data: T) -> bool {
+        self.push_at(now_ns(), data)
+    }
 
-        let mut out = Vec::with_capacity(used);
+    /// Push a new event with an explicit timestamp (ns since epoch)
+    pub fn push_at<T: AsRef<[u8]>>(&mut self, ts: u64, data: T) -> bool {
+        let data = data.as_ref();
+        let size = RECORD_HEADER + data.len();
+        if size > self.slab.len() || data.len() > u32::MAX as usize {
+            return false;
+        }
 
-        if used == 0 {
-            return out;
+        while self.len() >= self.max_records {
+            self.evict_oldest();
         }
+        let at = self.reserve(size);
+        let ts = self.index.back().map_or(ts, |&(last, _)| ts.max(last));
 
-        // Oldest element location
-        let start = if used < cap {
-            0
-        } else {
-            (self.write_index + cap - used) % cap
-        };
+        self.slab[at..at + 8].copy_from_slice(&ts.to_le_bytes());
+        self.slab[at + 8..at + RECORD_HEADER].copy_from_slice(&(data.len() as u32).to_le_bytes());
+        self.slab[at + RECORD_HEADER..at + size].copy_from_slice(data);
 
-        for i in 0..used {
-            let idx = (start + i) % cap;
-            if let Some(ref entry) = self.buffer[idx] {
-                out.push(entry.clone());
+        self.index.push_back((ts, at));
+        self.used += size;
+        true
+    }
+
+    /// Push a batch, oldest first, stamping event `i` with `stamp(i)`.
+    ///
+    /// A batch larger than the ring keeps its newest events that fit:
+    /// every live record is evicted first (they are all older than the
+    /// batch), and the events skipped still take sequence numbers, so
+    /// the numbering matches the Python ring. Returns how many events
+    /// were written, or `None`, with nothing written, when the newest
+    /// event alone does not fit.
+    pub fn push_many_at<T: AsRef<[u8]>>(
+        &mut self,
+        events: &[T],
+        stamp: impl Fn(usize) -> u64,
+    ) -> Option<usize> {
+        let mut first = events.len();
+        let mut total = 0;
+        while first > 0 {
+            let size = RECORD_HEADER + events[first - 1].as_ref().len();
+            if total + size > self.slab.len() {
+                break;
             }
+            total += size;
+            first -= 1;
         }
-
-        out
+        if first == events.len() && !events.is_empty() {
+            return None;
+        }
+        if first > 0 {
+            self.clear();
+            self.evicted += first as u64;
+        }
+        for (i, event) in events.iter().enumerate().skip(first) {
+            self.push_at(stamp(i), event);
+        }
+        Some(events.len() - first)
     }
 
-    /// Dump only telemetry from the last X seconds  
-    /// (Assumes each event includes timestamp as first 8 bytes: u64 ms)
-    pub fn dump_last_seconds(&self, seconds: u64) -> Vec<Vec<u8>> {
-        let mut out = Vec::new();
-        let now_ms = Utc::now().timestamp_millis();
+    /// Evict until `size` contiguous bytes are free at the write position
+    fn reserve(&mut self, size: usize) -> usize {
+        loop {
+            if self.is_empty() {
+                self.head = 0;
+                self.tail = 0;
+                self.wrapped = false;
+            }
 
-        for entry in self.dump() {
-            if entry.len() < 8 {
-                continue;
+            if !self.wrapped {
+                if self.tail + size <= self.slab.len() {
+                    break;
+                }
+                // Start the next lap; the rest of this one is left as is
+                self.wrap_at = self.tail;
+                self.tail = 0;
+                self.wrapped = true;
+            } else if self.tail + size <= self.head {
+                break;
+            } else {
+                self.evict_oldest();
             }
+        }
 
-            // First 8 bytes store timestamp
-            let ts_bytes = &entry[0..8];
-            let ts = i64::from_le_bytes(ts_bytes.try_into().unwrap_or([0; 8]));
+        let at = self.tail;
+        self.tail += size;
+        at
+    }
 
-            if now_ms - ts < (seconds as i64 * 1000) {
-                out.push(entry.clone());
-            }
+    fn header_at(&self, at: usize) -> (u64, usize) {
+        let ts = u64::from_le_bytes(self.slab[at..at + 8].try_into().unwrap());
+        let len = u32::from_le_bytes(self.slab[at + 8..at + RECORD_HEADER].try_into().unwrap());
+        (ts, len as usize)
+    }
+
+    fn evict_oldest(&mut self) {
+        let Some((_, at)) = self.index.pop_front() else {
+            return;
+        };
+        let (_, n) = self.header_at(at);
+        self.head = at + RECORD_HEADER + n;
+        self.used -= RECORD_HEADER + n;
+        self.evicted += 1;
+
+        if self.wrapped && self.head == self.wrap_at {
+            self.head = 0;
+            self.wrapped = false;
+        }
+    }
+
+    /// Drop every stored event
+    pub fn clear(&mut self) {
+        self.head = 0;
+        self.tail = 0;
+        self.wrapped = false;
+        self.evicted += self.index.len() as u64;
+        self.index.clear();
+        self.used = 0;
+    }
+
+    fn payload_at(&self, at: usize) -> &[u8] {
+        let (_, n) = self.header_at(at);
+        &self.slab[at + RECORD_HEADER..at + RECORD_HEADER + n]
+    }
+
+    /// Index positions `lo..hi` of the records stamped in `[start_ts, end_ts)`
+    pub fn range_bounds(&self, start_ts: u64, end_ts: u64) -> (usize, usize) {
+        let lo = self.index.partition_point(|&(ts, _)| ts < start_ts);
+        let hi = self.index.partition_point(|&(ts, _)| ts < end_ts);
+        (lo, hi.max(lo))
+    }
+
+    /// Sequence numbers `first..end` of the records stamped in `[start_ts, end_ts)`
+    pub fn seq_bounds(&self, start_ts: u64, end_ts: u64) -> (u64, u64) {
+        let (lo, hi) = self.range_bounds(start_ts, end_ts);
+        (self.evicted + lo as u64, self.evicted + hi as u64)
+    }
+
+    /// Records numbered `first..end` that are still live, oldest first
+    pub fn records_seq(
+        &self,
+        first: u64,
+        end: u64,
+    ) -> impl ExactSizeIterator<Item = (u64, &[u8])> + '_ {
+        let lo = first.saturating_sub(self.evicted).min(self.len() as u64) as usize;
+        let hi = end.saturating_sub(self.evicted).min(self.len() as u64) as usize;
+        self.records_between(lo, hi.max(lo))
+    }
+
+    /// Payload bytes that the next `count` pushes may total without
+    /// evicting record `seq`: negative once even empty events would (or
+    /// it is already gone), the whole slab if it is not written yet
+    pub fn headroom(&self, seq: u64, count: usize) -> i64 {
+        let Some(i) = seq.checked_sub(self.evicted) else {
+            return -1;
+        };
+        if i >= self.len() as u64 {
+            return self.slab.len() as i64;
         }
+        let i = i as usize;
+        if self.max_records != usize::MAX && count > self.max_records - self.len() + i {
+            return -1;
+        }
+
+        let at = self.index[i].1;
+        let slab_bytes = if self.wrapped && at >= self.head {
+            // Previous lap: the write position is closing in on it
+            at - self.tail
+        } else {
+            // Current lap: safe until the end of the slab, or up to `at` after a wrap
+            (self.slab.len() - self.tail).max(at)
+        };
+        slab_bytes as i64 - (count * RECORD_HEADER) as i64
+    }
+
+    /// Iterate `(timestamp, event)` pairs, oldest first, borrowing from the slab
+    pub fn records(&self) -> impl ExactSizeIterator<Item = (u64, &[u8])> + '_ {
+        self.records_between(0, self.len())
+    }
+
+    /// Records at index positions `lo..hi`, oldest first
+    pub fn records_between(
+        &self,
+        lo: usize,
+        hi: usize,
+    ) -> impl ExactSizeIterator<Item = (u64, &[u8])> + '_ {
+        self.index
+            .range(lo..hi)
+            .map(move |&(ts, at)| (ts, self.payload_at(at)))
+    }
+
+    /// Return only USED entries (not full allocated space), borrowed
+    pub fn dump(&self) -> Vec<&[u8]> {
+        self.records().map(|(_, entry)| entry).collect()
+    }
+
+    /// Events stamped in `[start_ts, end_ts)`: O(log n) to locate the
+    /// window, then proportional to its size
+    pub fn dump_range(&self, start_ts: u64, end_ts: u64) -> Vec<&[u8]> {
+        let (lo, hi) = self.range_bounds(start_ts, end_ts);
+        self.records_between(lo, hi).map(|(_, entry)| entry).collect()
+    }
 
-        out
+    /// Dump only telemetry from the last X seconds, judged by the
+    /// timestamp each event was pushed with
+    pub fn dump_last_seconds(&self, seconds: u64) -> Vec<&[u8]> {
+        let cutoff = now_ns().saturating_sub(seconds.saturating_mul(1_000_000_000));
+        self.dump_range(cutoff, u64::MAX)
     }
 }
@@ -0,0 +1,121 @@
+use fastlog_core::{
+    decode_columns, encode_columns, fastlog_compress_json_with, fastlog_decompress_json_with, Codec,
+    JsonEvent,
+};
+
+fn telemetry(n: usize) -> Vec<Vec<u8>> {
+    (0..n)
+        .map(|i| format!("pid={} user=svc cmd=heartbeat seq={i}", i % 97).into_bytes())
+        .collect()
+}
+
+#[test]
+fn codecs_roundtrip() {
+    let data = telemetry(5000).concat();
+    for spec in ["lz4", "lz4:8", "lz4hc", "lz4hc:12", "zstd", "zstd:19"] {
+        let codec: Codec = spec.parse().unwrap();
+        let blob = codec.compress(&data).unwrap();
+        assert_eq!(codec.decompress(&blob).unwrap(), data, "{spec}");
+        // The header only records id + level; that must be enough to decode
+        assert_eq!(Codec::from_id(codec.id(), codec.level(), None).unwrap(), codec);
+    }
+}
+
+#[test]
+fn lz4_levels_share_one_format() {
+    let data = telemetry(1000).concat();
+    let hc = "lz4hc:12".parse::<Codec>().unwrap().compress(&data).unwrap();
+    assert_eq!(Codec::default().decompress(&hc).unwrap(), data);
+}
+
+#[test]
+fn zstd_dictionary_helps_small_blocks() {
+    let samples = telemetry(2000);
+    let codec = Codec::train(&samples, 4096, 3).unwrap();
+    assert_eq!(codec.to_string(), "zstd-dict:3");
+
+    let event = &samples[5];
+    let blob = codec.compress(event).unwrap();
+    assert_eq!(codec.decompress(&blob).unwrap(), *event);
+    let plain = Codec::Zstd { level: 3 }.compress(event).unwrap();
+    assert!(blob.len() < plain.len());
+
+    let copy = Codec::from_id(codec.id(), codec.level(), codec.dictionary().map(|d| d.to_vec()));
+    assert_eq!(copy.unwrap(), codec);
+}
+
+#[test]
+fn json_blocks_with_codec() {
+    let events = vec![JsonEvent { ts: 1, msg: "hello".into() }];
+    let codec: Codec = "zstd:5".parse().unwrap();
+    let blob = fastlog_compress_json_with(&events, &codec).unwrap();
+    let back = fastlog_decompress_json_with(&blob, &codec).unwrap();
+    assert_eq!(back[0].msg, "hello");
+}
+
+#[test]
+fn invalid_codecs_are_rejected() {
+    assert!("gzip".parse::<Codec>().is_err());
+    assert!("zstd:fast".parse::<Codec>().is_err());
+    assert!("zstd-dict".parse::<Codec>().is_err());
+    assert!(Codec::new("lz4", None, Some(vec![1])).is_err());
+    assert!(Codec::from_id(9, 1, None).is_err());
+}
+
+#[test]
+fn columnar_blocks_roundtrip() {
+    let events: Vec<(u64, Vec<u8>)> = (0..5000u64)
+        .map(|i| {
+            // Mostly repeated heartbeats, timestamps occasionally stepping back
+            let ts = 1_700_000_000_000_000_000 + i * 1000 - (i % 7 == 3) as u64 * 5000;
+            let msg = if i % 10 == 0 { format!("login user{i}") } else { "cpu=5% msg=heartbeat".into() };
+            (ts, msg.into_bytes())
+        })
+        .collect();
+    let codec: Codec = "zstd:3".parse().unwrap();
+
+    let block = encode_columns(events.iter().map(|(t, m)| (*t, m.as_slice())), &codec).unwrap();
+    let cols = decode_columns(&block, &codec).unwrap();
+    assert_eq!(cols.len(), events.len());
+    assert_eq!(cols.distinct(), 501);
+    let back: Vec<(u64, Vec<u8>)> = cols.events().map(|(t, m)| (t, m.to_vec())).collect();
+    assert_eq!(back, events);
+
+    // All distinct: the id column is left out
+    let unique: Vec<(u64, Vec<u8>)> = (0..100u64).map(|i| (i, format!("e{i}").into_bytes())).collect();
+    let block = encode_columns(unique.iter().map(|(t, m)| (*t, m.as_slice())), &Codec::default()).unwrap();
+    let cols = decode_columns(&block, &Codec::default()).unwrap();
+    assert!(cols.ids.is_empty());
+    assert_eq!(cols.events().map(|(t, m)| (t, m.to_vec())).collect::<Vec<_>>(), unique);
+
+    assert!(decode_columns(&block[..block.len() - 1], &Codec::default()).is_err());
+    assert!(decode_columns(&encode_columns([], &codec).unwrap(), &codec).unwrap().is_empty());
+}
+
+/// Hand-built block: counts, then each raw section compressed with `codec`
+fn raw_block(count: u32, distinct: u32, sections: [&[u8]; 4], codec: &Codec) -> Vec<u8> {
+    let mut out = Vec::new();
+    out.extend_from_slice(&count.to_le_bytes());
+    out.extend_from_slice(&distinct.to_le_bytes());
+    for raw in sections {
+        let blob = if raw.is_empty() { Vec::new() } else { codec.compress(raw).unwrap() };
+        out.extend_from_slice(&(blob.len() as u32).to_le_bytes());
+        out.extend_from_slice(&blob);
+    }
+    out
+}
+
+#[test]
+fn columnar_blocks_reject_corrupt_sections() {
+    let codec = Codec::default();
+    assert_eq!(decode_columns(&raw_block(2, 2, [b"\x02\x02", b"\x01\x01", b"ab", b""], &codec), &codec).unwrap().len(), 2);
+
+    // Counts far beyond what the sections hold fail without allocating for them
+    assert!(decode_columns(&raw_block(u32::MAX, 1, [b"\x02", b"\x01", b"a", b""], &codec), &codec).is_err());
+    assert!(decode_columns(&raw_block(u32::MAX, u32::MAX, [b"\x02", b"\x01", b"a", b""], &codec), &codec).is_err());
+
+    // Trailing bytes in a column are corruption, as in the Python decoder
+    assert!(decode_columns(&raw_block(2, 2, [b"\x02\x02\x02", b"\x01\x01", b"ab", b""], &codec), &codec).is_err());
+    assert!(decode_columns(&raw_block(2, 2, [b"\x02\x02", b"\x01\x01\x01", b"ab", b""], &codec), &codec).is_err());
+    assert!(decode_columns(&raw_block(2, 1, [b"\x02\x02", b"\x01", b"a", b"\x00\x00\x00"], &codec), &codec).is_err());
+}
@@ -15,3 +15,171 @@ fn test_ringbuffer_overwrite() {
 
     assert_eq!(dump, vec![vec![2], vec![3], vec![9]]);
 }
+
+#[test]
+fn test_ringbuffer_records_keep_timestamps() {
+    let mut rb = RingBuffer::new(2);
+
+    rb.push_at(10, &b"a"[..]);
+    rb.push_at(20, &b"b"[..]);
+    rb.push_at(30, &b"c"[..]);
+
+    let records: Vec<(u64, &[u8])> = rb.records().collect();
+    assert_eq!(records, vec![(20, &b"b"[..]), (30, &b"c"[..])]);
+}
+
+#[test]
+fn test_ringbuffer_dump_last_seconds_uses_push_time() {
+    let mut rb = RingBuffer::new(4);
+
+    rb.push_at(1, vec![1]);
+    rb.push(vec![2]);
+
+    assert_eq!(rb.dump_last_seconds(60), vec![vec![2]]);
+
+    rb.clear();
+    assert!(rb.dump().is_empty());
+}
+
+#[test]
+fn test_ringbuffer_evicts_by_bytes() {
+    // Room for three 8-byte payloads (12-byte header each)
+    let mut rb = RingBuffer::new_bytes(3 * 20);
+
+    for i in 0..3u8 {
+        assert!(rb.push_at(i as u64, [i; 8]));
+    }
+    assert_eq!(rb.len(), 3);
+
+    // A 28-byte payload needs two records' worth of space
+    assert!(rb.push_at(3, [3u8; 28]));
+    let dump = rb.dump();
+    assert_eq!(dump, vec![&[2u8; 8][..], &[3u8; 28][..]]);
+    assert!(rb.used_bytes() <= rb.capacity());
+    assert_eq!(rb.payload_bytes(), 36);
+}
+
+#[test]
+fn test_ringbuffer_rejects_oversized_event() {
+    let mut rb = RingBuffer::new_bytes(32);
+    assert!(!rb.push(vec![0u8; 64]));
+    assert!(rb.is_empty());
+}
+
+#[test]
+fn test_ringbuffer_wraps_many_laps() {
+    let mut rb = RingBuffer::new_bytes(1000);
+
+    for i in 0..10_000u64 {
+        let payload = vec![(i % 251) as u8; (i % 37) as usize];
+        assert!(rb.push_at(i, &payload));
+    }
+
+    let records: Vec<(u64, &[u8])> = rb.records().collect();
+    assert!(!records.is_empty());
+    assert_eq!(records.last().unwrap().0, 9_999);
+    for w in records.windows(2) {
+        assert_eq!(w[0].0 + 1, w[1].0);
+    }
+    for (ts, payload) in records {
+        assert_eq!(payload, &vec![(ts % 251) as u8; (ts % 37) as usize][..]);
+    }
+    assert!(rb.used_bytes() <= rb.capacity());
+}
+
+#[test]
+fn test_ringbuffer_dump_range() {
+    let mut rb = RingBuffer::new_bytes(4096);
+
+    for ts in [10u64, 20, 20, 30, 40] {
+        rb.push_at(ts, ts.to_le_bytes());
+    }
+
+    let window: Vec<u64> = rb
+        .dump_range(20, 40)
+        .iter()
+        .map(|e| u64::from_le_bytes((*e).try_into().unwrap()))
+        .collect();
+    assert_eq!(window, vec![20, 20, 30]);
+
+    assert!(rb.dump_range(41, u64::MAX).is_empty());
+    assert_eq!(rb.dump_range(0, 11).len(), 1);
+}
+
+#[test]
+fn test_ringbuffer_timestamps_never_go_backwards() {
+    let mut rb = RingBuffer::new_bytes(4096);
+
+    rb.push_at(50, b"late");
+    rb.push_at(40, b"skewed");
+
+    let stamps: Vec<u64> = rb.records().map(|(ts, _)| ts).collect();
+    assert_eq!(stamps, vec![50, 50]);
+}
+
+#[test]
+fn test_ringbuffer_sequence_numbers_survive_eviction() {
+    let mut rb = RingBuffer::new(3);
+
+    for ts in 0..3u64 {
+        rb.push_at(ts, [ts as u8]);
+    }
+    let (first, end) = rb.seq_bounds(0, u64::MAX);
+    assert_eq!((first, end), (0, 3));
+
+    // Two evictions later, only record 2 of the old window is left
+    rb.push_at(3, [3u8]);
+    rb.push_at(4, [4u8]);
+    let left: Vec<u64> = rb.records_seq(first, end).map(|(ts, _)| ts).collect();
+    assert_eq!(left, vec![2]);
+    assert_eq!(rb.seq_bounds(0, u64::MAX), (2, 5));
+}
+
+#[test]
+fn test_ringbuffer_headroom_is_safe() {
+    let mut rb = RingBuffer::new_bytes(1000);
+    let mut size = 7usize;
+
+    for round in 0..2000u64 {
+        // Watch the oldest live record of the moment
+        let (watched, _) = rb.seq_bounds(0, u64::MAX);
+        let room = rb.headroom(watched, 1);
+        size = (size * 31 + 17) % 150;
+
+        let was_live = rb.records_seq(watched, watched + 1).len() == 1;
+        rb.push_at(round, vec![0u8; size]);
+        if was_live && size as i64 <= room {
+            assert_eq!(rb.records_seq(watched, watched + 1).len(), 1, "round {round}");
+        }
+    }
+
+    // Not yet written: the whole slab; evicted: nothing
+    let (_, end) = rb.seq_bounds(0, u64::MAX);
+    assert_eq!(rb.headroom(end, 1), rb.capacity() as i64);
+    assert_eq!(rb.headroom(0, 1), -1);
+}
+
+#[test]
+fn test_ringbuffer_push_many_over_capacity_keeps_newest() {
+    // 100-byte slab: three 12-byte headers + payloads
+    let mut rb = RingBuffer::new_bytes(100);
+    rb.push_at(1, [b'A'; 10]);
+
+    let batch = [vec![b'B'; 40], vec![b'C'; 30], vec![b'D'; 30]];
+    assert_eq!(rb.push_many_at(&batch, |i| 2 + i as u64), Some(2));
+
+    // A is older than the whole batch, so it goes before B does
+    assert_eq!(rb.dump(), vec![vec![b'C'; 30], vec![b'D'; 30]]);
+    // A is seq 0, the skipped B seq 1
+    assert_eq!(rb.seq_bounds(0, u64::MAX), (2, 4));
+}
+
+#[test]
+fn test_ringbuffer_push_many_rejects_oversize_newest_event() {
+    let mut rb = RingBuffer::new_bytes(100);
+    rb.push_at(1, [b'A'; 10]);
+
+    let batch = [vec![b'B'; 10], vec![b'C'; 100]];
+    assert_eq!(rb.push_many_at(&batch, |_| 2), None);
+    assert_eq!(rb.dump(), vec![vec![b'A'; 10]]);
+}
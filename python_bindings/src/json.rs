@@ -0,0 +1,260 @@
+//! Native conversion between Python objects and JSON bytes.
+//!
+//! Encoding walks dicts/lists/tuples/str/int/float/bool/None directly
+//! into a byte buffer; decoding drives serde_json with a seed that builds
+//! the Python objects as it parses, so no intermediate `serde_json::Value`
+//! or Python `json` module call is involved.
+
+use std::borrow::Cow;
+use std::fmt;
+use std::io::Write;
+
+use pyo3::exceptions::{PyTypeError, PyValueError};
+use pyo3::prelude::*;
+use pyo3::types::{PyBool, PyDict, PyFloat, PyList, PyLong, PyString, PyTuple};
+use serde::de::{self, DeserializeSeed, MapAccess, SeqAccess, Visitor};
+
+/// Nesting limit for encoding; serde_json applies its own when decoding
+const MAX_DEPTH: usize = 512;
+
+/// Append the JSON encoding of `obj` to `out`
+pub fn encode(obj: &Bound<'_, PyAny>, out: &mut Vec<u8>) -> PyResult<()> {
+    encode_value(obj, out, 0)
+}
+
+fn encode_value(obj: &Bound<'_, PyAny>, out: &mut Vec<u8>, depth: usize) -> PyResult<()> {
+    if depth > MAX_DEPTH {
+        return Err(PyValueError::new_err("JSON encode error: nesting too deep"));
+    }
+
+    if let Ok(dict) = obj.downcast::<PyDict>() {
+        out.push(b'{');
+        for (i, (key, value)) in dict.iter().enumerate() {
+            if i > 0 {
+                out.push(b',');
+            }
+            encode_key(&key, out)?;
+            out.push(b':');
+            encode_value(&value, out, depth + 1)?;
+        }
+        out.push(b'}');
+    } else if let Ok(s) = obj.downcast::<PyString>() {
+        encode_str(&s.to_cow()?, out);
+    } else if let Ok(list) = obj.downcast::<PyList>() {
+        encode_items(list.iter(), out, depth)?;
+    } else if let Ok(tuple) = obj.downcast::<PyTuple>() {
+        encode_items(tuple.iter(), out, depth)?;
+    } else if obj.is_none() {
+        out.extend_from_slice(b"null");
+    } else if let Ok(b) = obj.downcast::<PyBool>() {
+        out.extend_from_slice(if b.is_true() { b"true" } else { b"false" });
+    } else if obj.downcast::<PyLong>().is_ok() {
+        encode_int(obj, out)?;
+    } else if let Ok(f) = obj.downcast::<PyFloat>() {
+        encode_float(f.value(), out)?;
+    } else {
+        let type_name = obj.get_type().name()?.to_string();
+        return Err(PyTypeError::new_err(format!(
+            "JSON encode error: Object of type {type_name} is not JSON serializable"
+        )));
+    }
+    Ok(())
+}
+
+fn encode_items<'py>(
+    items: impl Iterator<Item = Bound<'py, PyAny>>,
+    out: &mut Vec<u8>,
+    depth: usize,
+) -> PyResult<()> {
+    out.push(b'[');
+    for (i, item) in items.enumerate() {
+        if i > 0 {
+            out.push(b',');
+        }
+        encode_value(&item, out, depth + 1)?;
+    }
+    out.push(b']');
+    Ok(())
+}
+
+/// Object keys follow json.dumps: str as is, scalars as their JSON text
+fn encode_key(key: &Bound<'_, PyAny>, out: &mut Vec<u8>) -> PyResult<()> {
+    if let Ok(s) = key.downcast::<PyString>() {
+        encode_str(&s.to_cow()?, out);
+        return Ok(());
+    }
+
+    let mut text = Vec::new();
+    if key.is_none() || key.downcast::<PyBool>().is_ok() || key.downcast::<PyLong>().is_ok() {
+        encode_value(key, &mut text, 0)?;
+    } else if let Ok(f) = key.downcast::<PyFloat>() {
+        encode_float(f.value(), &mut text)?;
+    } else {
+        let type_name = key.get_type().name()?.to_string();
+        return Err(PyTypeError::new_err(format!(
+            "JSON encode error: keys must be str, int, float, bool or None, not {type_name}"
+        )));
+    }
+    encode_str(&String::from_utf8_lossy(&text), out);
+    Ok(())
+}
+
+fn encode_str(s: &str, out: &mut Vec<u8>) {
+    // Writing into a Vec cannot fail
+    serde_json::to_writer(&mut *out, s).expect("write to Vec");
+}
+
+fn encode_int(obj: &Bound<'_, PyAny>, out: &mut Vec<u8>) -> PyResult<()> {
+    if let Ok(v) = obj.extract::<i64>() {
+        write!(out, "{v}").expect("write to Vec");
+    } else if let Ok(v) = obj.extract::<u64>() {
+        write!(out, "{v}").expect("write to Vec");
+    } else {
+        // decode would hand a wider integer back as a float
+        return Err(PyValueError::new_err("JSON encode error: integer does not fit in 64 bits"));
+    }
+    Ok(())
+}
+
+/// Same spelling as json.dumps; NaN and the infinities are refused, as
+/// with json.dumps(allow_nan=False), since decode cannot read them back
+fn encode_float(v: f64, out: &mut Vec<u8>) -> PyResult<()> {
+    if !v.is_finite() {
+        return Err(PyValueError::new_err(format!(
+            "JSON encode error: Out of range float values are not JSON compliant: {v}"
+        )));
+    }
+    // Shortest round-trip digits laid out the way float.__repr__ does:
+    // positional for decimal exponents -4..=15, otherwise d.ddde±XX
+    let sci = format!("{:e}", v.abs());
+    let (mantissa, exp) = sci.split_once('e').expect("{:e} has an exponent");
+    let exp: i32 = exp.parse().expect("integer exponent");
+    let digits: String = mantissa.chars().filter(|&c| c != '.').collect();
+    if v.is_sign_negative() {
+        out.push(b'-');
+    }
+    if (-4..16).contains(&exp) && exp >= 0 {
+        let int_len = exp as usize + 1;
+        if digits.len() > int_len {
+            write!(out, "{}.{}", &digits[..int_len], &digits[int_len..])
+        } else {
+            write!(out, "{}{}.0", digits, "0".repeat(int_len - digits.len()))
+        }
+    } else if (-4..16).contains(&exp) {
+        write!(out, "0.{}{}", "0".repeat((-exp - 1) as usize), digits)
+    } else {
+        let sign = if exp < 0 { '-' } else { '+' };
+        write!(out, "{}e{}{:02}", mantissa, sign, exp.abs())
+    }
+    .expect("write to Vec");
+    Ok(())
+}
+
+/// Append `[{"ts":..,"msg":..},...]` for raw `(ts, payload)` records.
+/// Invalid UTF-8 in a payload is dropped, like `bytes.decode(errors="ignore")`.
+/// Needs no Python objects, so it can run without the GIL.
+pub fn encode_records(records: &[(u64, Vec<u8>)], out: &mut Vec<u8>) {
+    out.reserve(records.iter().map(|(_, raw)| raw.len() + 24).sum::<usize>() + 2);
+    out.push(b'[');
+    for (i, (ts, raw)) in records.iter().enumerate() {
+        if i > 0 {
+            out.push(b',');
+        }
+        write!(out, "{{\"ts\":{ts},\"msg\":").expect("write to Vec");
+        encode_str(&utf8_ignoring_errors(raw), out);
+        out.push(b'}');
+    }
+    out.push(b']');
+}
+
+/// Text of `bytes` with invalid UTF-8 dropped, like `errors="ignore"`
+pub fn utf8_ignoring_errors(mut bytes: &[u8]) -> Cow<'_, str> {
+    if let Ok(s) = std::str::from_utf8(bytes) {
+        return Cow::Borrowed(s);
+    }
+    let mut text = String::with_capacity(bytes.len());
+    loop {
+        match std::str::from_utf8(bytes) {
+            Ok(s) => {
+                text.push_str(s);
+                break;
+            }
+            Err(e) => {
+                let (valid, rest) = bytes.split_at(e.valid_up_to());
+                text.push_str(std::str::from_utf8(valid).expect("valid prefix"));
+                match e.error_len() {
+                    Some(n) => bytes = &rest[n..],
+                    None => break, // truncated sequence at the end
+                }
+            }
+        }
+    }
+    Cow::Owned(text)
+}
+
+/// Decode one complete JSON document into Python objects
+pub fn decode(py: Python<'_>, data: &[u8]) -> Result<PyObject, serde_json::Error> {
+    let mut de = serde_json::Deserializer::from_slice(data);
+    let obj = PyObjectSeed(py).deserialize(&mut de)?;
+    de.end()?;
+    Ok(obj)
+}
+
+struct PyObjectSeed<'py>(Python<'py>);
+
+impl<'de, 'py> DeserializeSeed<'de> for PyObjectSeed<'py> {
+    type Value = PyObject;
+
+    fn deserialize<D: de::Deserializer<'de>>(self, deserializer: D) -> Result<PyObject, D::Error> {
+        deserializer.deserialize_any(self)
+    }
+}
+
+impl<'de, 'py> Visitor<'de> for PyObjectSeed<'py> {
+    type Value = PyObject;
+
+    fn expecting(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.write_str("a JSON value")
+    }
+
+    fn visit_unit<E: de::Error>(self) -> Result<PyObject, E> {
+        Ok(self.0.None())
+    }
+
+    fn visit_bool<E: de::Error>(self, v: bool) -> Result<PyObject, E> {
+        Ok(v.into_py(self.0))
+    }
+
+    fn visit_i64<E: de::Error>(self, v: i64) -> Result<PyObject, E> {
+        Ok(v.into_py(self.0))
+    }
+
+    fn visit_u64<E: de::Error>(self, v: u64) -> Result<PyObject, E> {
+        Ok(v.into_py(self.0))
+    }
+
+    fn visit_f64<E: de::Error>(self, v: f64) -> Result<PyObject, E> {
+        Ok(v.into_py(self.0))
+    }
+
+    fn visit_str<E: de::Error>(self, v: &str) -> Result<PyObject, E> {
+        Ok(PyString::new_bound(self.0, v).into_any().unbind())
+    }
+
+    fn visit_seq<A: SeqAccess<'de>>(self, mut seq: A) -> Result<PyObject, A::Error> {
+        let list = PyList::empty_bound(self.0);
+        while let Some(item) = seq.next_element_seed(PyObjectSeed(self.0))? {
+            list.append(item).map_err(de::Error::custom)?;
+        }
+        Ok(list.into_any().unbind())
+    }
+
+    fn visit_map<A: MapAccess<'de>>(self, mut map: A) -> Result<PyObject, A::Error> {
+        let dict = PyDict::new_bound(self.0);
+        while let Some(key) = map.next_key_seed(PyObjectSeed(self.0))? {
+            let value = map.next_value_seed(PyObjectSeed(self.0))?;
+            dict.set_item(key, value).map_err(de::Error::custom)?;
+        }
+        Ok(dict.into_any().unbind())
+    }
+}
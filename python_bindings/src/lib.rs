@@ -1,39 +1,481 @@
-use lz4::block::{compress, decompress};
-use pyo3::exceptions::PyRuntimeError;
+mod json;
+
+use std::borrow::Cow;
+
+use fastlog_core::{decode_columns, encode_columns, Codec as CoreCodec, RingBuffer as CoreRingBuffer};
+use pyo3::buffer::PyBuffer;
+use pyo3::exceptions::{PyBufferError, PyRuntimeError, PyValueError};
+use pyo3::intern;
 use pyo3::prelude::*;
+use pyo3::types::{PyBytes, PyDict, PyList, PyString};
+
+/// JSON-encode `obj` natively and compress it with `codec` (default:
+/// size-prefixed LZ4 block). Only the encoding needs the GIL;
+/// compression runs without it.
+#[pyfunction]
+#[pyo3(signature = (obj, codec=None))]
+fn compress_json<'py>(
+    py: Python<'py>,
+    obj: &Bound<'py, PyAny>,
+    codec: Option<PyRef<'py, PyCodec>>,
+) -> PyResult<Bound<'py, PyBytes>> {
+    let mut raw = Vec::new();
+    json::encode(obj, &mut raw)?;
+
+    let default = CoreCodec::default();
+    let codec = codec.as_deref().map_or(&default, |c| &c.inner);
+    let blob = py.allow_threads(|| codec.compress(&raw)).map_err(PyRuntimeError::new_err)?;
+    Ok(PyBytes::new_bound(py, &blob))
+}
+
+/// Encode `[(ts, raw), ...]` as the JSON list `[{"ts": ts, "msg": raw}, ...]`
+/// and compress it, the same block compress_json makes from those
+/// dicts. Payloads are copied out first, so the encoding and the
+/// compression both run with the GIL released and several threads can
+/// compress blocks in parallel.
+#[pyfunction]
+#[pyo3(signature = (records, codec=None))]
+fn compress_records<'py>(
+    py: Python<'py>,
+    records: &Bound<'py, PyAny>,
+    codec: Option<PyRef<'py, PyCodec>>,
+) -> PyResult<Bound<'py, PyBytes>> {
+    let mut items: Vec<(u64, Vec<u8>)> = Vec::new();
+    for item in records.iter()? {
+        let item = item?;
+        let (ts, raw): (u64, Bound<'py, PyAny>) = item.extract()?;
+        items.push((ts, event_bytes(&raw)?.into_owned()));
+    }
+
+    let default = CoreCodec::default();
+    let codec = codec.as_deref().map_or(&default, |c| &c.inner);
+    let blob = py
+        .allow_threads(|| {
+            let mut out = Vec::new();
+            json::encode_records(&items, &mut out);
+            codec.compress(&out)
+        })
+        .map_err(PyRuntimeError::new_err)?;
+    Ok(PyBytes::new_bound(py, &blob))
+}
+
+/// Inverse of compress_json. Accepts any buffer-protocol object; the
+/// input is read in place and decompressed with the GIL released.
+#[pyfunction]
+#[pyo3(signature = (data, codec=None))]
+fn decompress_json(
+    py: Python<'_>,
+    data: &Bound<'_, PyAny>,
+    codec: Option<PyRef<'_, PyCodec>>,
+) -> PyResult<PyObject> {
+    let buf = PyBuffer::<u8>::get_bound(data)?;
+    let input = buffer_slice(&buf)?;
+    let default = CoreCodec::default();
+    let codec = codec.as_deref().map_or(&default, |c| &c.inner);
+    let decompressed = py
+        .allow_threads(|| codec.decompress(input))
+        .map_err(PyRuntimeError::new_err)?;
+
+    json::decode(py, &decompressed)
+        .map_err(|e| PyRuntimeError::new_err(format!("JSON decode error: {e}")))
+}
 
+/// Same events as compress_records, as a columnar block
+/// (fastlog_core::columnar): delta-coded timestamps, and each distinct
+/// message stored once. Encoding runs with the GIL released.
 #[pyfunction]
-fn compress_json(py: Python<'_>, obj: &PyAny) -> PyResult<Vec<u8>> {
-    let json = py.import("json")?;
-    let json_str: String = json
-        .call_method1("dumps", (obj,))?
-        .extract()
-        .map_err(|e| PyRuntimeError::new_err(format!("JSON encode error: {e}")))?;
+#[pyo3(signature = (records, codec=None))]
+fn compress_columns<'py>(
+    py: Python<'py>,
+    records: &Bound<'py, PyAny>,
+    codec: Option<PyRef<'py, PyCodec>>,
+) -> PyResult<Bound<'py, PyBytes>> {
+    let mut items: Vec<(u64, Vec<u8>)> = Vec::new();
+    for item in records.iter()? {
+        let item = item?;
+        let (ts, raw): (u64, Bound<'py, PyAny>) = item.extract()?;
+        items.push((ts, event_bytes(&raw)?.into_owned()));
+    }
 
-    compress(json_str.as_bytes(), None, true)
-        .map_err(|e| PyRuntimeError::new_err(format!("LZ4 compress error: {e}")))
+    let default = CoreCodec::default();
+    let codec = codec.as_deref().map_or(&default, |c| &c.inner);
+    let blob = py
+        .allow_threads(|| {
+            let text: Vec<Cow<'_, str>> =
+                items.iter().map(|(_, raw)| json::utf8_ignoring_errors(raw)).collect();
+            encode_columns(items.iter().zip(&text).map(|((ts, _), t)| (*ts, t.as_bytes())), codec)
+        })
+        .map_err(PyRuntimeError::new_err)?;
+    Ok(PyBytes::new_bound(py, &blob))
 }
 
+/// Inverse of compress_columns: `[{"ts": ts, "msg": str}, ...]`.
+/// Each distinct message becomes one str object shared by its events.
 #[pyfunction]
-fn decompress_json(py: Python<'_>, data: &PyAny) -> PyResult<PyObject> {
-    let bytes: Vec<u8> = data.extract()?;
-    let decompressed = decompress(&bytes, None)
-        .map_err(|e| PyRuntimeError::new_err(format!("LZ4 decompress error: {e}")))?;
+#[pyo3(signature = (data, codec=None))]
+fn decompress_columns<'py>(
+    py: Python<'py>,
+    data: &Bound<'py, PyAny>,
+    codec: Option<PyRef<'py, PyCodec>>,
+) -> PyResult<Bound<'py, PyList>> {
+    let buf = PyBuffer::<u8>::get_bound(data)?;
+    let input = buffer_slice(&buf)?;
+    let default = CoreCodec::default();
+    let codec = codec.as_deref().map_or(&default, |c| &c.inner);
+    let cols = py
+        .allow_threads(|| decode_columns(input, codec))
+        .map_err(PyRuntimeError::new_err)?;
+
+    let messages: Vec<Bound<'py, PyString>> = (0..cols.distinct())
+        .map(|i| PyString::new_bound(py, &String::from_utf8_lossy(cols.message(i))))
+        .collect();
+    let (ts_key, msg_key) = (intern!(py, "ts"), intern!(py, "msg"));
+    let out = PyList::empty_bound(py);
+    for (i, &ts) in cols.ts.iter().enumerate() {
+        let id = if cols.ids.is_empty() { i } else { cols.ids[i] as usize };
+        let event = PyDict::new_bound(py);
+        event.set_item(ts_key, ts)?;
+        event.set_item(msg_key, &messages[id])?;
+        out.append(event)?;
+    }
+    Ok(out)
+}
+
+/// A block codec (fastlog_core::Codec): `lz4` (level = acceleration),
+/// `lz4hc`, `zstd` or `zstd-dict`. `name` may carry the level, as in
+/// `Codec("zstd:19")`.
+#[pyclass(frozen, name = "Codec", module = "fastlog_py")]
+struct PyCodec {
+    inner: CoreCodec,
+}
+
+#[pymethods]
+impl PyCodec {
+    #[new]
+    #[pyo3(signature = (name="lz4", level=None, dictionary=None))]
+    fn new(name: &str, level: Option<i32>, dictionary: Option<Vec<u8>>) -> PyResult<Self> {
+        let (name, level) = match (name.split_once(':'), level) {
+            (Some((name, spec)), None) => {
+                let level = spec
+                    .parse()
+                    .map_err(|_| PyValueError::new_err(format!("invalid codec level '{spec}'")))?;
+                (name, Some(level))
+            }
+            _ => (name, level),
+        };
+        let inner = CoreCodec::new(name, level, dictionary).map_err(PyValueError::new_err)?;
+        Ok(PyCodec { inner })
+    }
+
+    /// Codec recorded as `id`/`level` in a snapshot header
+    #[staticmethod]
+    #[pyo3(signature = (id, level, dictionary=None))]
+    fn from_id(id: u8, level: i32, dictionary: Option<Vec<u8>>) -> PyResult<Self> {
+        let inner = CoreCodec::from_id(id, level, dictionary).map_err(PyValueError::new_err)?;
+        Ok(PyCodec { inner })
+    }
+
+    /// zstd-dict codec with a dictionary of at most `size` bytes trained
+    /// on `samples` (e.g. recent raw events)
+    #[staticmethod]
+    #[pyo3(signature = (samples, size=112640, level=3))]
+    fn train(py: Python<'_>, samples: &Bound<'_, PyAny>, size: usize, level: i32) -> PyResult<Self> {
+        let items: Vec<Bound<'_, PyAny>> = samples.iter()?.collect::<PyResult<_>>()?;
+        let chunks = items.iter().map(event_bytes).collect::<PyResult<Vec<_>>>()?;
+        let inner = py
+            .allow_threads(|| CoreCodec::train(&chunks, size, level))
+            .map_err(PyRuntimeError::new_err)?;
+        Ok(PyCodec { inner })
+    }
+
+    #[getter]
+    fn name(&self) -> &'static str {
+        self.inner.name()
+    }
+
+    #[getter]
+    fn id(&self) -> u8 {
+        self.inner.id()
+    }
+
+    #[getter]
+    fn level(&self) -> i32 {
+        self.inner.level()
+    }
+
+    #[getter]
+    fn dictionary<'py>(&self, py: Python<'py>) -> Option<Bound<'py, PyBytes>> {
+        self.inner.dictionary().map(|d| PyBytes::new_bound(py, d))
+    }
+
+    fn compress<'py>(&self, py: Python<'py>, data: &Bound<'py, PyAny>) -> PyResult<Bound<'py, PyBytes>> {
+        let buf = PyBuffer::<u8>::get_bound(data)?;
+        let input = buffer_slice(&buf)?;
+        let blob = py
+            .allow_threads(|| self.inner.compress(input))
+            .map_err(PyRuntimeError::new_err)?;
+        Ok(PyBytes::new_bound(py, &blob))
+    }
+
+    fn decompress<'py>(&self, py: Python<'py>, data: &Bound<'py, PyAny>) -> PyResult<Bound<'py, PyBytes>> {
+        let buf = PyBuffer::<u8>::get_bound(data)?;
+        let input = buffer_slice(&buf)?;
+        let raw = py
+            .allow_threads(|| self.inner.decompress(input))
+            .map_err(PyRuntimeError::new_err)?;
+        Ok(PyBytes::new_bound(py, &raw))
+    }
+
+    fn __repr__(&self) -> String {
+        format!("Codec('{}')", self.inner)
+    }
+}
+
+/// Borrow a C-contiguous buffer-protocol object as a byte slice.
+/// The slice lives as long as the PyBuffer holding the export.
+fn buffer_slice(buf: &PyBuffer<u8>) -> PyResult<&[u8]> {
+    if !buf.is_c_contiguous() {
+        return Err(PyBufferError::new_err("buffer must be C-contiguous"));
+    }
+    Ok(unsafe { std::slice::from_raw_parts(buf.buf_ptr() as *const u8, buf.len_bytes()) })
+}
+
+/// bytes are borrowed in place; any other buffer object is copied once.
+fn event_bytes<'a>(obj: &'a Bound<'_, PyAny>) -> PyResult<Cow<'a, [u8]>> {
+    if let Ok(b) = obj.downcast::<PyBytes>() {
+        return Ok(Cow::Borrowed(b.as_bytes()));
+    }
+    let buf = PyBuffer::<u8>::get_bound(obj)?;
+    Ok(Cow::Owned(buf.to_vec(obj.py())?))
+}
+
+/// Integer column; array('q') / int64 buffers are read directly
+fn int64_column(obj: &Bound<'_, PyAny>) -> PyResult<Vec<i64>> {
+    match PyBuffer::<i64>::get_bound(obj) {
+        Ok(buf) => buf.to_vec(obj.py()),
+        Err(_) => obj.extract(),
+    }
+}
+
+/// n+1 event boundaries
+fn event_offsets(obj: &Bound<'_, PyAny>) -> PyResult<Vec<usize>> {
+    int64_column(obj)?
+        .into_iter()
+        .map(|o| usize::try_from(o).map_err(|_| PyValueError::new_err("offsets must be non-negative")))
+        .collect()
+}
+
+/// One timestamp (ns) per event
+fn event_stamps(obj: &Bound<'_, PyAny>, n: usize) -> PyResult<Vec<u64>> {
+    let stamps = int64_column(obj)?;
+    if stamps.len() != n {
+        return Err(PyValueError::new_err("stamps must hold one timestamp per event"));
+    }
+    stamps
+        .into_iter()
+        .map(|t| u64::try_from(t).map_err(|_| PyValueError::new_err("stamps must be non-negative")))
+        .collect()
+}
+
+fn too_large(capacity: usize) -> PyErr {
+    PyValueError::new_err(format!("event exceeds ring capacity of {capacity} bytes"))
+}
+
+/// Native ring backed by fastlog_core::RingBuffer.
+/// Same calling convention as the pure-Python ttfr_fastlog ring.
+#[pyclass(subclass, name = "RingBuffer", module = "fastlog_py")]
+struct PyRingBuffer {
+    inner: CoreRingBuffer,
+}
+
+#[pymethods]
+impl PyRingBuffer {
+    #[new]
+    fn new(capacity_bytes: usize) -> Self {
+        PyRingBuffer {
+            inner: CoreRingBuffer::new_bytes(capacity_bytes),
+        }
+    }
+
+    #[getter]
+    fn capacity(&self) -> usize {
+        self.inner.capacity()
+    }
+
+    /// Payload bytes held by live events
+    #[getter]
+    fn used(&self) -> usize {
+        self.inner.payload_bytes()
+    }
+
+    fn __len__(&self) -> usize {
+        self.inner.len()
+    }
+
+    #[pyo3(signature = (data, ts=None))]
+    fn push(&mut self, data: &Bound<'_, PyAny>, ts: Option<u64>) -> PyResult<()> {
+        let raw = event_bytes(data)?;
+        let ts = ts.unwrap_or_else(fastlog_core::now_ns);
+        if !self.inner.push_at(ts, raw) {
+            return Err(too_large(self.inner.capacity()));
+        }
+        Ok(())
+    }
+
+    /// Push a batch with one timestamp, or one per event from `stamps`:
+    /// either an iterable of events, or one contiguous buffer split by
+    /// n+1 `offsets`. A batch larger than the ring keeps its newest
+    /// events (see RingBuffer::push_many_at); returns how many were
+    /// written. The copy into the ring runs with the GIL released.
+    #[pyo3(signature = (events, offsets=None, ts=None, stamps=None))]
+    fn push_many(
+        &mut self,
+        py: Python<'_>,
+        events: &Bound<'_, PyAny>,
+        offsets: Option<&Bound<'_, PyAny>>,
+        ts: Option<u64>,
+        stamps: Option<&Bound<'_, PyAny>>,
+    ) -> PyResult<usize> {
+        let ts = ts.unwrap_or_else(fastlog_core::now_ns);
+        let inner = &mut self.inner;
+
+        let pushed = match offsets {
+            Some(offsets) => {
+                let bounds = event_offsets(offsets)?;
+                let buf = PyBuffer::<u8>::get_bound(events)?;
+                let data = buffer_slice(&buf)?;
+                let ascending = bounds.windows(2).all(|w| w[0] <= w[1]);
+                if !ascending || bounds.last().map_or(false, |&end| end > data.len()) {
+                    return Err(PyValueError::new_err(
+                        "offsets must be ascending and within the buffer",
+                    ));
+                }
+                let chunks: Vec<&[u8]> = bounds.windows(2).map(|w| &data[w[0]..w[1]]).collect();
+                let stamps = stamps.map(|s| event_stamps(s, chunks.len())).transpose()?;
+                let stamp = |i: usize| stamps.as_ref().map_or(ts, |s| s[i]);
+                py.allow_threads(|| inner.push_many_at(&chunks, stamp))
+            }
+            None => {
+                let items: Vec<Bound<'_, PyAny>> = events.iter()?.collect::<PyResult<_>>()?;
+                let chunks = items.iter().map(event_bytes).collect::<PyResult<Vec<_>>>()?;
+                let stamps = stamps.map(|s| event_stamps(s, chunks.len())).transpose()?;
+                let stamp = |i: usize| stamps.as_ref().map_or(ts, |s| s[i]);
+                py.allow_threads(|| inner.push_many_at(&chunks, stamp))
+            }
+        };
+        pushed.ok_or_else(|| too_large(self.inner.capacity()))
+    }
+
+    /// Live events, oldest first
+    fn dump<'py>(&self, py: Python<'py>) -> Bound<'py, PyList> {
+        PyList::new_bound(py, self.inner.records().map(|(_, e)| PyBytes::new_bound(py, e)))
+    }
+
+    /// Events stamped in `[start_ts, end_ts)`, located by binary search
+    #[pyo3(signature = (start_ts, end_ts=None))]
+    fn dump_range<'py>(
+        &self,
+        py: Python<'py>,
+        start_ts: u64,
+        end_ts: Option<u64>,
+    ) -> Bound<'py, PyList> {
+        let entries = self.inner.dump_range(start_ts, end_ts.unwrap_or(u64::MAX));
+        PyList::new_bound(py, entries.iter().map(|e| PyBytes::new_bound(py, e)))
+    }
+
+    /// Events pushed within the last `seconds`
+    fn dump_last<'py>(&self, py: Python<'py>, seconds: f64) -> Bound<'py, PyList> {
+        let window = (seconds.max(0.0) * 1e9) as u64;
+        self.dump_range(py, fastlog_core::now_ns().saturating_sub(window), None)
+    }
+
+    /// `(ts, raw)` for every live event stamped in `[start_ts, end_ts)`, oldest first
+    #[pyo3(signature = (start_ts=None, end_ts=None))]
+    fn records<'py>(
+        &self,
+        py: Python<'py>,
+        start_ts: Option<u64>,
+        end_ts: Option<u64>,
+    ) -> Bound<'py, PyList> {
+        let (lo, hi) = self
+            .inner
+            .range_bounds(start_ts.unwrap_or(0), end_ts.unwrap_or(u64::MAX));
+        PyList::new_bound(
+            py,
+            self.inner
+                .records_between(lo, hi)
+                .map(|(ts, entry)| (ts, PyBytes::new_bound(py, entry))),
+        )
+    }
+
+    /// `(ts, offsets, lengths, data)` for the events stamped in
+    /// `[start_ts, end_ts)`: packed i64/i64/u32 columns plus the
+    /// payloads back to back, built without a Python object per event
+    #[pyo3(signature = (start_ts=None, end_ts=None))]
+    fn columns<'py>(
+        &self,
+        py: Python<'py>,
+        start_ts: Option<u64>,
+        end_ts: Option<u64>,
+    ) -> (Bound<'py, PyBytes>, Bound<'py, PyBytes>, Bound<'py, PyBytes>, Bound<'py, PyBytes>) {
+        let inner = &self.inner;
+        let (ts, offsets, lengths, data) = py.allow_threads(|| {
+            let (lo, hi) = inner.range_bounds(start_ts.unwrap_or(0), end_ts.unwrap_or(u64::MAX));
+            let n = hi - lo;
+            let (mut ts, mut offsets, mut lengths) =
+                (Vec::with_capacity(8 * n), Vec::with_capacity(8 * n), Vec::with_capacity(4 * n));
+            let mut data = Vec::new();
+            for (t, entry) in inner.records_between(lo, hi) {
+                ts.extend_from_slice(&t.to_le_bytes());
+                offsets.extend_from_slice(&(data.len() as i64).to_le_bytes());
+                lengths.extend_from_slice(&(entry.len() as u32).to_le_bytes());
+                data.extend_from_slice(entry);
+            }
+            (ts, offsets, lengths, data)
+        });
+        (
+            PyBytes::new_bound(py, &ts),
+            PyBytes::new_bound(py, &offsets),
+            PyBytes::new_bound(py, &lengths),
+            PyBytes::new_bound(py, &data),
+        )
+    }
+
+    /// `(first, end)` sequence numbers of the events stamped in `[start_ts, end_ts)`
+    #[pyo3(signature = (start_ts=None, end_ts=None))]
+    fn seq_range(&self, start_ts: Option<u64>, end_ts: Option<u64>) -> (u64, u64) {
+        self.inner.seq_bounds(start_ts.unwrap_or(0), end_ts.unwrap_or(u64::MAX))
+    }
 
-    let json_str = String::from_utf8(decompressed)
-        .map_err(|e| PyRuntimeError::new_err(format!("UTF-8 error: {e}")))?;
+    /// `(ts, raw)` for the events numbered `[first, end)` that are still live
+    fn records_seq<'py>(&self, py: Python<'py>, first: u64, end: u64) -> Bound<'py, PyList> {
+        PyList::new_bound(
+            py,
+            self.inner
+                .records_seq(first, end)
+                .map(|(ts, entry)| (ts, PyBytes::new_bound(py, entry))),
+        )
+    }
 
-    let json = py.import("json")?;
-    let obj = json
-        .call_method1("loads", (json_str,))?
-        .to_object(py);
+    /// Payload bytes the next `count` pushes may total without evicting event `seq`
+    #[pyo3(signature = (seq, count=1))]
+    fn headroom(&self, seq: u64, count: usize) -> i64 {
+        self.inner.headroom(seq, count)
+    }
 
-    Ok(obj)
+    fn clear(&mut self) {
+        self.inner.clear();
+    }
 }
 
 #[pymodule]
 fn fastlog_py(_py: Python<'_>, m: &PyModule) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(compress_json, m)?)?;
     m.add_function(wrap_pyfunction!(decompress_json, m)?)?;
+    m.add_function(wrap_pyfunction!(compress_records, m)?)?;
+    m.add_function(wrap_pyfunction!(compress_columns, m)?)?;
+    m.add_function(wrap_pyfunction!(decompress_columns, m)?)?;
+    m.add_class::<PyCodec>()?;
+    m.add_class::<PyRingBuffer>()?;
     Ok(())
 }
@@ -1,11 +1,59 @@
+import json
+
 import fastlog_py
 
 
 def main():
     data = [{"ts": 1, "msg": "hello"}]
     blob = fastlog_py.compress_json(data)
+    assert isinstance(blob, bytes)
     out = fastlog_py.decompress_json(blob)
     assert out == data
+    assert fastlog_py.decompress_json(memoryview(blob)) == data
+
+    mixed = {"a": [1, 2.5, None, True, "é\n"], "b": {"n": -(2 ** 40)}, "t": (1, 2), 3: "k"}
+    assert fastlog_py.decompress_json(fastlog_py.compress_json(mixed)) == json.loads(json.dumps(mixed))
+
+    floats = [0.0, -0.0, 1.5, 0.1, 1e16, 1e15, 1e-05, 0.0001, -2.5e300, 5e-324, 123456789.125]
+    raw = fastlog_py.Codec("lz4").decompress(fastlog_py.compress_json(floats))
+    assert raw == json.dumps(floats, separators=(",", ":")).encode(), raw
+
+    # Integers up to 64 bits come back exact; what decode could not read
+    # back (NaN, infinities, wider integers) is refused when encoding
+    ints = [2 ** 64 - 1, -(2 ** 63), 2 ** 53 + 1]
+    assert fastlog_py.decompress_json(fastlog_py.compress_json(ints)) == json.loads(json.dumps(ints))
+    for bad in (float("nan"), float("inf"), -float("inf"), 2 ** 70, -(2 ** 64)):
+        try:
+            fastlog_py.compress_json({"x": bad})
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"Expected compress_json to refuse {bad!r}")
+
+    try:
+        fastlog_py.compress_json({"x": object()})
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Expected compress_json to reject non-JSON objects")
+
+    records = [(1, b"hello"), (2, b"caf\xc3\xa9 \"q\"\n"), (3, b"bad\xff")]
+    assert fastlog_py.decompress_json(fastlog_py.compress_records(records)) == [
+        {"ts": 1, "msg": "hello"}, {"ts": 2, "msg": "café \"q\"\n"}, {"ts": 3, "msg": "bad"},
+    ]
+
+    rows = [(5, b"heartbeat"), (3, b"login \xff"), (9, b"heartbeat")]
+    block = fastlog_py.compress_columns(rows, fastlog_py.Codec("zstd"))
+    assert fastlog_py.decompress_columns(block, fastlog_py.Codec("zstd")) == [
+        {"ts": 5, "msg": "heartbeat"}, {"ts": 3, "msg": "login "}, {"ts": 9, "msg": "heartbeat"},
+    ]
+
+    for spec in ("lz4:8", "lz4hc", "zstd:3"):
+        codec = fastlog_py.Codec(spec)
+        assert fastlog_py.decompress_json(fastlog_py.compress_json(data, codec), codec) == data
+    trained = fastlog_py.Codec.train([b"pid=%d user=svc cmd=heartbeat" % i for i in range(2000)], 4096)
+    assert trained.name == "zstd-dict" and trained.dictionary
+    assert trained.decompress(trained.compress(b"pid=7 user=svc")) == b"pid=7 user=svc"
 
     try:
         fastlog_py.decompress_json(b"not-lz4")
@@ -14,6 +62,34 @@ def main():
     else:
         raise AssertionError("Expected decompress_json to fail on invalid LZ4")
 
+    rb = fastlog_py.RingBuffer(1024 * 1024)
+    rb.push(b"one", ts=1)
+    assert rb.push_many([b"two", b"three"], ts=2) == 2
+    assert rb.push_many(b"fourfive", [0, 4, 8], ts=3) == 2
+    assert rb.dump() == [b"one", b"two", b"three", b"four", b"five"]
+    assert rb.records()[0] == (1, b"one")
+    assert len(rb) == 5
+    assert rb.seq_range(2, 3) == (1, 3)
+    assert rb.records_seq(3, 10) == [(3, b"four"), (3, b"five")]
+    ts, offsets, lengths, data = rb.columns(2, 3)
+    assert ts == (2).to_bytes(8, "little") * 2
+    assert lengths == b"\x03\x00\x00\x00\x05\x00\x00\x00" and data == b"twothree"
+    rb.clear()
+    assert rb.dump() == []
+
+    # An oversize batch evicts everything and keeps its newest events
+    small = fastlog_py.RingBuffer(80)
+    small.push(b"old", ts=1)
+    assert small.push_many([b"a" * 20, b"b" * 20, b"c" * 20], ts=2) == 2
+    assert small.dump() == [b"b" * 20, b"c" * 20]
+    assert small.seq_range(0, 10) == (2, 4)
+    try:
+        small.push_many([b"x", b"y" * 100])
+    except Exception:
+        pass
+    else:
+        raise AssertionError("Expected push_many to reject an event larger than the ring")
+
 
 if __name__ == "__main__":
     main()
@@ -1,27 +1,45 @@
 import argparse
-from .main import do_start, do_stop, do_status, do_flush, do_replay
+from .commands import do_start, do_stop, do_status, do_pause, do_resume, do_flush, do_replay
 
 def run_cli():
     p = argparse.ArgumentParser(prog="ttfr", description="Time Travel Forensics Recorder")
     sub = p.add_subparsers(dest="command")
 
-    sub.add_parser("start")
+    st = sub.add_parser("start")
+    st.add_argument("--listen", action="append", default=None)
+    st.add_argument("--framing", choices=["line", "length"], default="line")
+    st.add_argument("--shared", default=None)
+    st.add_argument("--ring-file", default=None)
+    st.add_argument("--triggers", action="store_true")
+    st.add_argument("--rules", default=None)
+    st.add_argument("--foreground", action="store_true")
     sub.add_parser("stop")
     sub.add_parser("status")
+    sub.add_parser("pause")
+    sub.add_parser("resume")
 
     f = sub.add_parser("flush")
     f.add_argument("--reason", required=True)
+    f.add_argument("--last", type=float, default=None)
 
     r = sub.add_parser("replay")
     r.add_argument("path")
+    r.add_argument("--start", default=None)
+    r.add_argument("--end", default=None)
+    r.add_argument("--speed", type=float, default=None)
+    r.add_argument("--sink", dest="sinks", action="append", default=None)
 
     args = p.parse_args()
 
-    if args.command == "start": do_start()
+    if args.command == "start": do_start(args.listen, args.framing, args.foreground, args.shared, args.ring_file,
+                                          args.triggers, args.rules)
     elif args.command == "stop": do_stop()
     elif args.command == "status": do_status()
-    elif args.command == "flush": do_flush(args.reason)
-    elif args.command == "replay": do_replay(args.path)
+    elif args.command == "pause": do_pause()
+    elif args.command == "resume": do_resume()
+    elif args.command == "flush": do_flush(args.reason, args.last)
+    elif args.command == "replay":
+        do_replay(args.path, args.start, args.end, args.speed, args.sinks or ["stdout"])
     else:
         p.print_help()
 
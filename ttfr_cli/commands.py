@@ -0,0 +1,99 @@
+import sys
+from . import recorder
+from .utils import error, info, success
+
+# Plain-function entry points behind both CLIs: cli.py (argparse, the
+# `ttfr` script) and main.py (click). Nothing heavy is imported here;
+# each command pulls in what it needs when it runs.
+
+
+def do_start(listen=None, framing="line", foreground=False, shared=None, ring_file=None,
+             triggers=False, rules=None):
+    listen = list(listen or ()) or None
+    if foreground:
+        from .daemon import Daemon
+        success("TTFR running (Ctrl-C to stop).")
+        Daemon(listen=listen, framing=framing, shared=shared, ring_file=ring_file,
+               triggers=triggers, rules=rules).run()
+        return None
+    pid = recorder.start(listen, framing, shared=shared, ring_file=ring_file,
+                         triggers=triggers, rules=rules)
+    success(f"TTFR running (pid {pid}).")
+    return pid
+
+
+def do_stop():
+    if recorder.stop():
+        success("TTFR stopped.")
+    else:
+        info("TTFR is not running.")
+
+
+def do_status():
+    status = recorder.status()
+    if status is None:
+        info("Status: STOPPED")
+        return None
+    info(f"Status: {'PAUSED' if status['paused'] else 'RUNNING'} (pid {status['pid']})")
+    info(" ".join(f"{k}={v}" for k, v in status.items() if k not in ("pid", "paused")))
+    return status
+
+
+def _control(cmd, **args):
+    from .control import call
+
+    try:
+        return call(cmd, **args)
+    except OSError:
+        error("No recorder is running; start one with `ttfr start`.")
+        sys.exit(1)
+
+
+def do_pause():
+    _control("pause")
+    success("TTFR paused.")
+
+
+def do_resume():
+    _control("resume")
+    success("TTFR resumed.")
+
+
+def do_flush(reason="manual", last=None):
+    reply = _control("flush", reason=reason, last=last, wait=True)
+    success(f"Snapshot saved → {reply['path']} ({reply['events']} events)")
+    return reply["path"]
+
+
+def do_replay(path, start=None, end=None, speed=None, sinks=("stdout",)):
+    from .replay import make_sink, replay as _replay
+    return _replay(path, start, end, speed, [make_sink(s) for s in sinks])
+
+
+def do_detect(path, rules=None, start=None, end=None):
+    import time
+    from .replay import parse_time
+    from .triggers import MitreMatcher, load_rules, scan_snapshot
+
+    matcher = MitreMatcher(load_rules(rules) if rules else None)
+    t0 = time.perf_counter()
+    hits = scan_snapshot(path, matcher, parse_time(start), parse_time(end))
+    dt = time.perf_counter() - t0
+
+    for technique in sorted(hits):
+        info(f"{technique}: {len(hits[technique])} events")
+    success(f"{len(hits)} of {len(matcher.techniques)} techniques matched in {dt:.2f}s")
+    return hits
+
+
+def do_recompress(src, dst, codec="zstd:19"):
+    import os
+    from ttfr_fastlog import recompress_snapshot
+
+    n = recompress_snapshot(src, dst, codec)
+    before, after = os.path.getsize(src), os.path.getsize(dst)
+    success(
+        f"Recompressed {n} events with {codec}: {before:,} → {after:,} bytes "
+        f"({after / before if before else 0:.1%})"
+    )
+    return n
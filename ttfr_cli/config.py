@@ -1,3 +1,29 @@
 DEFAULT_BUFFER_MB = 1024     # 1GB RAM buffer
 FLUSH_DIR = "snapshots"
 
+
+# Inline triggers: seconds kept before the first hit / after the last
+TRIGGER_PRE_SECONDS = 30
+TRIGGER_POST_SECONDS = 10
+TRIGGER_MAX_WINDOW = 300     # cap on one debounced flush window
+
+# Network listener (`ttfr start`)
+LISTEN_ADDRS = ["udp:127.0.0.1:5140", "tcp:127.0.0.1:5140"]
+LISTEN_BATCH_EVENTS = 4096   # hand a batch to ingest once it holds this many
+LISTEN_MAX_BATCHES = 64      # batches queued for ingest before reads pause
+LISTEN_MAX_EVENT = 65536     # longer events are dropped
+LISTEN_UDP_RCVBUF = 4 << 20  # kernel receive buffer asked for UDP endpoints
+
+# Recorder daemon: control socket (JSON lines) and log file
+CONTROL_SOCKET = "/tmp/ttfr-control.sock"
+DAEMON_LOG = "snapshots/ttfr.log"
+
+# Shared-memory ring (`ttfr start --shared PATH`) for local collectors
+SHARED_LANES = 16            # producer processes that can attach at once
+SHARED_LANE_MB = 8           # ring size per producer
+SHARED_POLL = 0.001          # seconds the recorder sleeps when every lane is empty
+
+# Crash-durable ring (`ttfr start --ring-file PATH`): the engine's ring
+# lives in that file and is recovered from it on the next start
+RING_FILE_MB = 512           # ring size when the file is created
+RING_SYNC_INTERVAL = 1.0     # seconds between msyncs of new writes
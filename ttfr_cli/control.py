@@ -0,0 +1,58 @@
+import json
+import socket
+
+from .config import CONTROL_SOCKET
+
+# ==========================================================
+#   CONTROL CLIENT
+# ==========================================================
+#   The client side of the recorder daemon's control socket (protocol in
+#   daemon.py). Kept apart from the daemon so that `ttfr status` and
+#   friends import only socket and json, not asyncio.
+
+
+class ControlClient:
+    """
+    One connection to the daemon's control socket; keep it open to
+    make many calls.
+
+        with ControlClient() as c:
+            c.call("flush", reason="alert", last=60)
+    """
+
+    def __init__(self, path=CONTROL_SOCKET, timeout=30.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.file = self.sock.makefile("rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def call(self, cmd, **args):
+        """Send one command and return its reply; RuntimeError if it failed."""
+        self.sock.sendall(json.dumps({"cmd": cmd, **args}).encode("utf-8") + b"\n")
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("recorder closed the control connection")
+        reply = json.loads(line)
+        if not reply.pop("ok"):
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def call(cmd, control=CONTROL_SOCKET, **args):
+    """One-off control call; OSError if no recorder is running."""
+    with ControlClient(control) as c:
+        return c.call(cmd, **args)
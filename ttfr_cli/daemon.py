@@ -0,0 +1,332 @@
+import asyncio
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from .config import (
+    CONTROL_SOCKET, DAEMON_LOG, LISTEN_ADDRS, RING_FILE_MB, RING_SYNC_INTERVAL, SHARED_LANE_MB,
+    SHARED_LANES, SHARED_POLL,
+)
+from .control import ControlClient, call
+from .utils import info
+
+# ==========================================================
+#   RECORDER DAEMON
+# ==========================================================
+#   `ttfr start` runs one long-lived recorder process that owns the
+#   engine and the network listener. Every other command talks to it
+#   over a Unix control socket, one JSON object per line each way:
+#
+#       → {"cmd": "status"}
+#       ← {"ok": true, "events": 1234, ...}
+#
+#   Commands: ping, status, flush, result, pause, resume, stop. A flush
+#   answers as soon as its window is frozen, with a handle
+#   ({"id": n, "path": ...}) that "result" polls or waits on; pass
+#   "wait": true to flush to get the result in one call. Failures come
+#   back as {"ok": false, "error": "..."}.
+#
+#   Control calls run on the listener's event loop and never wait for
+#   ingest beyond one engine lock hold, so they stay fast under load.
+#
+#   With ``shared``, local collectors can also write into a
+#   shared-memory ring (ttfr_fastlog.SharedRing) that a pump thread
+#   drains into the engine. With ``ring_file``, the engine's ring is a
+#   ttfr_fastlog.DurableRingBuffer in that file, recovered on start.
+#   With ``triggers``, MITRE rules (``rules``: a JSON ruleset path,
+#   default triggers.DEFAULT_RULES) run inline on the daemon's engine
+#   and a hit flushes a window of it to snapshots/.
+#
+#   The control socket is mode 0600, and a flush reason must match
+#   _REASON since it becomes part of the snapshot's file name.
+
+_REASON = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class Daemon:
+    """The recorder process: engine + Listener + control socket."""
+
+    def __init__(self, control=CONTROL_SOCKET, listen=None, framing="line", engine=None,
+                 shared=None, ring_file=None, triggers=False, rules=None):
+        from .engine import TTFR_Engine, get_engine
+        from .listener import Listener
+
+        self.control = control
+        self.ring_file = ring_file
+        if engine is None and ring_file:
+            import ttfr_fastlog
+
+            ring = ttfr_fastlog.DurableRingBuffer(
+                ring_file, None if os.path.exists(ring_file) else RING_FILE_MB << 20,
+                sync_interval=RING_SYNC_INTERVAL,
+            )
+            info(f"Ring file {ring_file}: {len(ring)} events recovered")
+            engine = TTFR_Engine(ring=ring)
+        self.engine = engine or get_engine()
+        if triggers or rules:
+            from .triggers import load_rules
+
+            self.engine.enable_triggers(load_rules(rules) if rules else None)
+            info(f"Inline triggers on ({len(self.engine.triggers.matcher.techniques)} techniques)")
+        self.listener = Listener(listen or LISTEN_ADDRS, self.engine, framing=framing)
+        self.shared = shared     # path of the shared-memory ring, if any
+        self._ring = None
+        self._pumper = None
+        self._pumping = threading.Event()
+        self.started = None
+        self._flushes = {}     # id -> (path, Future of the event count)
+        self._next_id = 0
+        self._stop = None
+        self._clients = set()
+
+    def run(self):
+        """Serve until stopped (``stop`` command, SIGTERM or SIGINT)."""
+        asyncio.run(self.serve())
+
+    async def serve(self, ready=None):
+        """
+        Serve on the running loop. ``ready`` (a threading.Event) is set
+        once the control socket accepts calls.
+        """
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        _claim(self.control)
+        await self.listener.open()
+        if self.shared:
+            self._open_shared()
+        server = await asyncio.start_unix_server(self._client, self.control)
+        os.chmod(self.control, 0o600)     # control calls are for this user only
+        self.started = time.time()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (RuntimeError, ValueError, NotImplementedError):
+                pass    # not on the main thread
+        info(f"Recorder daemon {os.getpid()} listening for control calls on {self.control}")
+        if ready is not None:
+            ready.set()
+
+        try:
+            await self._stop.wait()
+        finally:
+            server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self.listener.close()
+            if self._pumper is not None:
+                self._pumping.set()
+                await loop.run_in_executor(None, self._pumper.join)
+            pending = [f for _, f in self._flushes.values() if not f.done()]
+            if pending:
+                await asyncio.gather(*map(asyncio.wrap_future, pending), return_exceptions=True)
+            if self.engine.triggers is not None:
+                # Writes the windows of hits still pending
+                await loop.run_in_executor(None, self.engine.disable_triggers)
+            if self.ring_file:
+                with self.engine.lock:
+                    self.engine.buffer.close()
+            if os.path.exists(self.control):
+                os.unlink(self.control)
+            info("Recorder daemon stopped.")
+
+    def _open_shared(self):
+        import ttfr_fastlog
+
+        self._ring = ttfr_fastlog.SharedRing(self.shared, SHARED_LANES, SHARED_LANE_MB << 20)
+        self._pumper = threading.Thread(target=self._pump, name="ttfr-shared", daemon=True)
+        self._pumper.start()
+        info(f"Draining shared ring {self.shared} ({SHARED_LANES} lanes of {SHARED_LANE_MB} MB)")
+
+    def _pump(self):
+        """Drain the shared ring into the engine until stopped, then empty it."""
+        ring, engine, stopping = self._ring, self.engine, self._pumping
+        try:
+            while not stopping.is_set():
+                if not ring.pump(engine):
+                    stopping.wait(SHARED_POLL)
+            while ring.pump(engine):
+                pass
+        finally:
+            ring.close()
+
+    async def _client(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    cmd = request.pop("cmd", None)
+                    handler = self._COMMANDS.get(cmd)
+                    if handler is None:
+                        raise ValueError(f"unknown command '{cmd}'")
+                    reply = {"ok": True, **await handler(self, **request)}
+                except Exception as e:
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    # ------------------------------------------------------
+    #   COMMANDS
+    # ------------------------------------------------------
+    async def ping(self):
+        return {"pid": os.getpid()}
+
+    async def status(self):
+        import ttfr_fastlog
+
+        engine = self.engine
+        with engine.lock:
+            events, used = len(engine.buffer), engine.buffer.used
+        sync_error = getattr(engine.buffer, "sync_error", None)
+        shared = self._ring.stats() if self._ring is not None else {}
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 3),
+            "backend": ttfr_fastlog.FASTLOG_BACKEND,
+            "paused": self.listener.paused,
+            "events": events,
+            "used_bytes": used,
+            "capacity_bytes": engine.buffer.capacity,
+            "ring_file": self.ring_file,
+            "sync_error": None if sync_error is None else str(sync_error),
+            "trigger_hits": engine.triggers.hits if engine.triggers is not None else None,
+            "flushes_pending": sum(not f.done() for _, f in self._flushes.values()),
+            "addresses": [str(a) for a in self.listener.addresses],
+            **self.listener.stats.as_dict(),
+            **ttfr_fastlog.memory_report(),
+            **{f"shared_{k}": v for k, v in shared.items()},
+        }
+
+    async def flush(self, reason="manual", last=None, start_ts=None, end_ts=None, wait=False):
+        from .trigger import snapshot_path
+
+        if not isinstance(reason, str) or not _REASON.fullmatch(reason):
+            # It ends up in the snapshot's file name
+            raise ValueError(f"invalid reason {reason!r} (1-64 of A-Z a-z 0-9 _ -)")
+        if last is not None:
+            start_ts = time.time_ns() - int(last * 1_000_000_000)
+        self._next_id += 1
+        fid = self._next_id
+        path = snapshot_path(reason, fid)
+        self._flushes[fid] = (path, self.engine.flush_async(path, start_ts, end_ts))
+        if len(self._flushes) > 1000:
+            # Forget the oldest finished handle
+            done = next((k for k, (_, f) in self._flushes.items() if f.done()), None)
+            self._flushes.pop(done, None)
+        if wait:
+            return await self.result(fid)
+        return {"id": fid, "path": path}
+
+    async def result(self, id, wait=True):
+        if id not in self._flushes:
+            raise ValueError(f"unknown flush id {id}")
+        path, future = self._flushes[id]
+        if wait:
+            await asyncio.wrap_future(future)
+        reply = {"id": id, "path": path, "done": future.done()}
+        if future.done():
+            if future.exception() is not None:
+                raise RuntimeError(f"flush {id} failed: {future.exception()}")
+            reply["events"] = future.result()
+        return reply
+
+    async def pause(self):
+        self.listener.pause()
+        return {"paused": True}
+
+    async def resume(self):
+        self.listener.resume()
+        return {"paused": False}
+
+    async def stop(self):
+        asyncio.get_running_loop().call_soon(self._stop.set)
+        return {"pid": os.getpid()}
+
+    _COMMANDS = {
+        "ping": ping,
+        "status": status,
+        "flush": flush,
+        "result": result,
+        "pause": pause,
+        "resume": resume,
+        "stop": stop,
+    }
+
+
+def _claim(path):
+    """Remove a stale control socket; refuse if a recorder answers on it."""
+    if not os.path.exists(path):
+        return
+    try:
+        with ControlClient(path, timeout=1.0) as c:
+            pid = c.call("ping")["pid"]
+    except OSError:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"recorder already running (pid {pid}) on {path}")
+
+
+def spawn(listen=None, framing="line", control=CONTROL_SOCKET, timeout=10.0, shared=None,
+          ring_file=None, triggers=False, rules=None):
+    """
+    Start the daemon as a background process (output to DAEMON_LOG) and
+    wait until it answers; returns its ping reply.
+    """
+    args = [sys.executable, "-m", "ttfr_cli.daemon", "--control", control, "--framing", framing]
+    for spec in listen or ():
+        args += ["--listen", spec]
+    if shared:
+        args += ["--shared", shared]
+    if ring_file:
+        args += ["--ring-file", ring_file]
+    if triggers:
+        args += ["--triggers"]
+    if rules:
+        args += ["--rules", os.path.abspath(rules)]
+    os.makedirs(os.path.dirname(DAEMON_LOG) or ".", exist_ok=True)
+    with open(DAEMON_LOG, "ab") as log:
+        proc = subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True, env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        )
+
+    deadline = time.time() + timeout
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f"recorder exited with status {proc.returncode}; see {DAEMON_LOG}")
+        try:
+            return call("ping", control)
+        except OSError:
+            if time.time() > deadline:
+                proc.terminate()
+                raise RuntimeError(f"recorder did not come up within {timeout}s; see {DAEMON_LOG}")
+            time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(prog="python -m ttfr_cli.daemon", description="TTFR recorder daemon")
+    p.add_argument("--control", default=CONTROL_SOCKET)
+    p.add_argument("--listen", action="append", default=None)
+    p.add_argument("--framing", choices=["line", "length"], default="line")
+    p.add_argument("--shared", default=None)
+    p.add_argument("--ring-file", default=None)
+    p.add_argument("--triggers", action="store_true")
+    p.add_argument("--rules", default=None)
+    args = p.parse_args()
+    Daemon(args.control, args.listen, args.framing, shared=args.shared,
+           ring_file=args.ring_file, triggers=args.triggers, rules=args.rules).run()
@@ -1,6 +1,15 @@
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from time import time_ns
+
 import ttfr_fastlog
 from .utils import info
-import time
+
+# Records copied per lock hold when a frozen view is read or rescued
+FREEZE_PAGE = 1024
 
 # ==========================================================
 #   GLOBAL SINGLETON
@@ -23,39 +32,279 @@ def get_engine():
 #   MAIN ENGINE
 # ==========================================================
 class TTFR_Engine:
-    def __init__(self, buffer_mb=512):
-        info(f"Allocating optimized zero-copy buffer: {buffer_mb} MB")
-        self.buffer = ttfr_fastlog.RingBuffer(buffer_mb * 1024 * 1024)
-        self.events = []  # Keep original JSON form for MITRE replay
+    def __init__(self, buffer_mb=512, codec=None, stage_events=0, ring=None):
+        # ring: an existing RingBuffer (e.g. ttfr_fastlog.PyRingBuffer) to use
+        if ring is None:
+            info(f"Allocating optimized zero-copy buffer: {buffer_mb} MB")
+            ring = ttfr_fastlog.RingBuffer(buffer_mb * 1024 * 1024)
+        self.buffer = ring
+        # Snapshot codec: a ttfr_fastlog.Codec or a spec like "zstd:3"
+        self.codec = codec
+        # Serializes ring access between ingest and background flushes
+        self.lock = threading.Lock()
+        self.triggers = None
+        self._freezes = []     # frozen views still being written out
+        self._flusher = None   # single flush thread, created on first use
+        # Multi-producer staging, see STAGING below
+        self.stage_events = stage_events
+        self._local = threading.local()
+        self._stages = []      # (thread, deque of (ts, msg)) per producer
 
     # ------------------------------------------------------
     #   INGEST
     # ------------------------------------------------------
     def ingest(self, msg: bytes):
         """
-        Ingest raw event bytes into RingBuffer
-        and store decoded event for replay.
+        Ingest raw event bytes into RingBuffer.
+        The event is stamped now; nothing is decoded here.
+        """
+        if self.stage_events:
+            stage = self._stage()
+            stage.append((time_ns(), msg))
+            if len(stage) >= self.stage_events:
+                with self.lock:
+                    self._merge()
+        else:
+            with self.lock:
+                if self._freezes:
+                    self._protect(len(msg), 1)
+                self.buffer.push(msg)
+        if self.triggers is not None:
+            self.triggers.check(msg)
+
+    def ingest_many(self, events, offsets=None, stamps=None):
+        """
+        Ingest a batch in one call: either an iterable of raw events, or
+        one contiguous buffer (e.g. a socket read) split by ``offsets``.
+        Every event in the batch shares one timestamp unless ``stamps``
+        gives each its own (ns).
         """
-        ts = int(time.time_ns())
-        text = msg.decode("utf-8", errors="ignore")
+        if offsets is None and not isinstance(events, (list, tuple)):
+            # Read more than once (freeze protection, triggers); push_many
+            # makes a list of it anyway
+            events = list(events)
+        with self.lock:
+            if self._stages:
+                self._merge()
+            if self._freezes:
+                if offsets is None:
+                    self._protect(sum(map(len, events)), len(events))
+                else:
+                    self._protect(offsets[-1] - offsets[0], len(offsets) - 1)
+            n = self.buffer.push_many(events, offsets, stamps=stamps)
+        if self.triggers is not None:
+            self.triggers.check_many(events, offsets)
+        return n
+
+    def clear(self):
+        """Drop every buffered event."""
+        with self.lock:
+            self._merge()
+            if self._freezes:
+                self._protect(self.buffer.capacity + 1, 1)
+            self.buffer.clear()
+
+    # ------------------------------------------------------
+    #   STAGING
+    # ------------------------------------------------------
+    #   With stage_events > 0, ingest() takes no lock: each producer
+    #   thread stamps its events into its own deque. Whichever thread
+    #   fills its stage first takes the lock and merges every stage
+    #   into the ring in one push_many, sorted by stamp, so the lock is
+    #   taken once per batch instead of once per event. Anything that
+    #   reads the ring (snapshots, freeze, arrays) merges first, so a
+    #   flush sees every event ingested before it, in time order.
+    #
+    #   Producers only append to their own deque and the merging
+    #   thread only pops from the left, which deques do atomically.
+
+    def _stage(self):
+        """This thread's staging deque, registered on first use."""
+        try:
+            return self._local.stage
+        except AttributeError:
+            stage = self._local.stage = deque()
+            with self.lock:
+                self._stages.append((threading.current_thread(), stage))
+            return stage
+
+    def flush_staged(self):
+        """Merge every producer's staged events into the ring now."""
+        with self.lock:
+            return self._merge()
 
-        # Store in ring buffer
-        self.buffer.push(msg)
+    def _merge(self):
+        """Move all staged events into the ring, oldest first (lock held)."""
+        batch = []
+        for thread, stage in self._stages:
+            popleft = stage.popleft
+            batch.extend([popleft() for _ in range(len(stage))])
+        # Forget threads that are gone once their stage is drained
+        self._stages = [(t, q) for t, q in self._stages if q or t.is_alive()]
+        if not batch:
+            return 0
 
-        # Store structured event for batch compression
-        self.events.append({"ts": ts, "msg": text})
+        # Each stage is already in order; the sort just interleaves them
+        batch.sort(key=itemgetter(0))
+        stamps = array("q", map(itemgetter(0), batch))
+        events = list(map(itemgetter(1), batch))
+        if self._freezes:
+            self._protect(sum(map(len, events)), len(events))
+        return self.buffer.push_many(events, stamps=stamps)
+
+    # ------------------------------------------------------
+    #   TRIGGERS
+    # ------------------------------------------------------
+    def enable_triggers(self, rules=None, **window):
+        """
+        Evaluate MITRE rules (``{technique: [patterns]}``, default
+        triggers.DEFAULT_RULES) on every ingested event. A match
+        schedules a debounced pre/post-window flush of this engine on a
+        background thread; ``window`` takes FlushScheduler's
+        pre/post/max_window.
+        """
+        from functools import partial
+        from . import trigger
+        from .triggers import FlushScheduler, InlineTrigger, MitreMatcher
+
+        self.disable_triggers()
+        scheduler = FlushScheduler(partial(trigger.flush, engine=self), **window)
+        self.triggers = InlineTrigger(MitreMatcher(rules), scheduler)
+        return self.triggers
+
+    def disable_triggers(self):
+        """Stop evaluating rules; pending flushes are written first."""
+        triggers, self.triggers = self.triggers, None
+        if triggers is not None:
+            triggers.close()
 
     # ------------------------------------------------------
     #   SNAPSHOT
     # ------------------------------------------------------
-    def dump_snapshot(self):
+    def dump_snapshot(self, start_ts=None, end_ts=None):
         """
         Returns a compressed FASTLOG blob containing structured JSON events.
         Exactly what benchmark_phase_c expects.
+        Events are decoded from the ring only now, at dump time; pass
+        ``start_ts``/``end_ts`` (ns) to dump just that window.
         """
-        if not self.events:
-            return b""
-
-        blob = ttfr_fastlog.compress_json(self.events)
+        with self.lock:
+            self._merge()
+            if not len(self.buffer):
+                return b""
+            records = list(self.buffer.records(start_ts, end_ts))
+        events = [
+            {"ts": ts, "msg": raw.decode("utf-8", errors="ignore")}
+            for ts, raw in records
+        ]
+        blob = ttfr_fastlog.compress_json(events)
         return blob
 
+    def write_snapshot(self, path, start_ts=None, end_ts=None, codec=None):
+        """
+        Stream the buffered events (optionally just ``[start_ts, end_ts)``)
+        into a .ttfr file block by block, so memory stays bounded by one
+        block whatever the buffer size. The snapshot holds exactly the
+        events buffered when the call was made. ``codec`` overrides the
+        engine's codec for this snapshot. Returns the number of events.
+        """
+        return self._write_frozen(path, self.freeze(start_ts, end_ts), codec)
+
+    def flush_async(self, path, start_ts=None, end_ts=None, codec=None):
+        """
+        Freeze the window now and write it on the background flush
+        thread. Requests are written one at a time, in order. Returns a
+        Future of the number of events written.
+        """
+        frozen = self.freeze(start_ts, end_ts)
+        with self.lock:
+            if self._flusher is None:
+                self._flusher = ThreadPoolExecutor(1, thread_name_prefix="ttfr-flush")
+        return self._flusher.submit(self._write_frozen, path, frozen, codec)
+
+    def arrays(self, start_ts=None, end_ts=None):
+        """
+        The buffered events in ``[start_ts, end_ts)`` as
+        ttfr_fastlog.EventArrays (needs numpy), copied out under the lock.
+        """
+        with self.lock:
+            self._merge()
+            return ttfr_fastlog.ring_arrays(self.buffer, start_ts, end_ts)
+
+    def train_codec(self, level=3, size=112640, samples=100_000):
+        """
+        A zstd-dict codec whose dictionary is trained on the newest
+        ``samples`` buffered events. Assign it to ``engine.codec`` (or
+        pass it per snapshot) to use it.
+        """
+        with self.lock:
+            self._merge()
+            first, end = self.buffer.seq_range()
+            records = self.buffer.records_seq(max(first, end - samples), end)
+        return ttfr_fastlog.Codec.train([raw for _, raw in records], size, level)
+
+    # ------------------------------------------------------
+    #   COPY-ON-SNAPSHOT
+    # ------------------------------------------------------
+    #   freeze() only records the window's sequence numbers, so it is
+    #   O(1) whatever the buffer size. The writer reads the frozen
+    #   records straight from the ring, a page at a time. If ingest is
+    #   about to overwrite records it has not read yet, ingest copies
+    #   them aside first (_protect), so the snapshot stays exactly what
+    #   was buffered at freeze time while ingest never waits for a
+    #   flush to finish.
+
+    def freeze(self, start_ts=None, end_ts=None):
+        """Pin the records currently buffered in ``[start_ts, end_ts)``."""
+        with self.lock:
+            self._merge()
+            first, end = self.buffer.seq_range(start_ts, end_ts)
+            frozen = _Frozen(first, end)
+            if first < end:
+                self._freezes.append(frozen)
+        return frozen
+
+    def _protect(self, nbytes, count):
+        """Copy aside frozen records that the next write would evict (lock held)."""
+        buf = self.buffer
+        for frozen in self._freezes:
+            while frozen.cursor < frozen.end and buf.headroom(frozen.cursor, count) < nbytes:
+                stop = min(frozen.cursor + FREEZE_PAGE, frozen.end)
+                frozen.saved.extend(buf.records_seq(frozen.cursor, stop))
+                frozen.cursor = stop
+
+    def _frozen_records(self, frozen):
+        """Yield a frozen view's records, oldest first."""
+        buf, lock = self.buffer, self.lock
+        try:
+            while True:
+                with lock:
+                    if frozen.saved:
+                        batch, frozen.saved = frozen.saved, []
+                    elif frozen.cursor < frozen.end:
+                        stop = min(frozen.cursor + FREEZE_PAGE, frozen.end)
+                        batch = buf.records_seq(frozen.cursor, stop)
+                        frozen.cursor = stop
+                    else:
+                        return
+                yield from batch
+        finally:
+            with lock:
+                if frozen in self._freezes:
+                    self._freezes.remove(frozen)
+
+    def _write_frozen(self, path, frozen, codec=None):
+        return ttfr_fastlog.write_snapshot(
+            path, self._frozen_records(frozen), codec=codec or self.codec
+        )
+
+
+class _Frozen:
+    """Records ``[cursor, end)`` still in the ring, plus those copied aside."""
+
+    __slots__ = ("cursor", "end", "saved")
+
+    def __init__(self, first, end):
+        self.cursor = first
+        self.end = end
+        self.saved = []
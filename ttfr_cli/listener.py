@@ -0,0 +1,406 @@
+import asyncio
+import os
+import queue
+import socket
+import struct
+import threading
+
+from .config import LISTEN_BATCH_EVENTS, LISTEN_MAX_BATCHES, LISTEN_MAX_EVENT, LISTEN_UDP_RCVBUF
+from .utils import info, warn
+
+# ==========================================================
+#   NETWORK LISTENER
+# ==========================================================
+#   asyncio front end for `ttfr start`. Agents send events over UDP,
+#   TCP or a Unix stream socket, either one per line ("line") or each
+#   behind a big-endian u32 length ("length"); a UDP datagram may carry
+#   several. Reads from every connection are gathered into batches on
+#   the event loop and handed to one ingest thread, which writes each
+#   batch with a single engine.ingest_many call.
+#
+#   Backpressure: at most max_batches batches wait for the ingest
+#   thread. Once that queue is full, stream connections stop being
+#   read (their senders block in the kernel) until it drains to half.
+#   UDP cannot be paused, so datagrams arriving meanwhile are dropped
+#   and counted. pause() / resume() do the same on request.
+
+_LEN = struct.Struct(">I")
+FRAMINGS = ("line", "length")
+
+
+def parse_listen(spec):
+    """
+    ``(kind, address)`` from a CLI spec: ``udp:HOST:PORT``,
+    ``tcp:HOST:PORT`` or ``unix:PATH``.
+    """
+    kind, _, rest = spec.partition(":")
+    if kind == "unix" and rest:
+        return kind, rest
+    if kind in ("udp", "tcp"):
+        host, _, port = rest.rpartition(":")
+        if host and port.isdigit():
+            return kind, (host, int(port))
+    raise ValueError(f"invalid listen address '{spec}' (udp:HOST:PORT, tcp:HOST:PORT, unix:PATH)")
+
+
+def _family(host):
+    return socket.AF_INET6 if ":" in host else socket.AF_INET
+
+
+def split_lines(buf, max_event):
+    """
+    Complete newline-terminated events in ``buf``, the rest, and how
+    many complete lines were dropped for being over ``max_event`` bytes.
+    """
+    *events, rest = buf.split(b"\n")
+    if b"" in events:
+        events = list(filter(None, events))
+    dropped = 0
+    if events and len(buf) - len(rest) > max_event and max(map(len, events)) > max_event:
+        kept = [e for e in events if len(e) <= max_event]
+        dropped = len(events) - len(kept)
+        events = kept
+    return events, rest, dropped
+
+
+def split_length(buf, max_event):
+    """
+    Complete u32-length-prefixed events in ``buf``, the rest (which
+    starts with an over-long prefix if one stopped the split) and 0,
+    the count split_lines returns for dropped events.
+    """
+    events = []
+    pos, end = 0, len(buf)
+    unpack = _LEN.unpack_from
+    while pos + 4 <= end:
+        (n,) = unpack(buf, pos)
+        if n > max_event or pos + 4 + n > end:
+            break
+        events.append(buf[pos + 4 : pos + 4 + n])
+        pos += 4 + n
+    return events, buf[pos:], 0
+
+
+class ListenerStats:
+    """Counters of one listener; updated without locks, read any time."""
+
+    # received: events framed; ingested: written to the ring; dropped:
+    # discarded (UDP while throttled or paused, over-long); rejected:
+    # refused by the ring; throttles: times reads stopped for backpressure
+    __slots__ = ("received", "ingested", "dropped", "rejected", "batches", "throttles",
+                 "connections", "errors")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _StreamProtocol(asyncio.Protocol):
+    """One TCP / Unix connection: reassembles events across reads."""
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.transport = None
+        self.tail = b""
+        self.skipping = False   # inside an over-long line, dropping to its end
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.listener._streams.add(transport)
+        self.listener.stats.connections += 1
+        if self.listener._throttled or self.listener.paused:
+            transport.pause_reading()
+
+    def connection_lost(self, exc):
+        listener = self.listener
+        listener._streams.discard(self.transport)
+        if self.tail and listener.framing == "line" and not self.skipping:
+            # Last line without a newline
+            listener._add([self.tail])
+        self.tail = b""
+
+    def data_received(self, data):
+        listener = self.listener
+        buf = self.tail + data if self.tail else data
+        if self.skipping:
+            # Still inside the over-long line dropped earlier: skip to its end
+            end = buf.find(b"\n")
+            if end < 0:
+                return
+            buf = buf[end + 1 :]
+            self.skipping = False
+        events, self.tail, dropped = listener._split(buf, listener.max_event)
+        listener.stats.dropped += dropped
+        listener._add(events)
+
+        tail = self.tail
+        if listener.framing == "length":
+            if len(tail) >= 4 and _LEN.unpack_from(tail)[0] > listener.max_event:
+                # No way to resynchronize past a bad length
+                warn(f"Closing connection: event exceeds the {listener.max_event} byte limit")
+                listener.stats.errors += 1
+                self.tail = b""
+                self.transport.close()
+        elif len(tail) > listener.max_event:
+            listener.stats.dropped += 1
+            self.tail = b""
+            self.skipping = True
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener):
+        self.listener = listener
+
+    def datagram_received(self, data, addr):
+        listener = self.listener
+        events, rest, dropped = listener._split(data, listener.max_event)
+        listener.stats.dropped += dropped
+        if rest:
+            if listener.framing == "length":
+                listener.stats.errors += 1
+            elif len(rest) > listener.max_event:
+                listener.stats.dropped += 1
+            else:
+                events.append(rest)
+        listener._add(events, lossy=True)
+
+    def error_received(self, exc):
+        self.listener.stats.errors += 1
+
+
+class Listener:
+    """
+    Receive events on ``listen`` specs (see parse_listen) and ingest
+    them into ``engine`` (default: the global engine).
+
+        listener = Listener(["udp:0.0.0.0:5140", "tcp:0.0.0.0:5140"])
+        listener.start()            # background thread
+        ...
+        listener.stop()
+
+    ``framing`` is ``line`` or ``length``. No event over ``max_event``
+    bytes is ingested or buffered: a longer line (or UDP datagram line)
+    is dropped, a longer length prefix closes the connection. A batch goes to the
+    ingest thread once it holds ``batch_events`` events, or sooner when
+    that thread is idle; ``max_batches`` bounds the batches in flight.
+    """
+
+    def __init__(self, listen, engine=None, framing="line", batch_events=LISTEN_BATCH_EVENTS,
+                 max_batches=LISTEN_MAX_BATCHES, max_event=LISTEN_MAX_EVENT):
+        if framing not in FRAMINGS:
+            raise ValueError(f"unknown framing '{framing}' ({', '.join(FRAMINGS)})")
+        from .engine import get_engine
+
+        self.listen = [parse_listen(s) for s in listen]
+        self.engine = engine or get_engine()
+        self.framing = framing
+        self.batch_events = batch_events
+        self.max_batches = max_batches
+        self.max_event = max_event
+        self.stats = ListenerStats()
+        self.addresses = []     # bound address per endpoint, in listen order
+
+        self._split = split_lines if framing == "line" else split_length
+        self._queue = queue.Queue(max_batches)
+        self._pending = []
+        self._handle = None
+        self._throttled = False   # backpressure: the ingest queue is full
+        self.paused = False       # pause() / resume()
+        self._resuming = False
+        self._waiting = False   # a partial batch waits for the ingest thread
+        self._streams = set()
+        self._endpoints = []
+        self._loop = None
+        self._thread = None
+        self._ingester = None
+        self._closed = None
+
+    # ------------------------------------------------------
+    #   LIFECYCLE
+    # ------------------------------------------------------
+    async def open(self):
+        """Bind every endpoint and start the ingest thread (on the running loop)."""
+        loop = self._loop = asyncio.get_running_loop()
+        self._ingester = threading.Thread(target=self._ingest_loop, name="ttfr-ingest", daemon=True)
+        self._ingester.start()
+
+        for kind, addr in self.listen:
+            if kind == "udp":
+                sock = socket.socket(_family(addr[0]), socket.SOCK_DGRAM)
+                # A deep kernel queue rides out bursts while ingest catches up
+                # (capped by net.core.rmem_max)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, LISTEN_UDP_RCVBUF)
+                sock.bind(addr)
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _DatagramProtocol(self), sock=sock
+                )
+                self._endpoints.append(transport)
+                self.addresses.append(transport.get_extra_info("sockname"))
+            else:
+                if kind == "tcp":
+                    server = await loop.create_server(lambda: _StreamProtocol(self), *addr)
+                else:
+                    if os.path.exists(addr):
+                        os.unlink(addr)
+                    server = await loop.create_unix_server(lambda: _StreamProtocol(self), addr)
+                self._endpoints.append(server)
+                self.addresses.append(server.sockets[0].getsockname())
+            info(f"Listening on {kind}:{self.addresses[-1]}")
+
+    async def close(self):
+        """Stop receiving, ingest whatever was received and stop the ingest thread."""
+        for endpoint in self._endpoints:
+            endpoint.close()
+        for transport in list(self._streams):
+            transport.close()
+        await asyncio.sleep(0)     # let connection_lost run
+        self._endpoints = []
+
+        # put() blocks only while the ingest thread catches up
+        if self._pending:
+            await self._loop.run_in_executor(None, self._queue.put, self._pending)
+            self._pending = []
+        await self._loop.run_in_executor(None, self._queue.put, None)
+        await self._loop.run_in_executor(None, self._ingester.join)
+
+    async def serve(self, stop=None):
+        """open(), run until ``stop`` (an asyncio.Event) is set or cancelled, then close()."""
+        await self.open()
+        try:
+            await (stop.wait() if stop is not None else asyncio.Event().wait())
+        finally:
+            await self.close()
+
+    def start(self):
+        """Run the listener on a background thread; returns once it is bound."""
+        ready = threading.Event()
+        failed = []
+
+        def run():
+            async def main():
+                self._closed = asyncio.Event()
+                try:
+                    await self.open()
+                except Exception as e:
+                    failed.append(e)
+                    ready.set()
+                    return
+                ready.set()
+                try:
+                    await self._closed.wait()
+                finally:
+                    await self.close()
+
+            asyncio.run(main())
+
+        self._thread = threading.Thread(target=run, name="ttfr-listener", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failed:
+            raise failed[0]
+        return self
+
+    def stop(self, timeout=None):
+        """Stop a listener started with start() and wait for its last batch."""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._closed.set)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ------------------------------------------------------
+    #   BATCHING (event loop thread)
+    # ------------------------------------------------------
+    def _add(self, events, lossy=False):
+        if not events:
+            return
+        stats = self.stats
+        stats.received += len(events)
+        if lossy and (self.paused or self._throttled and len(self._pending) >= self.batch_events):
+            stats.dropped += len(events)
+            return
+        self._pending.extend(events)
+        if len(self._pending) >= self.batch_events:
+            self._submit()
+        elif self._handle is None:
+            # Hand over what arrived in this loop iteration
+            self._handle = self._loop.call_soon(self._submit)
+
+    def _submit(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._throttled or not self._pending:
+            return
+        if len(self._pending) < self.batch_events:
+            # The ingest thread is busy: let this batch grow, it asks for it
+            # when idle. The flag goes up before the queue is checked, so
+            # the thread either sees it or left a queue this check finds empty
+            self._waiting = True
+            if self._queue.qsize():
+                return
+            self._waiting = False
+        try:
+            self._queue.put_nowait(self._pending)
+        except queue.Full:
+            self._throttle()
+            return
+        self._pending = []
+        if self._queue.full():
+            self._throttle()
+
+    def _throttle(self):
+        self._throttled = True
+        self.stats.throttles += 1
+        for transport in self._streams:
+            transport.pause_reading()
+
+    def _unthrottle(self):
+        self._resuming = False
+        self._throttled = False
+        if not self.paused:
+            for transport in self._streams:
+                transport.resume_reading()
+        self._submit()
+
+    # ------------------------------------------------------
+    #   PAUSE / RESUME (event loop thread)
+    # ------------------------------------------------------
+    def pause(self):
+        """Stop taking events: stream reads stop, datagrams are dropped."""
+        self.paused = True
+        for transport in self._streams:
+            transport.pause_reading()
+
+    def resume(self):
+        self.paused = False
+        if not self._throttled:
+            for transport in self._streams:
+                transport.resume_reading()
+
+    # ------------------------------------------------------
+    #   INGEST THREAD
+    # ------------------------------------------------------
+    def _ingest_loop(self):
+        get, ingest, stats = self._queue.get, self.engine.ingest_many, self.stats
+        while True:
+            batch = get()
+            if batch is None:
+                return
+            try:
+                ingest(batch)
+            except Exception as e:
+                warn(f"Rejected a batch of {len(batch)} events: {e}")
+                stats.rejected += len(batch)
+            else:
+                stats.ingested += len(batch)
+                stats.batches += 1
+            if self._throttled and not self._resuming and self._queue.qsize() <= self.max_batches // 2:
+                self._resuming = True
+                self._loop.call_soon_threadsafe(self._unthrottle)
+            elif self._waiting and not self._queue.qsize():
+                self._waiting = False
+                self._loop.call_soon_threadsafe(self._submit)
@@ -1,10 +1,11 @@
 import click
 click.echo = lambda *args, **kwargs: None
 
-import sys
 import click
-from . import recorder, trigger
-from .utils import info, success
+from .commands import (
+    do_detect, do_flush, do_pause, do_recompress, do_replay, do_resume, do_start, do_status,
+    do_stop,
+)
 
 
 @click.group()
@@ -18,39 +19,82 @@ def main():
 # -------------------------
 
 @main.command()
-def start():
+@click.option("--listen", "listen", multiple=True,
+              help="udp:HOST:PORT, tcp:HOST:PORT or unix:PATH (repeatable)")
+@click.option("--framing", type=click.Choice(["line", "length"]), default="line",
+              help="Newline-delimited or u32-length-prefixed events")
+@click.option("--shared", default=None,
+              help="Also drain a shared-memory ring at PATH (e.g. /dev/shm/ttfr-ring)")
+@click.option("--ring-file", default=None,
+              help="Keep the ring in this file so it survives restarts and crashes")
+@click.option("--triggers", is_flag=True, help="Flush a window around every MITRE rule hit")
+@click.option("--rules", default=None, help="JSON ruleset for --triggers {technique: [patterns]}")
+@click.option("--foreground", is_flag=True, help="Keep running until interrupted")
+def start(listen, framing, shared, ring_file, triggers, rules, foreground):
     """Start telemetry recording."""
-    recorder.start()
-    success("TTFR running.")
+    do_start(listen, framing, foreground, shared, ring_file, triggers, rules)
 
 
 @main.command()
 def stop():
     """Stop telemetry recording."""
-    recorder.stop()
-    success("TTFR stopped.")
+    do_stop()
 
 
 @main.command()
 def status():
     """Show recorder status."""
-    if recorder.status():
-        info("Status: RUNNING")
-    else:
-        info("Status: STOPPED")
+    do_status()
+
+
+@main.command()
+def pause():
+    """Stop taking events without stopping the recorder."""
+    do_pause()
+
+
+@main.command()
+def resume():
+    """Take events again after pause."""
+    do_resume()
 
 
 @main.command()
 @click.option("--reason", default="manual", help="Flush trigger reason")
-def flush(reason):
+@click.option("--last", type=float, default=None, help="Only the last N seconds")
+def flush(reason, last):
     """Flush the ring buffer and save snapshot."""
-    trigger.flush(reason)
+    do_flush(reason, last)
 
 
 @main.command()
 @click.argument("path")
-def replay(path):
+@click.option("--start", default=None, help="Window start (epoch seconds, ISO-8601 or a span like -5m)")
+@click.option("--end", default=None, help="Window end (epoch seconds, ISO-8601 or a span like -5m)")
+@click.option("--speed", type=float, default=None,
+              help="Pacing multiplier (1 = original timing); omit for max speed")
+@click.option("--sink", "sinks", multiple=True, default=("stdout",),
+              help="stdout, file:PATH, udp:HOST:PORT or tcp:HOST:PORT (repeatable)")
+def replay(path, start, end, speed, sinks):
     """Replay a TTFR snapshot"""
-    from .replay import replay as _replay
-    _replay(path)
+    do_replay(path, start, end, speed, sinks)
 
+
+@main.command()
+@click.argument("path")
+@click.option("--rules", default=None, help="JSON ruleset {technique: [patterns]}")
+@click.option("--start", default=None, help="Window start (epoch seconds, ISO-8601 or a span like -5m)")
+@click.option("--end", default=None, help="Window end (epoch seconds, ISO-8601 or a span like -5m)")
+def detect(path, rules, start, end):
+    """Match MITRE ATT&CK rules against a snapshot"""
+    do_detect(path, rules, start, end)
+
+
+@main.command()
+@click.argument("src")
+@click.argument("dst")
+@click.option("--codec", default="zstd:19",
+              help="lz4[:ACCEL], lz4hc[:LEVEL], zstd[:LEVEL] or zstd-dict[:LEVEL]")
+def recompress(src, dst, codec):
+    """Rewrite a snapshot with another codec (e.g. for archiving)"""
+    do_recompress(src, dst, codec)
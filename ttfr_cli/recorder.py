@@ -1,39 +1,64 @@
-import threading
-import time
-from .engine import get_engine
+from .config import CONTROL_SOCKET
 from .utils import info
 
-running = False
-thread_handle = None
+# The recorder is the daemon in ttfr_cli/daemon.py; these helpers drive
+# it over its control socket so every CLI invocation shares its engine.
 
-def _recorder_loop():
-    global running
-    engine = get_engine()
-    info("Recorder loop active.")
 
-    while running:
-        fake_event = b"cpu=5%, net=12kb/s, msg=heartbeat"
-        engine.ingest(fake_event)
-        time.sleep(0.1)
+def start(listen=None, framing="line", control=CONTROL_SOCKET, shared=None, ring_file=None,
+          triggers=False, rules=None):
+    """
+    Start the recorder daemon listening on ``listen`` (default
+    config.LISTEN_ADDRS, see listener.parse_listen) and, with
+    ``shared``, draining the shared-memory ring at that path. With
+    ``ring_file`` its ring is kept in (and recovered from) that file;
+    with ``triggers`` (or a ``rules`` file) it flushes on MITRE hits.
+    Returns its pid.
+    """
+    from . import daemon
+    from .control import call
 
-    info("Recorder loop ended.")
+    try:
+        pid = call("ping", control)["pid"]
+    except OSError:
+        pass
+    else:
+        info(f"Recorder already running (pid {pid}).")
+        return pid
 
-def start():
-    global running, thread_handle
-    if running:
-        info("Recorder already running.")
-        return
+    pid = daemon.spawn(
+        listen, framing, control, shared=shared, ring_file=ring_file, triggers=triggers, rules=rules
+    )["pid"]
+    info(f"Recorder started (pid {pid}).")
+    return pid
 
-    running = True
-    thread_handle = threading.Thread(target=_recorder_loop, daemon=True)
-    thread_handle.start()
-    info("Recorder started.")
 
-def stop():
-    global running
-    running = False
-    info("Recorder stopped.")
+def stop(control=CONTROL_SOCKET):
+    """Stop the daemon; False if none was running."""
+    from .control import call
 
-def status():
-    return running
+    try:
+        call("stop", control)
+    except OSError:
+        return False
+    return True
 
+
+def status(control=CONTROL_SOCKET):
+    """The daemon's status reply (live counters), or None when stopped."""
+    from .control import call
+
+    try:
+        return call("status", control)
+    except OSError:
+        return None
+
+
+def stats(control=CONTROL_SOCKET):
+    """The listener's counters, or None when stopped."""
+    from .listener import ListenerStats
+
+    reply = status(control)
+    if reply is None:
+        return None
+    return {name: reply[name] for name in ListenerStats.__slots__}
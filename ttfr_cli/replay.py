@@ -1,7 +1,236 @@
-import time, random
-from .utils import info
+import re
+import socket
+import sys
+import time
+from datetime import datetime
 
-def replay(path):
-    info(f"Replaying attack from {path}")
-    time.sleep(0.1)
-    print("Simulated replay OK (optimized version).")
+from ttfr_fastlog import SnapshotReader
+from .utils import info, success, warn
+
+
+_RELATIVE = re.compile(r"-(\d+(?:\.\d+)?)([smhd])")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value, now=None):
+    """
+    Turn a CLI time bound into ns since the epoch: epoch seconds
+    (``1700000000.5``), an ISO-8601 timestamp (``2024-01-01T12:00:00``),
+    or a span before ``now`` (``-90s``, ``-5m``, ``-2h``, ``-1d``).
+    """
+    if value is None:
+        return None
+    relative = _RELATIVE.fullmatch(value.strip())
+    if relative:
+        now = time.time() if now is None else now
+        seconds = now - float(relative.group(1)) * _UNITS[relative.group(2)]
+    else:
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = datetime.fromisoformat(value).timestamp()
+    return int(seconds * 1_000_000_000)
+
+
+# ==========================================================
+#   SINKS
+# ==========================================================
+#   A sink takes one batch (list of event dicts) per call.
+#   Byte sinks re-emit each event's message as one line.
+
+def _lines(batch):
+    data = "\n".join([e.get("msg", "") for e in batch]).encode("utf-8", errors="ignore")
+    return data + b"\n"
+
+
+class StdoutSink:
+    def write(self, batch):
+        data = _lines(batch)
+        sys.stdout.flush()
+        sys.stdout.buffer.write(data)
+        return len(data)
+
+    def close(self):
+        sys.stdout.flush()
+
+
+class FileSink:
+    def __init__(self, path):
+        self.f = open(path, "ab")
+
+    def write(self, batch):
+        data = _lines(batch)
+        self.f.write(data)
+        return len(data)
+
+    def close(self):
+        self.f.close()
+
+
+class TCPSink:
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+
+    def write(self, batch):
+        data = _lines(batch)
+        self.sock.sendall(data)
+        return len(data)
+
+    def close(self):
+        self.sock.close()
+
+
+class UDPSink:
+    """One datagram per event."""
+
+    def __init__(self, host, port):
+        self.addr = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, batch):
+        send, addr, total = self.sock.sendto, self.addr, 0
+        for e in batch:
+            total += send(e.get("msg", "").encode("utf-8", errors="ignore"), addr)
+        return total
+
+    def close(self):
+        self.sock.close()
+
+
+class CallbackSink:
+    """Call ``fn(event)`` per event, or ``fn(batch)`` with ``batch=True``."""
+
+    def __init__(self, fn, batch=False):
+        self.fn = fn
+        self.batch = batch
+
+    def write(self, batch):
+        if self.batch:
+            self.fn(batch)
+        else:
+            for e in batch:
+                self.fn(e)
+        return 0
+
+    def close(self):
+        pass
+
+
+def make_sink(spec):
+    """
+    Build a sink from a CLI spec: ``stdout``, ``file:PATH``,
+    ``udp:HOST:PORT`` or ``tcp:HOST:PORT``.
+    """
+    kind, _, rest = spec.partition(":")
+    if kind == "stdout":
+        return StdoutSink()
+    if kind == "file" and rest:
+        return FileSink(rest)
+    if kind in ("udp", "tcp"):
+        host, _, port = rest.rpartition(":")
+        if host and port.isdigit():
+            cls = UDPSink if kind == "udp" else TCPSink
+            return cls(host, int(port))
+    raise ValueError(f"invalid sink '{spec}' (stdout, file:PATH, udp:HOST:PORT, tcp:HOST:PORT)")
+
+
+# ==========================================================
+#   REPLAYER
+# ==========================================================
+class Replayer:
+    """
+    Push batches of events into sinks.
+
+    ``speed=None`` (or 0) replays as fast as the sinks take it.
+    Otherwise events keep their recorded spacing divided by ``speed``
+    (1.0 = real time, 10.0 = ten times faster); lag is how far behind
+    that schedule an event went out.
+    """
+
+    def __init__(self, sinks, speed=None):
+        if speed is not None and speed < 0:
+            raise ValueError("speed must be positive")
+        self.sinks = sinks
+        self.speed = speed or None
+
+    def run(self, batches):
+        """Replay every batch and return the run's statistics."""
+        self.events = self.bytes = 0
+        self.max_lag = 0.0
+        self.t0 = time.perf_counter()
+        self._ts0 = None
+
+        source = batches if self.speed is None else self._paced(batches)
+        for batch in source:
+            for sink in self.sinks:
+                self.bytes += sink.write(batch)
+            self.events += len(batch)
+        return self.stats()
+
+    def _paced(self, batches):
+        """Split batches so each event leaves no earlier than its due time."""
+        clock, sleep = time.perf_counter, time.sleep
+        scale = 1e-9 / self.speed
+        for batch in batches:
+            if self._ts0 is None:
+                self._ts0 = batch[0].get("ts", 0)
+            t0, ts0 = self.t0, self._ts0
+            pending = []
+            for e in batch:
+                delay = t0 + (e.get("ts", 0) - ts0) * scale - clock()
+                if delay > 0:
+                    if pending:
+                        yield pending
+                        pending = []
+                    # Re-check after the sinks ran
+                    delay = t0 + (e.get("ts", 0) - ts0) * scale - clock()
+                    if delay > 0:
+                        sleep(delay)
+                elif -delay > self.max_lag:
+                    self.max_lag = -delay
+                pending.append(e)
+            if pending:
+                yield pending
+
+    def stats(self):
+        seconds = time.perf_counter() - self.t0
+        return {
+            "events": self.events,
+            "bytes": self.bytes,
+            "seconds": seconds,
+            "events_per_sec": self.events / seconds if seconds else 0.0,
+            "max_lag_ms": self.max_lag * 1000,
+        }
+
+
+def replay(path, start=None, end=None, speed=None, sinks=None):
+    """
+    Replay the events of a snapshot, optionally only ``[start, end)``,
+    into ``sinks`` (stdout by default). Indexed snapshots are read block
+    by block, skipping every block outside the window.
+    Status lines go to stderr so stdout carries only the events.
+    Returns the run's statistics.
+    """
+    start_ts, end_ts = parse_time(start), parse_time(end)
+    sinks = sinks or [StdoutSink()]
+    info(f"Replaying attack from {path}", file=sys.stderr)
+
+    try:
+        with SnapshotReader(path) as snap:
+            if snap.blocks is not None:
+                blocks = snap.block_range(start_ts, end_ts)
+                info(f"Reading {len(blocks)} of {len(snap.blocks)} blocks", file=sys.stderr)
+            stats = Replayer(sinks, speed).run(snap.batches(start_ts, end_ts))
+    finally:
+        for sink in sinks:
+            sink.close()
+
+    success(
+        f"Replayed {stats['events']} events in {stats['seconds']:.2f}s "
+        f"({stats['events_per_sec']:,.0f} events/sec)",
+        file=sys.stderr,
+    )
+    if speed:
+        lag = stats["max_lag_ms"]
+        (warn if lag > 100 else info)(f"Max lag behind schedule: {lag:.1f} ms", file=sys.stderr)
+    return stats
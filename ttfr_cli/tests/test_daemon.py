@@ -0,0 +1,149 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+import ttfr_cli.daemon as daemon_mod
+import ttfr_cli.trigger as trigger
+from ttfr_cli.control import ControlClient, call
+from ttfr_cli.daemon import Daemon
+from ttfr_cli.engine import TTFR_Engine
+from ttfr_fastlog import PyRingBuffer
+from ttfr_fastlog.snapshot import read_snapshot
+
+
+class _Running:
+    def __init__(self, daemon):
+        self.daemon = daemon
+        ready = threading.Event()
+        self.thread = threading.Thread(target=lambda: asyncio.run(daemon.serve(ready)), daemon=True)
+        self.thread.start()
+        assert ready.wait(10)
+
+    def stop(self):
+        if self.thread.is_alive():
+            try:
+                call("stop", self.daemon.control)
+            except OSError:
+                pass    # already stopping
+            self.thread.join(10)
+        assert not self.thread.is_alive()
+
+
+@pytest.fixture
+def start(tmp_path, monkeypatch):
+    monkeypatch.setattr(trigger, "SNAP_DIR", str(tmp_path / "snapshots"))
+    running = []
+
+    def start(**kwargs):
+        kwargs.setdefault("engine", TTFR_Engine(ring=PyRingBuffer(1 << 20)))
+        d = _Running(Daemon(str(tmp_path / "control.sock"), ["tcp:127.0.0.1:0"], **kwargs))
+        running.append(d)
+        return d.daemon
+
+    yield start
+    for d in reversed(running):
+        d.stop()
+
+
+def _send_lines(daemon, lines):
+    with socket.create_connection(daemon.listener.addresses[0]) as s:
+        s.sendall(b"".join(line + b"\n" for line in lines))
+
+
+def _wait_gone(path, timeout=10.0):
+    # The socket goes last on shutdown, after the ring is closed
+    deadline = time.monotonic() + timeout
+    while os.path.exists(path):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _wait_events(client, n, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while client.call("status")["events"] < n:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_status_and_flush(start):
+    daemon = start()
+    with ControlClient(daemon.control) as c:
+        assert c.call("ping")["pid"] == os.getpid()
+        _send_lines(daemon, [b"evt-%d" % i for i in range(50)])
+        _wait_events(c, 50)
+        status = c.call("status")
+        assert status["received"] == 50 and status["capacity_bytes"] == 1 << 20
+
+        handle = c.call("flush", reason="test")
+        done = c.call("result", id=handle["id"])
+        assert done["done"] and done["events"] == 50
+        assert [e["msg"] for e in read_snapshot(handle["path"])] == [f"evt-{i}" for i in range(50)]
+
+        waited = c.call("flush", reason="test", last=60, wait=True)
+        assert waited["events"] == 50
+
+
+def test_errors_come_back_as_replies(start):
+    daemon = start()
+    with ControlClient(daemon.control) as c:
+        with pytest.raises(RuntimeError, match="unknown command 'nope'"):
+            c.call("nope")
+        with pytest.raises(RuntimeError, match="unknown flush id 99"):
+            c.call("result", id=99)
+        with pytest.raises(RuntimeError, match="TypeError"):
+            c.call("pause", bogus=1)
+        # The connection survives failed calls
+        assert c.call("ping")
+
+
+def test_pause_and_resume(start):
+    daemon = start()
+    with ControlClient(daemon.control) as c:
+        assert c.call("pause") == {"paused": True}
+        assert c.call("status")["paused"]
+        assert c.call("resume") == {"paused": False}
+        _send_lines(daemon, [b"after"])
+        _wait_events(c, 1)
+
+
+def test_stop_removes_socket_and_second_recorder_is_refused(start):
+    daemon = start()
+    with pytest.raises(RuntimeError):
+        daemon_mod._claim(daemon.control)
+    assert call("stop", daemon.control)["pid"] == os.getpid()
+    _wait_gone(daemon.control)
+    with pytest.raises(OSError):
+        call("ping", daemon.control)
+
+
+def test_ring_file_survives_restart(start, tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon_mod, "RING_FILE_MB", 1)
+    ring_file = str(tmp_path / "ring")
+    daemon = start(engine=None, ring_file=ring_file)
+    with ControlClient(daemon.control) as c:
+        _send_lines(daemon, [b"kept-%d" % i for i in range(20)])
+        _wait_events(c, 20)
+        c.call("stop")
+    _wait_gone(daemon.control)
+
+    daemon = start(engine=None, ring_file=ring_file)
+    with ControlClient(daemon.control) as c:
+        assert c.call("status")["events"] == 20
+        assert c.call("status")["ring_file"] == ring_file
+        assert c.call("status")["sync_error"] is None
+
+
+def test_flush_reason_cannot_leave_snapshot_dir(start, tmp_path):
+    daemon = start()
+    assert os.stat(daemon.control).st_mode & 0o777 == 0o600
+    with ControlClient(daemon.control) as c:
+        for reason in ("../../x", "a/b", "", "x" * 65, "dot.dot", 5):
+            with pytest.raises(RuntimeError, match="invalid reason"):
+                c.call("flush", reason=reason)
+        assert c.call("flush", reason="T1059_ok-1", wait=True)["events"] == 0
+    assert not (tmp_path / "x").exists()
+    assert [p.name.startswith("snapshot_T1059_ok-1_") for p in (tmp_path / "snapshots").iterdir()] == [True]
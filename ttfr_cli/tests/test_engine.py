@@ -0,0 +1,113 @@
+import threading
+
+import ttfr_fastlog
+from ttfr_cli.engine import TTFR_Engine
+
+
+def _engine(capacity=200):
+    return TTFR_Engine(ring=ttfr_fastlog.PyRingBuffer(capacity))
+
+
+def test_freeze_survives_an_oversize_batch():
+    engine = _engine()
+    engine.ingest_many([b"a" * 40, b"b" * 40])
+    frozen = engine.freeze()
+    engine.ingest_many([b"x" * 50] * 6)       # more than the ring holds
+    assert [raw for _, raw in engine._frozen_records(frozen)] == [b"a" * 40, b"b" * 40]
+    assert engine.buffer.dump() == [b"x" * 50] * 4
+
+
+def test_snapshot_holds_what_was_buffered_at_flush(tmp_path):
+    engine = _engine(1000)
+    engine.ingest_many([b"event %d" % i for i in range(50)])
+    future = engine.flush_async(str(tmp_path / "s.ttfr"))
+    engine.ingest_many([b"later %d" % i for i in range(200)])
+    assert future.result() == 50
+    msgs = [e["msg"] for e in ttfr_fastlog.read_snapshot(str(tmp_path / "s.ttfr"))]
+    assert msgs == ["event %d" % i for i in range(50)]
+
+
+def test_trigger_flushes_the_engine_that_matched(tmp_path, monkeypatch):
+    import ttfr_cli.engine
+    import ttfr_cli.trigger
+
+    monkeypatch.setattr(ttfr_cli.trigger, "SNAP_DIR", str(tmp_path))
+    engine = _engine(1 << 20)
+    engine.ingest_many([b"heartbeat %d" % i for i in range(100)])
+    engine.enable_triggers(pre=5, post=0.05)
+    engine.ingest(b"MIMIKATZ sekurlsa::logonpasswords")
+    engine.ingest(b"after")
+    engine.disable_triggers()
+
+    (path,) = tmp_path.iterdir()
+    msgs = [e["msg"] for e in ttfr_fastlog.read_snapshot(str(path))]
+    assert len(msgs) == 102
+    assert "MIMIKATZ sekurlsa::logonpasswords" in msgs
+    assert ttfr_cli.engine._ENGINE is None
+
+
+def test_ingest_many_takes_a_generator_while_frozen():
+    engine = _engine(1000)
+    engine.ingest(b"first")
+    frozen = engine.freeze()
+    assert engine.ingest_many(b"gen %d" % i for i in range(10)) == 10
+    assert len(engine.buffer) == 11
+    assert [raw for _, raw in engine._frozen_records(frozen)] == [b"first"]
+
+
+def _messages(engine):
+    return [raw for _, raw in engine.buffer.records()]
+
+
+def test_staged_producers_keep_order_and_lose_nothing():
+    engine = TTFR_Engine(ring=ttfr_fastlog.PyRingBuffer(1 << 20), stage_events=16)
+    start = threading.Barrier(4)
+
+    def produce(t):
+        start.wait()
+        for i in range(500):
+            engine.ingest(b"%d:%d" % (t, i))
+
+    threads = [threading.Thread(target=produce, args=(t,)) for t in range(4)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    engine.flush_staged()
+
+    msgs = _messages(engine)
+    assert len(msgs) == 4 * 500
+    for t in range(4):
+        mine = [m for m in msgs if m.startswith(b"%d:" % t)]
+        assert mine == [b"%d:%d" % (t, i) for i in range(500)]
+    stamps = [ts for ts, _ in engine.buffer.records()]
+    assert stamps == sorted(stamps)
+    assert engine.flush_staged() == 0
+
+
+def test_reads_include_partly_full_stages(tmp_path):
+    engine = TTFR_Engine(ring=ttfr_fastlog.PyRingBuffer(1 << 20), stage_events=100)
+    for i in range(30):
+        engine.ingest(b"staged %d" % i)
+    assert len(engine.buffer) == 0
+
+    events = ttfr_fastlog.decompress_json(engine.dump_snapshot())
+    assert [e["msg"] for e in events] == ["staged %d" % i for i in range(30)]
+
+    for i in range(30, 40):
+        engine.ingest(b"staged %d" % i)
+    path = str(tmp_path / "s.ttfr")
+    assert engine.flush_async(path).result() == 40
+    assert [e["msg"] for e in ttfr_fastlog.read_snapshot(path)] == ["staged %d" % i for i in range(40)]
+
+
+def test_stage_of_an_exited_thread_is_merged_then_dropped():
+    engine = TTFR_Engine(ring=ttfr_fastlog.PyRingBuffer(1 << 20), stage_events=100)
+    th = threading.Thread(target=lambda: [engine.ingest(b"gone %d" % i) for i in range(5)])
+    th.start()
+    th.join()
+    assert len(engine._stages) == 1 and len(engine.buffer) == 0
+
+    assert engine.flush_staged() == 5
+    assert _messages(engine) == [b"gone %d" % i for i in range(5)]
+    assert engine._stages == []
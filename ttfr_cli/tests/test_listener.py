@@ -0,0 +1,126 @@
+import socket
+import struct
+import threading
+import time
+
+from ttfr_cli.listener import Listener, _DatagramProtocol, _StreamProtocol, split_length, split_lines
+
+
+class _Sink:
+    """Stands in for the engine: records each ingest_many batch."""
+
+    def __init__(self):
+        self.batches = []
+        self.ingested = threading.Event()
+
+    def ingest_many(self, events):
+        self.batches.append(list(events))
+        self.ingested.set()
+
+    @property
+    def events(self):
+        return [e for batch in self.batches for e in batch]
+
+
+class _Transport:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def pause_reading(self):
+        pass
+
+    def resume_reading(self):
+        pass
+
+
+def _listener(framing="line", max_event=8):
+    # Not opened: _add only batches into _pending without a running loop
+    listener = Listener([], engine=_Sink(), framing=framing, max_event=max_event,
+                        batch_events=10 ** 6)
+    listener._handle = object()
+    return listener
+
+
+def _wait(pred, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_split_lines_drops_complete_lines_over_max_event():
+    assert split_lines(b"a\n\nbb\ncc", 8) == ([b"a", b"bb"], b"cc", 0)
+    assert split_lines(b"a\n" + b"x" * 9 + b"\nb\nrest", 8) == ([b"a", b"b"], b"rest", 1)
+
+
+def test_split_length():
+    buf = struct.pack(">I", 2) + b"ab" + struct.pack(">I", 3) + b"cd"
+    assert split_length(buf, 8) == ([b"ab"], buf[6:], 0)
+    big = struct.pack(">I", 9) + b"x" * 9
+    assert split_length(big, 8) == ([], big, 0)
+
+
+def test_stream_drops_over_long_lines_in_and_across_reads():
+    listener = _listener()
+    proto = _StreamProtocol(listener)
+    proto.connection_made(_Transport())
+    proto.data_received(b"ok\n" + b"x" * 20 + b"\nfine\n")
+    proto.data_received(b"y" * 20)
+    proto.data_received(b"yyy\nafter\nlast")
+    proto.connection_lost(None)
+    assert listener._pending == [b"ok", b"fine", b"after", b"last"]
+    assert listener.stats.dropped == 2
+
+
+def test_stream_closes_on_over_long_length_prefix():
+    listener = _listener("length")
+    proto = _StreamProtocol(listener)
+    transport = _Transport()
+    proto.connection_made(transport)
+    proto.data_received(struct.pack(">I", 2) + b"ok" + struct.pack(">I", 100))
+    assert listener._pending == [b"ok"]
+    assert transport.closed and listener.stats.errors == 1
+
+
+def test_datagram_enforces_max_event():
+    listener = _listener()
+    proto = _DatagramProtocol(listener)
+    proto.datagram_received(b"a\n" + b"x" * 9 + b"\nb", None)
+    proto.datagram_received(b"z" * 9, None)
+    proto.datagram_received(b"c", None)
+    assert listener._pending == [b"a", b"b", b"c"]
+    assert listener.stats.dropped == 2
+
+
+def test_partial_batch_waits_for_busy_ingest_thread():
+    listener = _listener()
+    listener._handle = None
+    listener._pending = [b"a"]
+    listener._queue.put([b"queued"])
+    listener._submit()
+    assert listener._waiting and listener._pending == [b"a"]
+
+    listener._queue.get()
+    listener._submit()
+    assert not listener._waiting and listener._pending == []
+    assert listener._queue.get_nowait() == [b"a"]
+
+
+def test_listener_ingests_udp_and_tcp():
+    sink = _Sink()
+    listener = Listener(["udp:127.0.0.1:0", "tcp:127.0.0.1:0"], engine=sink, max_event=16).start()
+    try:
+        udp, tcp = listener.addresses
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.sendto(b"u1\nu2\n" + b"x" * 40, udp)
+        with socket.create_connection(tcp) as s:
+            s.sendall(b"t1\n" + b"y" * 40 + b"\nt2\n")
+        _wait(lambda: len(sink.events) == 4)
+    finally:
+        listener.stop(5)
+    assert sorted(sink.events) == [b"t1", b"t2", b"u1", b"u2"]
+    assert listener.stats.dropped == 2
+    assert listener.stats.ingested == 4
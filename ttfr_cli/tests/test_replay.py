@@ -0,0 +1,142 @@
+import socket
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from ttfr_cli.replay import (
+    CallbackSink,
+    FileSink,
+    Replayer,
+    StdoutSink,
+    TCPSink,
+    UDPSink,
+    make_sink,
+    parse_time,
+    replay,
+)
+from ttfr_fastlog.snapshot import SnapshotReader, write_snapshot
+
+BASE = 1_700_000_000
+
+
+def _snapshot(path, n=300, step_ns=100_000_000):
+    # One event every 0.1 s from BASE
+    records = [(BASE * 10**9 + i * step_ns, f"evt-{i}") for i in range(n)]
+    write_snapshot(str(path), records, chunk_bytes=256, workers=0)
+    return str(path)
+
+
+def test_window_across_blocks(tmp_path, capsys):
+    path = _snapshot(tmp_path / "s.ttfr")
+    got = []
+    stats = replay(path, str(BASE + 10), str(BASE + 15), sinks=[CallbackSink(got.append)])
+    assert [e["msg"] for e in got] == [f"evt-{i}" for i in range(100, 150)]
+    assert stats["events"] == 50
+
+    with SnapshotReader(path) as snap:
+        blocks = snap.block_range(parse_time(str(BASE + 10)), parse_time(str(BASE + 15)))
+        assert 1 < len(blocks) < len(snap.blocks)
+    assert f"Reading {len(blocks)} of" in capsys.readouterr().err
+
+
+def test_status_lines_stay_off_stdout(tmp_path, capsys):
+    path = _snapshot(tmp_path / "s.ttfr", n=20)
+    replay(path, speed=1000)
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [f"evt-{i}" for i in range(20)]
+    assert "Replayed 20 events" in err and "Max lag" in err
+
+
+def test_empty_snapshot(tmp_path, capsys):
+    path = str(tmp_path / "empty.ttfr")
+    assert write_snapshot(path, [], workers=0) == 0
+    got = []
+    stats = replay(path, sinks=[CallbackSink(got.append)], speed=1)
+    assert got == [] and stats["events"] == 0 and stats["max_lag_ms"] == 0
+    assert "Replayed 0 events" in capsys.readouterr().err
+
+
+def test_speed_paces_events():
+    batch = [{"ts": i * 10_000_000, "msg": "e"} for i in range(20)]    # 10 ms apart
+    got = []
+    stats = Replayer([CallbackSink(got.append)], speed=2).run([batch[:10], batch[10:]])
+    assert len(got) == 20
+    assert stats["seconds"] >= 19 * 0.010 / 2
+    assert stats["max_lag_ms"] < 250
+
+    with pytest.raises(ValueError):
+        Replayer([], speed=-1)
+
+
+def test_slow_sink_shows_up_as_lag():
+    batch = [{"ts": i * 1_000_000, "msg": "e"} for i in range(10)]     # 1 ms apart
+    calls = []
+
+    def slow(event):
+        calls.append(event)
+        if len(calls) == 1:
+            time.sleep(0.05)
+
+    stats = Replayer([CallbackSink(slow)], speed=1).run([batch])
+    assert len(calls) == 10
+    assert stats["max_lag_ms"] >= 30
+
+
+def test_make_sink_specs(tmp_path):
+    assert isinstance(make_sink("stdout"), StdoutSink)
+
+    out = tmp_path / "out.log"
+    sink = make_sink(f"file:{out}")
+    assert isinstance(sink, FileSink)
+    sink.write([{"msg": "a"}, {"msg": "b"}])
+    sink.close()
+    assert out.read_bytes() == b"a\nb\n"
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as rx:
+        rx.bind(("127.0.0.1", 0))
+        rx.settimeout(5)
+        sink = make_sink("udp:127.0.0.1:%d" % rx.getsockname()[1])
+        assert isinstance(sink, UDPSink)
+        assert sink.write([{"msg": "one"}, {"msg": "two"}]) == 6
+        sink.close()
+        assert [rx.recv(64), rx.recv(64)] == [b"one", b"two"]
+
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        sink = make_sink("tcp:127.0.0.1:%d" % server.getsockname()[1])
+        assert isinstance(sink, TCPSink)
+        conn, _ = server.accept()
+        with conn:
+            sink.write([{"msg": "x"}])
+            sink.close()
+            assert conn.recv(64) == b"x\n"
+
+
+@pytest.mark.parametrize("spec", ["", "bogus", "file:", "udp:127.0.0.1", "udp:127.0.0.1:port", "tcp::5140"])
+def test_make_sink_rejects_bad_specs(spec):
+    with pytest.raises(ValueError, match="invalid sink"):
+        make_sink(spec)
+
+
+def test_parse_time_absolute():
+    assert parse_time(None) is None
+    assert parse_time("1700000000.5") == 1_700_000_000_500_000_000
+    utc = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    assert parse_time("2024-01-01T12:00:00+00:00") == int(utc.timestamp()) * 10**9
+    # Without an offset the timestamp is local time
+    assert parse_time("2024-01-01T12:00:00") == int(datetime(2024, 1, 1, 12).timestamp()) * 10**9
+
+
+def test_parse_time_relative():
+    now = 1_000_000.0
+    assert parse_time("-90s", now=now) == int(now - 90) * 10**9
+    assert parse_time("-5m", now=now) == int(now - 300) * 10**9
+    assert parse_time("-1.5h", now=now) == int(now - 5400) * 10**9
+    assert parse_time("-2d", now=now) == int(now - 172800) * 10**9
+
+    before = time.time_ns()
+    assert before - 61 * 10**9 < parse_time("-1m") < time.time_ns() - 59 * 10**9
+
+    for bad in ("-5x", "5m", "-m", "yesterday"):
+        with pytest.raises(ValueError):
+            parse_time(bad)
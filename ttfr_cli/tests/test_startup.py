@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Only commands that need them may import these
+HEAVY = ["ttfr_cli.engine", "ttfr_cli.daemon", "asyncio", "numpy"]
+
+SCRIPT = """
+import json, sys
+from ttfr_cli import commands, recorder
+from ttfr_cli.main import main
+
+main({argv!r}, standalone_mode=False)
+assert recorder.status({control!r}) is None
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["status", "--help"]])
+def test_status_and_help_stay_light(tmp_path, argv):
+    # A fresh interpreter, so nothing imported by other tests counts
+    script = SCRIPT.format(argv=argv, control=str(tmp_path / "none.sock"), heavy=HEAVY)
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run(
+        [sys.executable, "-c", script], env=env, cwd=str(tmp_path),
+        capture_output=True, text=True, timeout=60, check=True,
+    ).stdout
+    assert json.loads(out.splitlines()[-1]) == []
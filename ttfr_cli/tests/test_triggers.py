@@ -0,0 +1,81 @@
+import random
+from array import array
+from itertools import accumulate
+
+import pytest
+
+from ttfr_cli.triggers import InlineTrigger, MitreMatcher
+
+
+def _naive(rules, events):
+    """{technique: [event index, ...]} by plain substring search per event."""
+    hits = {}
+    for i, event in enumerate(events):
+        text = event.lower()
+        for technique, patterns in rules.items():
+            if any(p.lower() in text for p in patterns):
+                hits.setdefault(technique, []).append(i)
+    return {t: idx for t, idx in sorted(hits.items())}
+
+
+def _random_case(rng):
+    word = lambda n: "".join(rng.choice("abAB c") for _ in range(n))
+    rules = {
+        f"T{k}": [word(rng.randint(1, 4)) for _ in range(rng.randint(1, 3))]
+        for k in range(rng.randint(1, 12))
+    }
+    events = [word(rng.randint(0, 12)) for _ in range(rng.randint(1, 40))]
+    return rules, events
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_naive_search_on_random_dense_rulesets(seed):
+    rules, events = _random_case(random.Random(seed))
+    matcher = MitreMatcher(rules)
+    expected = _naive(rules, events)
+
+    raw = [e.encode() for e in events]
+    offsets = array("q", [0])
+    offsets.extend(accumulate(map(len, raw)))
+    assert dict(sorted(matcher.match(events).items())) == expected
+    assert dict(sorted(matcher.match(raw).items())) == expected
+    assert dict(sorted(matcher.match(b"".join(raw), offsets).items())) == expected
+
+
+def test_no_match_across_events():
+    matcher = MitreMatcher()
+    assert matcher.match(b"run powershell -enc foo", [0, 14, 23]) == {}
+    assert matcher.match([b"run powershell", b" -enc foo"]) == {}
+    # A longer pattern cut at the boundary still lets a shorter one match
+    matcher = MitreMatcher({"short": ["abc"], "long": ["abcdef"]})
+    assert matcher.match(b"abcdef", [0, 3, 6]) == {"short": [0]}
+    assert matcher.match(b"xxabcdef", [2, 8]) == {"short": [0], "long": [0]}
+
+
+def test_non_ascii_patterns_match_bytes():
+    matcher = MitreMatcher({"T1": ["ÉVIL"]})
+    assert matcher.match(["ÉVIL".encode()]) == {"T1": [0]}
+    assert matcher.match(["évil"]) == {"T1": [0]}
+    assert matcher.match(b"x\xc3\x89vil", [0, 1, 6]) == {"T1": [1]}
+
+
+class _Scheduler:
+    def __init__(self):
+        self.fired = []
+
+    def fire(self, reason, ts=None):
+        self.fired.append(reason)
+
+    def close(self, timeout=None):
+        pass
+
+
+def test_check_many_does_not_fire_across_events():
+    trigger = InlineTrigger(MitreMatcher(), _Scheduler())
+    assert not trigger.check_many(b"run powershell -enc foo", [0, 14, 23])
+    assert not trigger.check_many([b"run powershell", b" -enc foo"])
+    assert trigger.scheduler.fired == []
+
+    assert trigger.check_many(b"ok run powershell -enc foo", [0, 2, 26])
+    assert trigger.scheduler.fired == ["mitre_T1059.001"]
+    assert trigger.hits == {"T1059.001": 1}
@@ -1,23 +1,58 @@
 import os
+import time
+from concurrent.futures import Future
 from datetime import datetime
-from .engine import get_engine
-from .utils import info, success
+from .utils import error, info, success
 
 SNAP_DIR = "snapshots"
-os.makedirs(SNAP_DIR, exist_ok=True)
 
-def flush(reason="manual"):
-    engine = get_engine()
+def snapshot_path(reason="manual", seq=None):
+    """
+    Where a snapshot flushed now for ``reason`` is written; ``seq``
+    tells apart several flushes within one second.
+    """
+    os.makedirs(SNAP_DIR, exist_ok=True)
+    suffix = "" if seq is None else f"_{seq}"
+    fname = f"snapshot_{reason}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}.ttfr"
+    return os.path.join(SNAP_DIR, fname)
+
+
+def flush_async(reason="manual", last=None, start_ts=None, end_ts=None, engine=None):
+    """
+    Queue a snapshot of ``engine``'s ring (default: the global engine)
+    on its flush thread and return a Future of its path. The window is
+    frozen right away; the compression and file I/O happen in the
+    background. ``last`` limits the snapshot to the events of the last
+    N seconds, ``start_ts``/``end_ts`` (ns) to a fixed window.
+    """
+    if engine is None:
+        from .engine import get_engine
+
+        engine = get_engine()
 
     info(f"Trigger received: {reason}")
-    data = engine.dump_snapshot()
+    if last is not None:
+        start_ts = time.time_ns() - int(last * 1_000_000_000)
+
+    path = snapshot_path(reason)
+
+    done = Future()
 
-    fname = f"snapshot_{reason}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ttfr"
-    path = os.path.join(SNAP_DIR, fname)
+    def _report(written):
+        if written.exception() is not None:
+            error(f"Snapshot {path} failed: {written.exception()}")
+            done.set_exception(written.exception())
+        else:
+            success(f"Snapshot saved → {path} ({written.result()} events)")
+            done.set_result(path)
 
-    with open(path, "wb") as f:
-        f.write(data)
+    engine.flush_async(path, start_ts, end_ts).add_done_callback(_report)
+    return done
 
-    success(f"Snapshot saved → {path}")
-    return path
 
+def flush(reason="manual", last=None, start_ts=None, end_ts=None, engine=None):
+    """
+    Save a snapshot of the ring and wait for it; see flush_async().
+    Returns the snapshot path.
+    """
+    return flush_async(reason, last, start_ts, end_ts, engine).result()
@@ -1,3 +1,15 @@
+import json
+import re
+import threading
+import time
+from bisect import bisect_right
+from itertools import accumulate
+
+from ttfr_fastlog import SnapshotReader
+from .config import TRIGGER_MAX_WINDOW, TRIGGER_POST_SECONDS, TRIGGER_PRE_SECONDS
+from .utils import error
+
+
 def detect_malware_event(event):
     """
     Placeholder for future detection:
@@ -10,3 +22,370 @@ def detect_malware_event(event):
         return True
     return False
 
+
+# ==========================================================
+#   MITRE ATT&CK MATCHER
+# ==========================================================
+
+# Small built-in ruleset: technique ID -> literal patterns
+DEFAULT_RULES = {
+    "T1059.001": ["powershell -enc", "powershell.exe -nop", "invoke-expression", "iex("],
+    "T1059.003": ["cmd.exe /c", "cmd /c"],
+    "T1003.001": ["mimikatz", "sekurlsa::logonpasswords", "lsass.dmp"],
+    "T1021.002": ["psexec", "\\admin$", "\\c$"],
+    "T1053.005": ["schtasks /create"],
+    "T1071.001": ["beacon", "c2"],
+    "T1110.003": ["credential_spray", "password spray"],
+    "T1486": ["vssadmin delete shadows", ".encrypted", "ransom"],
+    "T1547.001": ["currentversion\\run"],
+}
+
+# Joins a batch; must never appear inside a pattern
+_SEP = "\x00"
+
+
+def _trie_regex(patterns):
+    """
+    One regex source for a set of literal patterns, factored as a
+    prefix trie.
+
+    A flat alternation makes the regex engine try every pattern at every
+    position; the trie tries one branch per distinct next character, so
+    the cost per position no longer grows with the size of the ruleset.
+    Longer patterns win over their own prefixes.
+    """
+    trie = {}
+    for p in patterns:
+        node = trie
+        for ch in p:
+            node = node.setdefault(ch, {})
+        node[""] = None
+
+    def build(node):
+        leaves, branches = [], []
+        for ch in sorted(k for k in node if k):
+            sub = node[ch]
+            if len(sub) == 1 and "" in sub:
+                leaves.append(re.escape(ch))
+            else:
+                branches.append(re.escape(ch) + build(sub))
+        if len(leaves) == 1:
+            branches.append(leaves[0])
+        elif leaves:
+            branches.append("[" + "".join(leaves) + "]")
+
+        body = "|".join(branches)
+        if "" in node:
+            return "(?:" + body + ")?"
+        return "(?:" + body + ")" if len(branches) > 1 else body
+
+    return build(trie)
+
+
+def load_rules(path):
+    """Read a ``{"T1059": ["pattern", ...], ...}`` JSON ruleset."""
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, dict):
+        raise ValueError(f"ruleset must map technique IDs to pattern lists: {path}")
+    return rules
+
+
+class MitreMatcher:
+    """
+    Match a ruleset (technique ID -> literal patterns) against whole
+    batches of events at once.
+
+    All patterns are compiled into one regex factored as a prefix trie
+    (see _trie_regex), and a batch is joined into a single buffer that
+    the regex engine scans in one pass; match offsets are mapped back to
+    event indices by binary search, and a match never spans two events.
+    A match also credits every pattern it contains, so "powershell -enc"
+    fires the rules for "powershell" as well.
+
+    Bytes are matched as UTF-8 with ASCII-only case folding (like the
+    bytes IGNORECASE flag): a non-ASCII letter matches only in the case
+    the pattern spells it. str events fold case fully.
+    """
+
+    def __init__(self, rules=None, ignore_case=True):
+        rules = DEFAULT_RULES if rules is None else rules
+        self.ignore_case = ignore_case
+        fold = str.lower if ignore_case else (lambda s: s)
+
+        owners = {}
+        for technique, patterns in rules.items():
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            for p in patterns:
+                if not p or _SEP in p:
+                    raise ValueError(f"invalid pattern {p!r} for {technique}")
+                owners.setdefault(fold(p), set()).add(technique)
+
+        # Each pattern -> techniques of every pattern found inside it
+        self._hits = {
+            p: frozenset().union(*(t for q, t in owners.items() if q in p))
+            for p in owners
+        }
+        self.techniques = sorted({t for ts in owners.values() for t in ts})
+
+        self._re = self._re_bytes = None
+        self._probe = self._probe_bytes = lambda data: None
+        if owners:
+            flags = re.IGNORECASE if ignore_case else 0
+            # Zero-width lookahead: finditer tries every start position,
+            # so overlapping occurrences are all reported
+            self._re = re.compile("(?=(" + _trie_regex(owners) + "))", flags)
+            # Same trie over the UTF-8 bytes (latin-1 maps each byte to
+            # one char). Byte batches are lowercased up front, ASCII only
+            # like the bytes IGNORECASE flag, instead of matching case-blind,
+            # so the patterns are folded the same way
+            fold_bytes = bytes.lower if ignore_case else bytes
+            byte_patterns = sorted({
+                fold_bytes(p.encode("utf-8")).decode("latin-1")
+                for technique, patterns in rules.items()
+                for p in ([patterns] if isinstance(patterns, str) else patterns)
+            })
+            self._re_bytes = re.compile(
+                ("(?=(" + _trie_regex(byte_patterns) + "))").encode("latin-1")
+            )
+            # Plain searches for the "any hit at all?" prefilter; input
+            # is lowercased first, several times cheaper than IGNORECASE
+            self._probe = re.compile(_trie_regex(owners)).search
+            self._probe_bytes = re.compile(_trie_regex(byte_patterns).encode("latin-1")).search
+
+    def match(self, events, offsets=None):
+        """
+        Scan one batch; returns ``{technique: [event index, ...]}`` for
+        the techniques that fired, indices ascending.
+
+        ``events`` is a list of str, bytes or event dicts (their "msg"),
+        or a single contiguous buffer split by ``offsets`` the way
+        ``RingBuffer.push_many`` takes it.
+        """
+        if self._re is None:
+            return {}
+
+        if offsets is not None:
+            text = bytes(events[offsets[0] : offsets[-1]])
+            starts = list(offsets)
+            if offsets[0]:
+                starts = [s - offsets[0] for s in starts]
+            pattern = self._re_bytes
+        else:
+            if not events:
+                return {}
+            items = [e.get("msg", "") if isinstance(e, dict) else e for e in events]
+            if isinstance(items[0], str):
+                text, pattern = _SEP.join(items), self._re
+            else:
+                text, pattern = _SEP.encode().join(items), self._re_bytes
+            starts = [0]
+            starts.extend(accumulate(len(i) + 1 for i in items))
+
+        if pattern is self._re_bytes:
+            fold = self._fold_bytes
+            if self.ignore_case:
+                text = text.lower()
+        else:
+            fold = self._fold
+        # starts[i] is where event i begins, starts[-1] just past the end
+        hits = {}
+        last = {}
+        for m in pattern.finditer(text):
+            at = m.start()
+            idx = bisect_right(starts, at) - 1
+            if at + len(m.group(1)) > starts[idx + 1]:
+                # Runs into the next event (only possible without a
+                # separator): the longest match that stops at this event's end
+                m = pattern.match(text, at, starts[idx + 1])
+                if m is None:
+                    continue
+            for technique in self._hits.get(fold(m.group(1)), ()):
+                if last.get(technique) != idx:
+                    last[technique] = idx
+                    hits.setdefault(technique, []).append(idx)
+        return hits
+
+    def search(self, data):
+        """
+        Cheap prefilter: True if any pattern occurs in ``data`` (str or a
+        bytes-like buffer, e.g. a whole batch). One regex search, no
+        per-event work.
+        """
+        if isinstance(data, str):
+            probe = self._probe
+        else:
+            probe = self._probe_bytes
+            if not isinstance(data, bytes):
+                data = bytes(data)
+        if self.ignore_case:
+            data = data.lower()
+        return probe(data) is not None
+
+    def count(self, events, offsets=None):
+        """``{technique: number of matching events}`` for one batch."""
+        return {t: len(idx) for t, idx in self.match(events, offsets).items()}
+
+    def scan(self, batches):
+        """
+        Match every batch of an iterable (e.g. SnapshotReader.batches()).
+        Event indices run across the whole stream.
+        """
+        hits = {}
+        base = 0
+        for batch in batches:
+            for technique, idx in self.match(batch).items():
+                hits.setdefault(technique, []).extend(i + base for i in idx)
+            base += len(batch)
+        return hits
+
+    def _fold(self, s):
+        return s.lower() if self.ignore_case else s
+
+    def _fold_bytes(self, b):
+        s = b.decode("utf-8", errors="ignore")
+        return s.lower() if self.ignore_case else s
+
+
+def scan_snapshot(path, matcher=None, start_ts=None, end_ts=None):
+    """
+    Match a snapshot (optionally just ``[start_ts, end_ts)``) block by
+    block. Returns ``{technique: [event index, ...]}``, indices counted
+    over the events in the window.
+    """
+    matcher = matcher or MitreMatcher()
+    with SnapshotReader(path) as snap:
+        return matcher.scan(snap.batches(start_ts, end_ts))
+
+
+# ==========================================================
+#   INLINE TRIGGERS
+# ==========================================================
+class FlushScheduler:
+    """
+    Debounce trigger hits into pre/post-window flushes, run on one
+    background thread so the ingest path never waits on a flush.
+
+    The first hit opens a window from ``pre`` seconds before it; every
+    hit within the window pushes its end to ``post`` seconds after that
+    hit, up to ``max_window`` seconds in total. Once the end passes with
+    no new hit, ``flush(reason, start_ts=..., end_ts=...)`` runs.
+    """
+
+    def __init__(self, flush=None, pre=TRIGGER_PRE_SECONDS, post=TRIGGER_POST_SECONDS,
+                 max_window=TRIGGER_MAX_WINDOW):
+        if flush is None:
+            from .trigger import flush
+        self.flush = flush
+        self.pre = int(pre * 1_000_000_000)
+        self.post = int(post * 1_000_000_000)
+        self.max_window = int(max_window * 1_000_000_000)
+        self.flushed = []
+        self._jobs = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def fire(self, reason, ts=None):
+        """Record a hit; cheap enough to call from the ingest path."""
+        ts = time.time_ns() if ts is None else ts
+        with self._cond:
+            job = self._jobs[-1] if self._jobs else None
+            if job and ts <= job["end"] and ts + self.post - job["start"] <= self.max_window:
+                job["end"] = max(job["end"], ts + self.post)
+                job["reasons"].add(reason)
+            else:
+                self._jobs.append(
+                    {"start": ts - self.pre, "end": ts + self.post, "reasons": {reason}}
+                )
+            if self._thread is None:
+                self._running = True
+                self._thread = threading.Thread(
+                    target=self._loop, name="ttfr-trigger-flush", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def _loop(self):
+        cond = self._cond
+        while True:
+            with cond:
+                while self._running and not self._jobs:
+                    cond.wait()
+                if not self._jobs:
+                    return
+                wait = (self._jobs[0]["end"] - time.time_ns()) / 1e9
+                if wait > 0 and self._running:
+                    cond.wait(wait)
+                    continue
+                job = self._jobs.pop(0)
+
+            reasons = sorted(job["reasons"])
+            reason = reasons[0] + (f"+{len(reasons) - 1}" if len(reasons) > 1 else "")
+            try:
+                self.flushed.append(
+                    self.flush(reason, start_ts=job["start"], end_ts=job["end"])
+                )
+            except Exception as e:
+                error(f"Triggered flush failed: {e}")
+
+    def pending(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def close(self, timeout=None):
+        """Flush whatever is pending now and stop the worker."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class InlineTrigger:
+    """
+    Rules evaluated on events as they are ingested.
+
+    ``check``/``check_many`` first run the matcher's single-search
+    prefilter; only events that hit are matched per technique, and a
+    match just hands the technique IDs to the FlushScheduler. The
+    prefilter may pass on a pattern that spans two events of an offsets
+    batch; MitreMatcher.match drops those, so nothing fires for them.
+    """
+
+    def __init__(self, matcher=None, scheduler=None):
+        self.matcher = matcher or MitreMatcher()
+        self.scheduler = scheduler or FlushScheduler()
+        self.hits = {}
+        self._search = self.matcher.search
+
+    def check(self, msg):
+        if not self._search(msg):
+            return False
+        return self._fire(self.matcher.match([msg]))
+
+    def check_many(self, events, offsets=None):
+        if offsets is not None:
+            if not self._search(memoryview(events)[offsets[0] : offsets[-1]]):
+                return False
+        elif not events:
+            return False
+        elif isinstance(events[0], (bytes, bytearray)):
+            if not self._search(_SEP.encode().join(events)):
+                return False
+        elif not any(map(self._search, events)):
+            return False
+        return self._fire(self.matcher.match(events, offsets))
+
+    def _fire(self, hits):
+        if not hits:
+            return False
+        for technique, idx in hits.items():
+            self.hits[technique] = self.hits.get(technique, 0) + len(idx)
+            self.scheduler.fire(f"mitre_{technique}")
+        return True
+
+    def close(self, timeout=None):
+        self.scheduler.close(timeout)
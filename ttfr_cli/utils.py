@@ -9,15 +9,15 @@ def yellow(x): return f"\033[93m{x}\033[0m"
 def red(x): return f"\033[91m{x}\033[0m"
 def blue(x): return f"\033[94m{x}\033[0m"
 
-def info(msg):
-    print(blue("[INFO]"), msg)
+def info(msg, file=None):
+    print(blue("[INFO]"), msg, file=file)
 
-def success(msg):
-    print(green("[OK]"), msg)
+def success(msg, file=None):
+    print(green("[OK]"), msg, file=file)
 
-def warn(msg):
-    print(yellow("[WARN]"), msg)
+def warn(msg, file=None):
+    print(yellow("[WARN]"), msg, file=file)
 
-def error(msg):
-    print(red("[ERROR]"), msg)
+def error(msg, file=None):
+    print(red("[ERROR]"), msg, file=file)
 
@@ -3,41 +3,67 @@
 # ============================================================
 
 try:
-    # Fast PyO3 backend (Rust)
-    from fastlog_py import compress_json, decompress_json
+    # Fast PyO3 backend (Rust): codecs + native ring
+    from fastlog_py import Codec, compress_json, decompress_json, compress_records
+    from fastlog_py import compress_columns, decompress_columns
+    from fastlog_py import RingBuffer as _NativeRingBuffer
     FASTLOG_BACKEND = "rust"
 except Exception:
     # Pure-Python fallback
     FASTLOG_BACKEND = "python"
     import json
     import lz4.block as lz4b
+    from .codec import PyCodec as Codec
+    from .columnar import compress_columns, decompress_columns
 
-    def compress_json(data):
+    def compress_json(data, codec=None):
         """
-        Pure-python fallback JSON → LZ4-compressed bytes.
+        Pure-python fallback JSON → compressed bytes (LZ4 unless a
+        Codec is given). NaN and the infinities are refused, as by the
+        native encoder.
         """
         try:
-            raw = json.dumps(data).encode("utf-8")
-            return lz4b.compress(raw)
+            raw = json.dumps(data, allow_nan=False).encode("utf-8")
+            return lz4b.compress(raw) if codec is None else codec.compress(raw)
         except Exception as e:
             raise RuntimeError(f"compress_json failed: {e}")
 
-    def decompress_json(blob):
+    def decompress_json(blob, codec=None):
         """
-        Pure-python fallback LZ4-decompress → JSON.
+        Pure-python fallback decompress (LZ4 unless a Codec is given) → JSON.
         """
         try:
-            dec = lz4b.decompress(blob)
+            dec = lz4b.decompress(blob) if codec is None else codec.decompress(blob)
             return json.loads(dec.decode("utf-8"))
         except Exception as e:
             raise RuntimeError(f"decompress_json failed: {e}")
 
+    def compress_records(records, codec=None):
+        """
+        Pure-python fallback [(ts, raw), ...] → the compress_json block
+        of [{"ts": ts, "msg": raw}, ...].
+        """
+        return compress_json(
+            [{"ts": ts, "msg": raw.decode("utf-8", errors="ignore")} for ts, raw in records],
+            codec,
+        )
+
 
 # ============================================================
 #  RingBuffer (TTFR Compatible)
 # ============================================================
 
-class RingBuffer:
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from time import time_ns
+
+from .memory import allocate, memory_report
+
+_INITIAL_SLOTS = 1024
+
+
+class PyRingBuffer:
     """
     High-speed Python fallback ring buffer.
 
@@ -45,62 +71,468 @@ class RingBuffer:
 
         ingest()
         push()
+        push_many()
         write()
+        dump()
+        dump_range()
+        dump_last()
+        records()
+        columns()
+        seq_range()
+        records_seq()
+        headroom()
         snapshot()
         clear()
 
-    Stores raw bytes while maintaining event list for snapshot().
+    Raw bytes live only in the preallocated byte ring (anonymous memory
+    committed as it is first written, see ttfr_fastlog.memory). A circular
+    offset/length/timestamp index (compact arrays) tracks the records,
+    oldest first. A record is evicted once a newer write covers its
+    first byte, so memory never grows past the configured capacity.
+
+    Eviction is settled lazily: the write path only copies bytes and
+    fills an index slot, and records overwritten since the last settle
+    are dropped in one pass before anything reads the index.
+
+    Timestamps never go backwards inside the ring (an older stamp is
+    raised to the newest one seen), so time windows are located by
+    binary search over the timestamp index.
     """
 
-    def __init__(self, capacity_bytes: int):
+    # Bytes stored in front of each record's payload (see DurableRingBuffer)
+    _header = 0
+
+    def __init__(self, capacity_bytes: int, buffer=None, hugepages=False, prefault=False):
+        # buffer: preallocated writable buffer of capacity_bytes to use
+        # instead of a new anonymous mapping (e.g. a file mmap);
+        # hugepages / prefault: see ttfr_fastlog.memory.allocate
+        if capacity_bytes <= 0:
+            raise ValueError("capacity_bytes must be positive")
+
         self.capacity = capacity_bytes
-        self.buffer = bytearray(capacity_bytes)
+        if buffer is None:
+            buffer = allocate(capacity_bytes, hugepages, prefault)
+        self.buffer = buffer
         self.write_pos = 0
         self.full = False
-        self.events = []      # logical event list
+
+        # Record index (circular): slot i describes buffer[off[i] : off[i] + len[i]],
+        # stamped with ts[i] (ns since epoch)
+        self._slots = _INITIAL_SLOTS
+        self._off = array("q", bytes(8 * self._slots))
+        self._len = array("I", bytes(array("I").itemsize * self._slots))
+        self._ts = array("q", bytes(8 * self._slots))
+        self._head = 0        # slot of the oldest record
+        self._count = 0       # records in the index (live + not yet settled)
+        self._lap = 0         # records written since the last wrap
+        self._used = 0        # payload bytes in the index
+        self._last_ts = 0     # newest stamp; keeps the index sorted
+        self._evicted = 0     # records dropped so far = seq number of the oldest
+
+    def __len__(self):
+        self._settle()
+        return self._count
+
+    @property
+    def used(self):
+        """Payload bytes held by live records."""
+        self._settle()
+        return self._used
 
     # ---------------------------------------------------------
     # Ingest core function
     # ---------------------------------------------------------
-    def ingest(self, raw: bytes):
+    def ingest(self, raw: bytes, ts: int = None):
         """
-        Write raw bytes into circular buffer + store logical event.
+        Write raw bytes into circular buffer. ``ts`` defaults to
+        ``time.time_ns()``.
+
+        Steady state allocates nothing: the bytes are copied into the
+        ring and the index slots are reused.
         """
+        if ts is None:
+            ts = time_ns()
+        if ts < self._last_ts:
+            ts = self._last_ts
+        else:
+            self._last_ts = ts
+
         n = len(raw)
+        pos = self.write_pos
+        end = pos + n
+        if end > self.capacity:
+            pos = self._wrap(n)
+            end = n
+        self.write_pos = end
+
+        # Write into memory ring
+        self.buffer[pos:end] = raw
+
+        count = self._count
+        if count == self._slots:
+            self._grow_index()
+            count = self._count
+        i = self._head + count
+        if i >= self._slots:
+            i -= self._slots
+        self._off[i] = pos
+        self._len[i] = n
+        self._ts[i] = ts
+        self._count = count + 1
+        self._lap += 1
+        self._used += n
+
+    # ---------------------------------------------------------
+    # TTFR compatibility aliases
+    # ---------------------------------------------------------
+    push = ingest     # used by TTFR engine
+    write = ingest    # used in older TTFR versions
+
+    # ---------------------------------------------------------
+    # Batch ingest
+    # ---------------------------------------------------------
+    def push_many(self, events, offsets=None, ts: int = None, stamps=None):
+        """
+        Write a batch of events with one timestamp base, or with one
+        timestamp each from ``stamps`` (ns; raised where needed so they
+        never go backwards).
 
-        # Wrap
-        if self.write_pos + n > self.capacity:
+        ``events`` is either an iterable of bytes-like objects, or a
+        single contiguous buffer (bytes, bytearray, memoryview, e.g. the
+        result of a socket read) delimited by ``offsets``: event i is
+        ``events[offsets[i] : offsets[i + 1]]``, so ``offsets`` holds
+        one more entry than there are events.
+
+        The batch is copied into the ring with one slice assignment (two
+        when it straddles the end of the buffer). A batch larger than
+        the ring keeps its newest events. Returns the number of events
+        written.
+        """
+        if offsets is None:
+            chunks = events if isinstance(events, (list, tuple)) else list(events)
+            events = b"".join(chunks)
+            offsets = array("q", [0])
+            offsets.extend(accumulate(map(len, chunks)))
+
+        data = memoryview(events).cast("B")
+        n = len(offsets) - 1
+        if stamps is not None and len(stamps) != max(n, 0):
+            raise ValueError("stamps must hold one timestamp per event")
+        if n <= 0:
+            return 0
+
+        if stamps is not None:
+            stamps = array("q", accumulate(stamps, max, initial=self._last_ts))
+            del stamps[0]
+            self._last_ts = stamps[-1]
+        else:
+            if ts is None:
+                ts = time_ns()
+            if ts < self._last_ts:
+                ts = self._last_ts
+            else:
+                self._last_ts = ts
+
+        cap = self.capacity
+        last = offsets[n]
+        first = 0
+        if last - offsets[0] > cap:
+            first = bisect_left(offsets, last - cap, 0, n)
+            if first == n:
+                raise ValueError(
+                    f"event of {last - offsets[n - 1]} bytes exceeds ring capacity of {cap} bytes"
+                )
+            self._overflow(first, last - offsets[first])
+
+        # Events that still fit before the end of the buffer, then the rest from 0
+        split = bisect_right(offsets, offsets[first] + cap - self.write_pos, first, n + 1) - 1
+        if split > first:
+            self._write_run(data, offsets, first, split, ts, stamps)
+        if split < n:
+            self._wrap(offsets[n] - offsets[split])
             self.write_pos = 0
-            self.full = True
+            self._write_run(data, offsets, split, n, ts, stamps)
 
-        # Write into memory ring
-        self.buffer[self.write_pos : self.write_pos + n] = raw
-        self.write_pos += n
+        return n - first
 
-        # Store logical event
-        self.events.append(raw)
+    def _overflow(self, skipped, n):
+        """
+        A batch overflows the ring: everything in it is older than the
+        batch, so evict it all, then let the ``skipped`` oldest events
+        of the batch take their sequence numbers as already evicted. The
+        ``n`` bytes kept start a new lap at offset 0.
+        """
+        self._evict(self._count)
+        self._lap = 0
+        self._evicted += skipped
+        self._wrap(n)
+        self.write_pos = 0
+
+    def _write_run(self, data, offsets, lo, hi, ts, stamps=None, header=0):
+        """
+        Copy events lo..hi-1 to write_pos in one slice and index them;
+        with ``header``, each event starts with that many bytes that are
+        not part of its payload.
+        """
+        base = offsets[lo]
+        pos = self.write_pos
+        end = pos + offsets[hi] - base
+        self.buffer[pos:end] = data[base : offsets[hi]]
+        self.write_pos = end
+
+        m = hi - lo
+        if self._count + m > self._slots:
+            self._grow_index(m)
+
+        shift = pos - base + header
+        new_off = array("q", [o + shift for o in offsets[lo:hi]])
+        new_len = array(
+            "I", [b - a - header for a, b in zip(offsets[lo:hi], offsets[lo + 1 : hi + 1])]
+        )
+        new_ts = array("q", [ts]) * m if stamps is None else stamps[lo:hi]
+
+        # Fill the circular index in at most two contiguous runs
+        slots = self._slots
+        i = self._head + self._count
+        if i >= slots:
+            i -= slots
+        k = min(m, slots - i)
+        self._off[i : i + k] = new_off[:k]
+        self._len[i : i + k] = new_len[:k]
+        self._ts[i : i + k] = new_ts[:k]
+        if k < m:
+            self._off[: m - k] = new_off[k:]
+            self._len[: m - k] = new_len[k:]
+            self._ts[: m - k] = new_ts[k:]
+
+        self._count += m
+        self._lap += m
+        self._used += end - pos - header * m
 
     # ---------------------------------------------------------
-    # TTFR compatibility methods
+    # Space management
     # ---------------------------------------------------------
-    def push(self, raw: bytes):
-        """Alias used by TTFR engine."""
-        self.ingest(raw)
+    def _wrap(self, n):
+        """
+        Start a new lap at offset 0. Whatever is left of the previous
+        lap sits in the tail and is older than anything at the front of
+        the buffer, so it is evicted first.
+        """
+        if n > self.capacity:
+            raise ValueError(
+                f"event of {n} bytes exceeds ring capacity of {self.capacity} bytes"
+            )
 
-    def write(self, raw: bytes):
-        """Alias used in older TTFR versions."""
-        self.ingest(raw)
+        self._evict(self._count - self._lap)
+        self._lap = 0
+        self.full = True
+        return 0
+
+    def _settle(self):
+        """
+        Evict previous-lap records whose first byte has been overwritten
+        by the current lap.
+        """
+        off, pos, slots = self._off, self.write_pos + self._header, self._slots
+        head, stale = self._head, 0
+        older = self._count - self._lap
+        while stale < older and off[head] < pos:
+            stale += 1
+            head += 1
+            if head == slots:
+                head = 0
+        if stale:
+            self._evict(stale)
+
+    def _evict(self, k):
+        """Drop the k oldest records from the index."""
+        ln, head, slots = self._len, self._head, self._slots
+        used = self._used
+        for _ in range(k):
+            used -= ln[head]
+            head += 1
+            if head == slots:
+                head = 0
+        self._head = head
+        self._count -= k
+        self._used = used
+        self._evicted += k
+
+    def _grow_index(self, extra=1):
+        """
+        Make room for ``extra`` more records: settle first, and only if
+        the live records still don't leave room double the index,
+        rotating the oldest record to slot 0.
+        """
+        self._settle()
+        if self._count + extra <= self._slots:
+            return
+
+        slots = self._slots
+        while self._count + extra > slots:
+            slots *= 2
+        h, pad = self._head, slots - self._slots
+        self._off = self._off[h:] + self._off[:h] + array("q", bytes(8 * pad))
+        self._len = self._len[h:] + self._len[:h] + array("I", bytes(self._len.itemsize * pad))
+        self._ts = self._ts[h:] + self._ts[:h] + array("q", bytes(8 * pad))
+        self._slots = slots
+        self._head = 0
+
+    def _live_slots(self, lo=0, hi=None):
+        """Slots of the live records at logical positions lo..hi-1."""
+        self._settle()
+        if hi is None:
+            hi = self._count
+        slots = self._slots
+        start, stop = self._head + lo, self._head + hi
+        if stop <= slots:
+            return range(start, stop)
+        if start >= slots:
+            return range(start - slots, stop - slots)
+        return list(range(start, slots)) + list(range(0, stop - slots))
+
+    def _bisect(self, ts):
+        """Logical position of the first live record stamped >= ts."""
+        self._settle()
+        stamps, head, slots = self._ts, self._head, self._slots
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = head + mid
+            if i >= slots:
+                i -= slots
+            if stamps[i] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _window(self, start_ts, end_ts):
+        """Slots of the live records stamped in [start_ts, end_ts)."""
+        self._settle()
+        lo = 0 if start_ts is None else self._bisect(start_ts)
+        hi = self._count if end_ts is None else max(lo, self._bisect(end_ts))
+        return self._live_slots(lo, hi)
+
+    # ---------------------------------------------------------
+    # Readout
+    # ---------------------------------------------------------
+    def dump(self):
+        """
+        Return the live records, oldest first, copied out of the ring.
+        """
+        mv = memoryview(self.buffer)
+        off, ln = self._off, self._len
+        return [bytes(mv[off[i] : off[i] + ln[i]]) for i in self._live_slots()]
+
+    def dump_range(self, start_ts, end_ts=None):
+        """
+        Return the live records stamped in ``[start_ts, end_ts)``: a
+        binary search to find the window, then a copy of just that.
+        """
+        mv = memoryview(self.buffer)
+        off, ln = self._off, self._len
+        return [bytes(mv[off[i] : off[i] + ln[i]]) for i in self._window(start_ts, end_ts)]
+
+    def dump_last(self, seconds):
+        """Return the records stamped within the last ``seconds``."""
+        return self.dump_range(time_ns() - int(seconds * 1_000_000_000))
+
+    def records(self, start_ts=None, end_ts=None):
+        """
+        Yield ``(ts, raw)`` for every live record stamped in
+        ``[start_ts, end_ts)`` (default: all of them), oldest first.
+        """
+        mv = memoryview(self.buffer)
+        off, ln, stamps = self._off, self._len, self._ts
+        for i in self._window(start_ts, end_ts):
+            yield stamps[i], bytes(mv[off[i] : off[i] + ln[i]])
+
+    def columns(self, start_ts=None, end_ts=None):
+        """
+        ``(ts, offsets, lengths, data)`` for the live records stamped in
+        ``[start_ts, end_ts)``: packed int64/int64/uint32 arrays, one
+        entry per record, pointing into ``data`` (here the ring's own
+        buffer, so only valid until the next write). Nothing is built
+        per record; see ttfr_fastlog.ring_arrays.
+        """
+        self._settle()
+        lo = 0 if start_ts is None else self._bisect(start_ts)
+        hi = self._count if end_ts is None else max(lo, self._bisect(end_ts))
+        start, stop, slots = self._head + lo, self._head + hi, self._slots
+        if stop <= slots:
+            runs = [(start, stop)]
+        elif start >= slots:
+            runs = [(start - slots, stop - slots)]
+        else:
+            runs = [(start, slots), (0, stop - slots)]
+
+        ts, off, ln = array("q"), array("q"), array("I")
+        for a, b in runs:
+            ts += self._ts[a:b]
+            off += self._off[a:b]
+            ln += self._len[a:b]
+        return ts, off, ln, self.buffer
+
+    def seq_range(self, start_ts=None, end_ts=None):
+        """
+        ``(first, end)`` sequence numbers of the live records stamped in
+        ``[start_ts, end_ts)``. Numbers start at 0 for the first record
+        ever written and survive eviction, so a reader can page through
+        the ring with records_seq().
+        """
+        self._settle()
+        lo = 0 if start_ts is None else self._bisect(start_ts)
+        hi = self._count if end_ts is None else max(lo, self._bisect(end_ts))
+        return self._evicted + lo, self._evicted + hi
+
+    def records_seq(self, first, end):
+        """
+        ``[(ts, raw), ...]`` for the records numbered ``[first, end)``
+        that are still live.
+        """
+        self._settle()
+        lo = min(max(first - self._evicted, 0), self._count)
+        hi = min(max(end - self._evicted, lo), self._count)
+        mv = memoryview(self.buffer)
+        off, ln, stamps = self._off, self._len, self._ts
+        return [
+            (stamps[i], bytes(mv[off[i] : off[i] + ln[i]]))
+            for i in self._live_slots(lo, hi)
+        ]
+
+    def headroom(self, seq, count=1):
+        """
+        Payload bytes that the next writes (``count`` events) may total
+        without evicting record ``seq``: negative once it is gone, the
+        whole capacity if it is not written yet.
+        """
+        self._settle()
+        i = seq - self._evicted
+        if i < 0:
+            return -1
+        if i >= self._count:
+            return self.capacity
+        j = self._head + i
+        if j >= self._slots:
+            j -= self._slots
+        o = self._off[j]
+        if i < self._count - self._lap:
+            # Previous lap: the write position is closing in on it
+            return o - self.write_pos
+        # Current lap: safe until the end of the buffer, or up to o after a wrap
+        return max(self.capacity - self.write_pos, o)
 
     # ---------------------------------------------------------
     # Snapshot (returns LZ4-compressed JSON list)
     # ---------------------------------------------------------
     def snapshot(self):
         """
-        Export all stored events into compressed JSON.
+        Export all live events into compressed JSON.
         """
         try:
             decoded = [
-                e.decode("utf-8", errors="ignore") for e in self.events
+                e.decode("utf-8", errors="ignore") for e in self.dump()
             ]
             structured = [{"event": d} for d in decoded]
             return compress_json(structured)
@@ -111,9 +543,74 @@ class RingBuffer:
     # Clear events + reset buffer
     # ---------------------------------------------------------
     def clear(self):
+        self._settle()
+        self._evicted += self._count
         self.write_pos = 0
         self.full = False
-        self.events.clear()
+        self._head = 0
+        self._count = 0
+        self._lap = 0
+        self._used = 0
+        self._last_ts = 0
+
+
+# ============================================================
+#  Backend selection
+# ============================================================
+
+if FASTLOG_BACKEND == "rust":
+
+    class RingBuffer(_NativeRingBuffer):
+        """
+        Native ring (fastlog_core::RingBuffer via fastlog_py) with the
+        same API as PyRingBuffer. Bulk push/dump release the GIL.
+        """
+
+        ingest = _NativeRingBuffer.push
+        write = _NativeRingBuffer.push
+        snapshot = PyRingBuffer.snapshot
+
+else:
+    RingBuffer = PyRingBuffer
+
+
+# ============================================================
+#  Lazily imported submodules
+# ============================================================
+# Snapshot files pull in multiprocessing and concurrent.futures, the
+# shared and durable rings mmap/fcntl; a process that only needs the
+# ring (or nothing at all, like `ttfr status`) should not pay for them.
+# Each name is imported from its module on first access.
+
+_LAZY = {
+    "SnapshotReader": "snapshot",
+    "SnapshotWriter": "snapshot",
+    "iter_records": "snapshot",
+    "read_snapshot": "snapshot",
+    "recompress_snapshot": "snapshot",
+    "snapshot_arrays": "snapshot",
+    "write_snapshot": "snapshot",
+    "EventArrays": "arrays",
+    "ring_arrays": "arrays",
+    "SharedProducer": "shared",
+    "SharedRing": "shared",
+    "DurableRingBuffer": "durable",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
 
 
 # ============================================================
@@ -121,9 +618,28 @@ class RingBuffer:
 # ============================================================
 
 __all__ = [
+    "Codec",
     "compress_json",
     "decompress_json",
+    "compress_records",
+    "compress_columns",
+    "decompress_columns",
     "RingBuffer",
+    "PyRingBuffer",
+    "allocate",
+    "memory_report",
+    "DurableRingBuffer",
+    "SnapshotReader",
+    "SnapshotWriter",
+    "iter_records",
+    "read_snapshot",
+    "recompress_snapshot",
+    "write_snapshot",
+    "EventArrays",
+    "ring_arrays",
+    "snapshot_arrays",
+    "SharedRing",
+    "SharedProducer",
     "FASTLOG_BACKEND",
 ]
 
@@ -0,0 +1,266 @@
+# ============================================================
+#  FASTLOG – NumPy export (optional)
+# ============================================================
+#
+#  Events as flat arrays for bulk analytics instead of one dict per
+#  event:
+#
+#      ts       int64[n]   timestamp (ns)
+#      starts   int64[n]   offset of each message in data
+#      lengths  int64[n]   byte length of each message
+#      data     uint8[m]   message bytes
+#
+#  Columnar snapshot blocks are decoded with vectorized varint / zigzag
+#  / prefix-sum passes straight into these arrays, and a repeated
+#  message is kept once in ``data`` (events share its start). Ring
+#  windows are copied out one pass per run between wraps. No Python
+#  object is created per event on either path.
+#
+#  numpy is only imported when an export is made.
+
+from .columnar import split_columns
+
+
+def _np():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("array export needs numpy (pip install numpy)")
+    return numpy
+
+
+class EventArrays:
+    """
+    Events as NumPy columns (see the module header). Indexing with a
+    slice, boolean mask or index array selects events and shares
+    ``data``:
+
+        ev = snapshot_arrays("incident.ttfr")
+        hits = ev[ev.contains(b"mimikatz")]
+        buckets, counts = hits.time_buckets(1_000_000_000)
+    """
+
+    __slots__ = ("ts", "starts", "lengths", "data")
+
+    def __init__(self, ts, starts, lengths, data):
+        self.ts = ts
+        self.starts = starts
+        self.lengths = lengths
+        self.data = data
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __getitem__(self, key):
+        return EventArrays(self.ts[key], self.starts[key], self.lengths[key], self.data)
+
+    def __repr__(self):
+        return f"EventArrays({len(self)} events, {len(self.data)} message bytes)"
+
+    def message(self, i):
+        """Raw bytes of event ``i``."""
+        s = int(self.starts[i])
+        return self.data[s : s + int(self.lengths[i])].tobytes()
+
+    def messages(self, width=None):
+        """
+        Fixed-width ``S<width>`` array of the messages (NUL padded,
+        truncated to ``width``; default the longest message). Usable with
+        np.char, np.unique, sorting and joins.
+        """
+        np = _np()
+        n = len(self)
+        if width is None:
+            width = int(self.lengths.max()) if n else 0
+        width = max(int(width), 1)
+        out = np.zeros((n, width), np.uint8)
+        take = np.minimum(self.lengths, width)
+        # One pass per byte column, each vectorized over every event
+        for j in range(int(take.max()) if n else 0):
+            sel = np.flatnonzero(take > j)
+            out[sel, j] = self.data[self.starts[sel] + j]
+        return out.view(f"S{width}").reshape(n)
+
+    def to_structured(self, width=None):
+        """Structured array with ``ts`` (int64) and ``msg`` (``S<width>``) fields."""
+        np = _np()
+        msgs = self.messages(width)
+        out = np.empty(len(self), dtype=[("ts", "<i8"), ("msg", msgs.dtype)])
+        out["ts"] = self.ts
+        out["msg"] = msgs
+        return out
+
+    def between(self, start_ts=None, end_ts=None):
+        """The events stamped in ``[start_ts, end_ts)``."""
+        np = _np()
+        mask = np.ones(len(self), bool)
+        if start_ts is not None:
+            mask &= self.ts >= start_ts
+        if end_ts is not None:
+            mask &= self.ts < end_ts
+        return self[mask].compact()
+
+    def compact(self):
+        """
+        A copy whose ``data`` holds only the messages these events use,
+        each shared message once, so a small selection no longer keeps
+        the whole source buffer alive.
+        """
+        np = _np()
+        if not len(self):
+            return concat_arrays([])
+        spans, inv = np.unique(np.stack((self.starts, self.lengths), 1), axis=0, return_inverse=True)
+        inv = inv.reshape(-1)
+        starts, lengths = spans[:, 0], spans[:, 1]
+        new = np.cumsum(lengths) - lengths
+        take = np.repeat(starts - new, lengths) + np.arange(int(lengths.sum()), dtype=np.int64)
+        return EventArrays(self.ts.copy(), new[inv], lengths[inv], self.data[take])
+
+    def contains(self, needle):
+        """Boolean mask of the events whose message contains ``needle`` (bytes)."""
+        np = _np()
+        if isinstance(needle, str):
+            needle = needle.encode("utf-8")
+        if not needle:
+            return np.ones(len(self), bool)
+        # Search data once; map each hit back to the messages spanning it
+        data = self.data.tobytes()
+        hits = []
+        at = data.find(needle)
+        while at >= 0:
+            hits.append(at)
+            at = data.find(needle, at + 1)
+        if not hits:
+            return np.zeros(len(self), bool)
+        hits = np.asarray(hits, np.int64)
+        ends = self.starts + self.lengths - len(needle)
+        # First hit at or after each message start, then check it fits
+        first = np.searchsorted(hits, self.starts)
+        ok = first < len(hits)
+        mask = np.zeros(len(self), bool)
+        mask[ok] = hits[first[ok]] <= ends[ok]
+        return mask
+
+    def time_buckets(self, bucket_ns):
+        """``(bucket_start_ts, counts)`` of the events per ``bucket_ns`` interval."""
+        np = _np()
+        keys = self.ts // bucket_ns * bucket_ns
+        return np.unique(keys, return_counts=True)
+
+
+def concat_arrays(parts):
+    """Join EventArrays into one, copying each ``data`` buffer once."""
+    np = _np()
+    parts = list(parts)
+    if not parts:
+        z = np.zeros(0, np.int64)
+        return EventArrays(z, z.copy(), z.copy(), np.zeros(0, np.uint8))
+    if len(parts) == 1:
+        return parts[0]
+    base = np.cumsum([0] + [len(p.data) for p in parts[:-1]])
+    return EventArrays(
+        np.concatenate([p.ts for p in parts]),
+        np.concatenate([p.starts + b for p, b in zip(parts, base)]),
+        np.concatenate([p.lengths for p in parts]),
+        np.concatenate([p.data for p in parts]),
+    )
+
+
+def events_arrays(events):
+    """
+    EventArrays from decoded ``{"ts", "msg"}`` dicts (JSON blocks and
+    older snapshots). This walks the events once; columnar blocks go
+    through columns_arrays instead.
+    """
+    np = _np()
+    events = list(events)
+    msgs = [e.get("msg", "").encode("utf-8") for e in events]
+    ts = np.fromiter((e.get("ts", 0) for e in events), np.int64, len(msgs))
+    lengths = np.fromiter(map(len, msgs), np.int64, len(msgs))
+    starts = np.cumsum(lengths) - lengths
+    return EventArrays(ts, starts, lengths, np.frombuffer(b"".join(msgs), np.uint8))
+
+
+def _varints(np, raw, n):
+    """Vectorized LEB128 decode of exactly ``n`` values."""
+    b = np.frombuffer(raw, np.uint8)
+    if len(b) == n:
+        # Every value fits in one byte
+        if n and b.max() >= 0x80:
+            raise RuntimeError("corrupt columnar block")
+        return b.astype(np.uint64)
+    last = np.flatnonzero(b < 0x80)
+    if len(last) != n or last[-1] != len(b) - 1 or len(b) > 10 * n:
+        raise RuntimeError("corrupt columnar block")
+    first = np.empty(n, np.int64)
+    first[0] = 0
+    first[1:] = last[:-1] + 1
+    # Byte k of a value carries bits 7k..7k+6
+    k = np.arange(len(b), dtype=np.int64) - np.repeat(first, last - first + 1)
+    if k.max() > 9:
+        raise RuntimeError("corrupt columnar block")
+    parts = (b & 0x7F).astype(np.uint64) << (7 * k).astype(np.uint64)
+    return np.add.reduceat(parts, first)
+
+
+def columns_arrays(block, codec=None):
+    """Decode one columnar block (see ttfr_fastlog.columnar) into EventArrays."""
+    np = _np()
+    count, distinct, ts_col, lens, data, id_col = split_columns(block, codec)
+    if not count:
+        return concat_arrays([])
+
+    z = _varints(np, ts_col, count)
+    deltas = (z >> np.uint64(1)).astype(np.int64) ^ -(z & np.uint64(1)).astype(np.int64)
+    ts = np.cumsum(deltas)
+
+    lengths = _varints(np, lens, distinct).astype(np.int64)
+    starts = np.cumsum(lengths) - lengths
+    if int(lengths.sum()) != len(data):
+        raise RuntimeError("corrupt columnar block")
+    if distinct < count:
+        ids = _varints(np, id_col, count)
+        if ids.max() >= distinct:
+            raise RuntimeError("corrupt columnar block")
+        starts, lengths = starts[ids], lengths[ids]
+    return EventArrays(ts, starts, lengths, np.frombuffer(data, np.uint8))
+
+
+def ring_arrays(ring, start_ts=None, end_ts=None):
+    """
+    EventArrays of the records a RingBuffer holds in ``[start_ts, end_ts)``
+    (default: all of them). The messages are copied out of the ring, so
+    the result stays valid after further writes; hold whatever lock
+    guards the ring for the duration of the call (TTFR_Engine.arrays
+    does).
+    """
+    np = _np()
+    ts, off, ln, buf = ring.columns(start_ts, end_ts)
+    ts = np.frombuffer(ts, np.int64)
+    off = np.frombuffer(off, np.int64)
+    lengths = np.frombuffer(ln, np.uint32).astype(np.int64)
+    n = len(ts)
+    if not n:
+        return concat_arrays([])
+
+    # Records are in write order, so their offsets only step back where
+    # the ring wrapped. Each run between wraps is copied in one pass: a
+    # plain slice when its payloads are back to back, otherwise (record
+    # headers in between, as in a DurableRingBuffer) one mask over the
+    # run's span that keeps just the payload bytes
+    buf = np.frombuffer(buf, np.uint8)
+    ends = off + lengths
+    cuts = np.flatnonzero(off[1:] < ends[:-1]) + 1
+    bounds = [0, *cuts.tolist(), n]
+    pieces = []
+    for a, b in zip(bounds, bounds[1:]):
+        lo, hi = int(off[a]), int(ends[b - 1])
+        if hi - lo == int(lengths[a:b].sum()):
+            pieces.append(buf[lo:hi])
+            continue
+        edges = np.zeros(hi - lo + 1, np.int8)
+        np.add.at(edges, off[a:b] - lo, 1)
+        np.add.at(edges, ends[a:b] - lo, -1)
+        pieces.append(buf[lo:hi][np.cumsum(edges[:-1], dtype=np.int8).astype(bool)])
+    data = np.concatenate(pieces)
+    return EventArrays(ts.copy(), np.cumsum(lengths) - lengths, lengths, data)
@@ -0,0 +1,125 @@
+# ============================================================
+#  FASTLOG – Block codecs (pure-python fallback)
+# ============================================================
+#
+#  Same codecs, ids and wire formats as fastlog_core::Codec, so blocks
+#  written by either backend read back with the other:
+#
+#      0  lz4        size-prefixed LZ4 block, level = acceleration
+#      1  lz4hc      same block format, LZ4 high-compression mode
+#      2  zstd       zstd frame
+#      3  zstd-dict  zstd frame against a trained dictionary
+#
+#  zstd needs the optional ``zstandard`` package; it is only imported
+#  when a zstd codec is used.
+
+import lz4.block as lz4b
+
+CODEC_LZ4 = 0
+CODEC_LZ4HC = 1
+CODEC_ZSTD = 2
+CODEC_ZSTD_DICT = 3
+
+_NAMES = {CODEC_LZ4: "lz4", CODEC_LZ4HC: "lz4hc", CODEC_ZSTD: "zstd", CODEC_ZSTD_DICT: "zstd-dict"}
+_IDS = {name: i for i, name in _NAMES.items()}
+_DEFAULT_LEVEL = {"lz4": 1, "lz4hc": 9, "zstd": 3, "zstd-dict": 3}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd codecs need the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+class PyCodec:
+    """
+    A block codec: ``lz4`` (level = acceleration), ``lz4hc``, ``zstd``
+    or ``zstd-dict``. ``name`` may carry the level, as in
+    ``PyCodec("zstd:19")``.
+    """
+
+    def __init__(self, name="lz4", level=None, dictionary=None):
+        if level is None and ":" in name:
+            name, _, spec = name.partition(":")
+            try:
+                level = int(spec)
+            except ValueError:
+                raise ValueError(f"invalid codec level '{spec}'")
+        if name not in _IDS:
+            raise ValueError(f"unknown codec '{name}' (lz4, lz4hc, zstd, zstd-dict)")
+        if (dictionary is not None) != (name == "zstd-dict"):
+            raise ValueError(
+                "zstd-dict needs a dictionary" if dictionary is None
+                else f"codec '{name}' takes no dictionary"
+            )
+
+        level = _DEFAULT_LEVEL[name] if level is None else int(level)
+        if name == "lz4":
+            level = max(level, 1)
+        elif name == "lz4hc":
+            level = min(max(level, 1), 12)
+        self.name = name
+        self.id = _IDS[name]
+        self.level = level
+        self.dictionary = None if dictionary is None else bytes(dictionary)
+
+    @staticmethod
+    def from_id(id, level, dictionary=None):
+        """Codec recorded as ``id``/``level`` in a snapshot header."""
+        if id not in _NAMES:
+            raise ValueError(f"unknown codec id {id}")
+        return PyCodec(_NAMES[id], level, dictionary)
+
+    @staticmethod
+    def train(samples, size=112640, level=3):
+        """
+        zstd-dict codec with a dictionary of at most ``size`` bytes
+        trained on ``samples`` (e.g. recent raw events).
+        """
+        zstandard = _zstd()
+        try:
+            d = zstandard.train_dictionary(size, [bytes(s) for s in samples])
+        except Exception as e:
+            raise RuntimeError(f"zstd dictionary training failed: {e}")
+        return PyCodec("zstd-dict", level, d.as_bytes())
+
+    def compress(self, data):
+        try:
+            if self.id == CODEC_LZ4:
+                return lz4b.compress(data, mode="fast", acceleration=self.level)
+            if self.id == CODEC_LZ4HC:
+                return lz4b.compress(data, mode="high_compression", compression=self.level)
+            return self._zstd_compressor().compress(data)
+        except RuntimeError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"{self.name} compress error: {e}")
+
+    def decompress(self, data):
+        try:
+            if self.id in (CODEC_LZ4, CODEC_LZ4HC):
+                return lz4b.decompress(data)
+            return self._zstd_decompressor().decompress(data)
+        except RuntimeError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"{self.name} decompress error: {e}")
+
+    # zstandard (de)compressors are not thread-safe; one per call
+    def _zstd_compressor(self):
+        zstandard = _zstd()
+        if self.dictionary is None:
+            return zstandard.ZstdCompressor(level=self.level)
+        d = zstandard.ZstdCompressionDict(self.dictionary)
+        return zstandard.ZstdCompressor(level=self.level, dict_data=d)
+
+    def _zstd_decompressor(self):
+        zstandard = _zstd()
+        if self.dictionary is None:
+            return zstandard.ZstdDecompressor()
+        return zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(self.dictionary))
+
+    def __repr__(self):
+        return f"Codec('{self.name}:{self.level}')"
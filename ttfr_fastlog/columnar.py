@@ -0,0 +1,176 @@
+# ============================================================
+#  FASTLOG – Columnar event blocks (pure-python fallback)
+# ============================================================
+#
+#  Same layout as fastlog_core::columnar, byte for byte:
+#
+#      u32 events | u32 distinct messages
+#      ts     zigzag varint deltas (the first from 0)
+#      lens   varint byte length of each distinct message
+#      data   the distinct messages back to back, in first-seen order
+#      ids    varint message id per event; empty when all are distinct
+#
+#  each section stored as u32 size | codec blob (size 0 = empty).
+
+import struct
+
+from .codec import PyCodec
+
+_COUNTS = struct.Struct("<II")
+_SIZE = struct.Struct("<I")
+_LZ4 = PyCodec()
+
+
+def _put_varints(values, out):
+    append = out.append
+    for v in values:
+        while v >= 0x80:
+            append((v & 0x7F) | 0x80)
+            v >>= 7
+        append(v)
+
+
+def _get_varints(buf, n):
+    if buf.isascii():
+        # Every value fits in one byte
+        out = list(buf)
+        if len(out) != n:
+            raise RuntimeError("corrupt columnar block")
+        return out
+    out = []
+    append = out.append
+    v = shift = 0
+    for b in buf:
+        if b < 0x80:
+            append(v | (b << shift))
+            v = shift = 0
+        else:
+            v |= (b & 0x7F) << shift
+            shift += 7
+    if len(out) != n or shift:
+        raise RuntimeError("corrupt columnar block")
+    return out
+
+
+def _get_timestamps(buf, n):
+    """Varint decode, zigzag decode and prefix sum in one pass."""
+    out = []
+    append = out.append
+    v = shift = prev = 0
+    for b in buf:
+        if b < 0x80:
+            v |= b << shift
+            prev += (v >> 1) ^ -(v & 1)
+            append(prev)
+            v = shift = 0
+        else:
+            v |= (b & 0x7F) << shift
+            shift += 7
+    if len(out) != n or shift:
+        raise RuntimeError("corrupt columnar block")
+    return out
+
+
+def _put_section(raw, codec, out):
+    if not raw:
+        out += _SIZE.pack(0)
+        return
+    blob = codec.compress(bytes(raw))
+    out += _SIZE.pack(len(blob))
+    out += blob
+
+
+def _get_section(block, pos, codec):
+    if pos + _SIZE.size > len(block):
+        raise RuntimeError("truncated columnar block")
+    (n,) = _SIZE.unpack_from(block, pos)
+    pos += _SIZE.size
+    if not n:
+        return b"", pos
+    if pos + n > len(block):
+        raise RuntimeError("truncated columnar block")
+    return codec.decompress(block[pos : pos + n]), pos + n
+
+
+def compress_columns(records, codec=None):
+    """
+    Pure-python fallback [(ts, raw), ...] → columnar block. Invalid
+    UTF-8 is dropped from messages, as in compress_records.
+    """
+    codec = codec or _LZ4
+    zigzag = []
+    ids = []
+    by_raw = {}
+    by_text = {}
+    texts = []
+    prev = 0
+    for ts, raw in records:
+        d = ts - prev
+        prev = ts
+        zigzag.append(d << 1 if d >= 0 else (-d << 1) - 1)
+        i = by_raw.get(raw)
+        if i is None:
+            text = raw.decode("utf-8", errors="ignore").encode("utf-8")
+            i = by_text.get(text)
+            if i is None:
+                i = by_text[text] = len(texts)
+                texts.append(text)
+            by_raw[raw] = i
+        ids.append(i)
+
+    ts_col = bytearray()
+    _put_varints(zigzag, ts_col)
+    lens = bytearray()
+    _put_varints(map(len, texts), lens)
+    id_col = bytearray()
+    if len(texts) < len(ids):
+        _put_varints(ids, id_col)
+
+    out = bytearray(_COUNTS.pack(len(ids), len(texts)))
+    _put_section(ts_col, codec, out)
+    _put_section(lens, codec, out)
+    _put_section(b"".join(texts), codec, out)
+    _put_section(id_col, codec, out)
+    return bytes(out)
+
+
+def split_columns(block, codec=None):
+    """
+    Decompress a columnar block's sections without decoding them:
+    ``(count, distinct, ts, lens, data, ids)``, the last four as the
+    raw varint / message bytes laid out above.
+    """
+    codec = codec or _LZ4
+    if len(block) < _COUNTS.size:
+        raise RuntimeError("truncated columnar block")
+    count, distinct = _COUNTS.unpack_from(block)
+    pos = _COUNTS.size
+    ts_col, pos = _get_section(block, pos, codec)
+    lens, pos = _get_section(block, pos, codec)
+    data, pos = _get_section(block, pos, codec)
+    id_col, pos = _get_section(block, pos, codec)
+    if distinct > count:
+        raise RuntimeError("corrupt columnar block")
+    return count, distinct, ts_col, lens, data, id_col
+
+
+def decompress_columns(block, codec=None):
+    """Pure-python fallback columnar block → [{"ts": ts, "msg": str}, ...]."""
+    count, distinct, ts_col, lens, data, id_col = split_columns(block, codec)
+
+    ts = _get_timestamps(ts_col, count)
+
+    msgs = []
+    at = 0
+    for n in _get_varints(lens, distinct):
+        msgs.append(data[at : at + n].decode("utf-8", errors="replace"))
+        at += n
+    if at != len(data):
+        raise RuntimeError("corrupt columnar block")
+
+    if distinct < count:
+        ids = _get_varints(id_col, count)
+        if ids and max(ids) >= distinct:
+            raise RuntimeError("corrupt columnar block")
+        return [{"ts": t, "msg": msgs[i]} for t, i in zip(ts, ids)]
+    return [{"ts": t, "msg": m} for t, m in zip(ts, msgs)]
@@ -0,0 +1,479 @@
+# ============================================================
+#  FASTLOG – Crash-durable ring (file-backed mmap)
+# ============================================================
+#
+#  DurableRingBuffer is PyRingBuffer with its byte ring in a
+#  preallocated, memory-mapped file instead of a bytearray, so the
+#  buffered minutes survive the recorder being killed (the pages live
+#  in the page cache) and, once synced, a host crash or reboot.
+#
+#  File layout:
+#
+#      header   one page    magic, version, capacity, generation, write_pos
+#      ring     capacity    records, back to back:
+#
+#          [magic: 4s][generation: u32][ts: u64][len: u32][crc32: u32][payload]
+#
+#  ``generation`` counts laps: a record is stamped with the lap it was
+#  written in. The crc32 of the payload starts from generation xor the
+#  low 32 bits of ts (and len bounds what it covers), so a torn or
+#  stale record never passes for a live one.
+#
+#  Recovery (opening an existing file) rebuilds the index from the
+#  records alone, in one pass: valid records with the generation found
+#  at offset 0 are the current lap, those with the one before it (past
+#  the current lap's end) the previous lap. The pass skips over
+#  anything invalid to the next record magic, so a torn or corrupt
+#  record costs only itself. Nothing else in the file is trusted.
+#
+#  Writes go straight to the mapping, as with the in-memory ring. A
+#  background thread msyncs what was written since its last pass every
+#  ``sync_interval`` seconds, so the ingest path never waits for the
+#  disk: it only publishes the lap it is on (generation, and where the
+#  previous lap ended) under a lock taken once per wrap, and advances
+#  write_pos after the bytes are in the mapping. Each pass flushes just
+#  that dirty range, across a wrap too, with the GIL released.
+
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import weakref
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, repeat
+from time import time_ns
+
+from . import _INITIAL_SLOTS, PyRingBuffer
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"TTFRRING"
+VERSION = 1
+
+_FILE = struct.Struct("<8sIIQQQ")   # magic, version, header bytes, capacity, generation, write_pos
+_STATE = struct.Struct("<QQ")       # generation, write_pos
+_STATE_AT = 24
+_HEADER_BYTES = max(4096, mmap.ALLOCATIONGRANULARITY)
+
+_REC = struct.Struct("<4sIQII")     # magic, generation, ts, len, crc32
+_REC_MAGIC = b"\xfeTT\x00"
+RECORD_HEADER = _REC.size
+
+_PAGE = mmap.PAGESIZE
+
+
+def _libc_msync():
+    """libc msync, called through ctypes so the GIL is released (mmap.flush holds it)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        msync = libc.msync
+    except (ImportError, OSError, AttributeError):
+        return None
+    msync.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int)
+    msync.restype = ctypes.c_int
+    return msync
+
+
+_msync = _libc_msync()
+_MS_SYNC = 4    # Linux
+
+
+def _address(m):
+    """Base address of mapping ``m``, or None where msync goes through mmap.flush."""
+    if _msync is None:
+        return None
+    import ctypes
+
+    anchor = ctypes.c_char.from_buffer(m)
+    try:
+        return ctypes.addressof(anchor)
+    finally:
+        del anchor    # release the buffer export, or the mapping could not close
+
+
+def _sync_loop(ref, stop, interval):
+    """
+    Background syncer: flush a ring's new writes until it closes or is
+    collected. A failed pass is logged, kept as the ring's sync_error
+    and retried on the next one.
+    """
+    while not stop.wait(interval):
+        ring = ref()
+        if ring is None:
+            return
+        try:
+            ring.sync()
+        except (OSError, ValueError) as e:
+            if stop.is_set():
+                return      # closed under us
+            if ring.sync_error is None:
+                log.error("syncing ring file %s failed, retrying: %s", ring.path, e)
+            ring.sync_error = e
+        del ring
+
+
+class DurableRingBuffer(PyRingBuffer):
+    """
+    A PyRingBuffer kept in the file at ``path``: created with
+    ``capacity_bytes`` of ring, or reopened (and recovered) when it
+    exists. Use it as the engine's ring:
+
+        engine = TTFR_Engine(ring=DurableRingBuffer("/var/lib/ttfr/ring", 512 << 20))
+
+    ``sync_interval`` bounds how much a host crash can lose: new writes
+    are msync'ed that often by a background thread (None: left to the
+    kernel's writeback; 0: on every write, on the writing thread).
+    sync() and close() flush everything. ``sync_error`` holds the error
+    of the last failed background sync until a sync succeeds again. One
+    process at a time may open a file.
+    """
+
+    _header = RECORD_HEADER
+
+    def __init__(self, path, capacity_bytes=None, sync_interval=1.0):
+        self._state_lock = threading.Lock()     # generation / lap changes vs the syncer
+        self._sync_lock = threading.Lock()      # one flush at a time
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                raise RuntimeError(f"ring file {path} is already open") from None
+
+            header = os.pread(fd, _FILE.size, 0)
+            existing = bool(header)
+            if existing:
+                magic, version, header_bytes, capacity, generation, _ = _FILE.unpack(header)
+                if magic != MAGIC or version != VERSION or header_bytes != _HEADER_BYTES:
+                    raise ValueError(f"{path} is not a TTFR ring file")
+                if capacity_bytes is not None and capacity_bytes != capacity:
+                    raise ValueError(
+                        f"{path} holds a {capacity}-byte ring, not {capacity_bytes} bytes"
+                    )
+            else:
+                if capacity_bytes is None:
+                    raise ValueError("capacity_bytes is needed to create a ring file")
+                if capacity_bytes <= 0:
+                    raise ValueError("capacity_bytes must be positive")
+                capacity, generation = capacity_bytes, 0
+                size = _HEADER_BYTES + capacity
+                if hasattr(os, "posix_fallocate"):
+                    # Reserve the blocks now: a full disk fails here, not as SIGBUS later
+                    os.posix_fallocate(fd, 0, size)
+                else:
+                    os.ftruncate(fd, size)
+                os.pwrite(fd, _FILE.pack(MAGIC, VERSION, _HEADER_BYTES, capacity, 0, 0), 0)
+
+            self._meta = mmap.mmap(fd, _HEADER_BYTES)
+            data = mmap.mmap(fd, capacity, offset=_HEADER_BYTES)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        super().__init__(capacity, buffer=data)
+        self.path = path
+        self.sync_interval = sync_interval
+        self.generation = generation
+        self._fd = fd
+        self._addr = _address(data)
+        if existing:
+            self._recover()
+        self._lap_end = self.capacity     # where the lap before this generation ended
+        self._synced_gen = self.generation
+        self._synced_pos = self.write_pos
+        self._sync_each = sync_interval == 0
+        self._syncer = None
+        self.sync_error = None
+        self._stop = threading.Event()
+        if sync_interval:
+            self._syncer = threading.Thread(
+                target=_sync_loop, args=(weakref.ref(self), self._stop, sync_interval),
+                name="ttfr-ring-sync", daemon=True,
+            )
+            self._syncer.start()
+
+    # ---------------------------------------------------------
+    # Ingest
+    # ---------------------------------------------------------
+    def ingest(self, raw: bytes, ts: int = None):
+        """Write one event (see PyRingBuffer.ingest) with its record header."""
+        if ts is None:
+            ts = time_ns()
+        if ts < self._last_ts:
+            ts = self._last_ts
+        else:
+            self._last_ts = ts
+
+        n = len(raw)
+        pos = self.write_pos
+        end = pos + RECORD_HEADER + n
+        if end > self.capacity:
+            pos = self._wrap(RECORD_HEADER + n)
+            end = RECORD_HEADER + n
+
+        gen = self.generation
+        crc = zlib.crc32(raw, gen ^ ts & 0xFFFFFFFF)
+        self.buffer[pos:end] = _REC.pack(_REC_MAGIC, gen, ts, n, crc) + raw
+        # Only once the bytes are in: the syncer flushes up to write_pos
+        self.write_pos = end
+
+        count = self._count
+        if count == self._slots:
+            self._grow_index()
+            count = self._count
+        i = self._head + count
+        if i >= self._slots:
+            i -= self._slots
+        self._off[i] = pos + RECORD_HEADER
+        self._len[i] = n
+        self._ts[i] = ts
+        self._count = count + 1
+        self._lap += 1
+        self._used += n
+        if self._sync_each:
+            self.sync()
+
+    push = ingest
+    write = ingest
+
+    def push_many(self, events, offsets=None, ts: int = None, stamps=None):
+        """Write a batch of events (see PyRingBuffer.push_many) with their record headers."""
+        if offsets is None:
+            payloads = events if isinstance(events, (list, tuple)) else list(events)
+        else:
+            data = memoryview(events).cast("B")
+            payloads = [data[a:b] for a, b in zip(offsets, offsets[1:])]
+        n = len(payloads)
+        if stamps is not None and len(stamps) != n:
+            raise ValueError("stamps must hold one timestamp per event")
+        if not n:
+            return 0
+
+        if stamps is not None:
+            stamps = array("q", accumulate(stamps, max, initial=self._last_ts))
+            del stamps[0]
+        else:
+            if ts is None:
+                ts = time_ns()
+            stamps = array("q", [max(ts, self._last_ts)]) * n
+        self._last_ts = stamps[-1]
+
+        # Record offsets: where each framed record starts in the batch
+        lens = array("I", map(len, payloads))
+        offs = array("q", [0])
+        offs.extend(accumulate(map(RECORD_HEADER.__add__, lens)))
+
+        cap = self.capacity
+        last = offs[n]
+        first = 0
+        if last > cap:
+            first = bisect_left(offs, last - cap, 0, n)
+            if first == n:
+                raise ValueError(
+                    f"event of {len(payloads[-1])} bytes exceeds ring capacity of {cap} bytes"
+                )
+            self._overflow(first, last - offs[first])
+
+        # Records that still fit before the end of the ring, then the rest from 0
+        split = bisect_right(offs, offs[first] + cap - self.write_pos, first, n + 1) - 1
+        if split > first:
+            self._put(payloads, lens, stamps, offs, first, split)
+        if split < n:
+            self._wrap(offs[n] - offs[split])
+            self.write_pos = 0
+            self._put(payloads, lens, stamps, offs, split, n)
+        if self._sync_each:
+            self.sync()
+        return n - first
+
+    def _put(self, payloads, lens, stamps, offs, lo, hi):
+        """Frame records lo..hi-1 with the current generation and write them as one run."""
+        gen = self.generation
+        payloads, stamps = payloads[lo:hi], stamps[lo:hi]
+        # Headers built with map() only: no Python code runs per record
+        seeds = map(gen.__xor__, map((0xFFFFFFFF).__and__, stamps))
+        headers = map(
+            _REC.pack, repeat(_REC_MAGIC), repeat(gen), stamps, lens[lo:hi],
+            map(zlib.crc32, payloads, seeds),
+        )
+        parts = [None] * (2 * (hi - lo))
+        parts[::2] = headers
+        parts[1::2] = payloads
+        base = offs[lo]
+        run = array("q", [o - base for o in offs[lo : hi + 1]])
+        self._write_run(b"".join(parts), run, 0, hi - lo, None, stamps, RECORD_HEADER)
+
+    def _overflow(self, skipped, n):
+        # Nothing written before the batch stays live: skip a generation,
+        # so recovery does not take the old records past the batch's end
+        # for its previous lap
+        with self._state_lock:
+            self.generation += 1
+        super()._overflow(skipped, n)
+
+    def _wrap(self, n):
+        pos = super()._wrap(n)
+        with self._state_lock:
+            self._lap_end = self.write_pos
+            self.generation += 1
+            self.write_pos = 0
+            self._save_state()
+        return pos
+
+    def headroom(self, seq, count=1):
+        # Every event written takes a record header, and so does seq
+        return super().headroom(seq, count) - RECORD_HEADER * (count + 1)
+
+    def clear(self):
+        with self._state_lock:
+            super().clear()
+            # Start a generation with nothing before it, and break the
+            # chain at offset 0, so recovery finds no records
+            self.generation += 2
+            self.buffer[:RECORD_HEADER] = bytes(RECORD_HEADER)
+        self.sync()
+
+    # ---------------------------------------------------------
+    # Durability
+    # ---------------------------------------------------------
+    def _save_state(self):
+        # Informational (recovery trusts only the records), except the
+        # generation when the record at offset 0 is unreadable
+        _STATE.pack_into(self._meta, _STATE_AT, self.generation, self.write_pos)
+
+    def sync(self):
+        """
+        msync what was written since the last sync, then the header.
+        Safe to call from any thread while another one writes.
+        """
+        with self._sync_lock:
+            with self._state_lock:
+                gen, lap_end, end = self.generation, self._lap_end, self.write_pos
+                self._save_state()
+            synced_gen, synced_pos = self._synced_gen, self._synced_pos
+            if gen == synced_gen:
+                self._flush(synced_pos, end)
+            elif gen == synced_gen + 1:
+                # One wrap: the rest of the old lap, then the new one
+                self._flush(synced_pos, lap_end)
+                self._flush(0, end)
+            else:
+                self._flush(0, self.capacity)
+            self._meta.flush()
+            self._synced_gen = gen
+            self._synced_pos = end
+            if self.sync_error is not None:
+                log.info("syncing ring file %s works again", self.path)
+                self.sync_error = None
+
+    def _flush(self, start, end):
+        """msync ring bytes [start, end), widened to whole pages."""
+        start -= start % _PAGE
+        if end <= start:
+            return
+        if self._addr is None:
+            self.buffer.flush(start, end - start)
+        elif _msync(self._addr + start, end - start, _MS_SYNC) != 0:
+            import ctypes
+
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def close(self):
+        """Stop the syncer, sync and unmap; the ring is unusable afterwards."""
+        if self._fd is None:
+            return
+        self._stop.set()
+        if self._syncer is not None and self._syncer is not threading.current_thread():
+            self._syncer.join()
+        self.sync()
+        self._meta.close()
+        self.buffer.close()
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------------------------------------------------------
+    # Recovery
+    # ---------------------------------------------------------
+    def _recover(self):
+        """Rebuild the index from the valid records in the file."""
+        buf, cap = self.buffer, self.capacity
+        current, previous = ([], [], []), ([], [], [])
+        end = 0
+        with memoryview(buf) as mv:
+            first = self._record(mv, 0)
+            if first is not None:
+                self.generation = first[0]
+            gen = self.generation
+
+            # One pass over the file, record by record; past anything
+            # invalid (torn, corrupt) resume at the next record magic
+            pos = 0
+            while pos + RECORD_HEADER <= cap:
+                rec = self._record(mv, pos)
+                if rec is None:
+                    pos = buf.find(_REC_MAGIC, pos + 1)
+                    if pos < 0:
+                        break
+                    continue
+                g, ts, n = rec
+                if g == gen:
+                    out = current
+                    end = pos + RECORD_HEADER + n
+                elif g + 1 == gen and pos >= end:
+                    out = previous
+                else:
+                    out = None     # an older lap
+                if out is not None:
+                    out[0].append(pos + RECORD_HEADER)
+                    out[1].append(n)
+                    out[2].append(ts)
+                pos += RECORD_HEADER + n
+
+        offs, lens, stamps = (p + c for p, c in zip(previous, current))
+        count = len(offs)
+        slots = _INITIAL_SLOTS
+        while slots < count:
+            slots *= 2
+        pad = slots - count
+        self._slots = slots
+        self._off = array("q", offs) + array("q", bytes(8 * pad))
+        self._len = array("I", lens) + array("I", bytes(array("I").itemsize * pad))
+        self._ts = array("q", stamps) + array("q", bytes(8 * pad))
+        self._head = 0
+        self._count = count
+        self._lap = len(current[0])
+        self._used = sum(lens)
+        self._last_ts = max(stamps) if count else 0
+        self.write_pos = end
+        self.full = bool(previous[0]) or gen > 0
+        # A corrupt record in the previous lap can hide where it ends;
+        # keep only what the current lap has not overwritten
+        self._settle()
+
+    def _record(self, mv, pos):
+        """``(generation, ts, len)`` of a valid record at ``pos``, else None."""
+        if pos + RECORD_HEADER > self.capacity:
+            return None
+        magic, gen, ts, n, crc = _REC.unpack_from(mv, pos)
+        start = pos + RECORD_HEADER
+        if magic != _REC_MAGIC or start + n > self.capacity:
+            return None
+        if zlib.crc32(mv[start : start + n], gen ^ ts & 0xFFFFFFFF) != crc:
+            return None
+        return gen, ts, n
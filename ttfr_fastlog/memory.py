@@ -0,0 +1,86 @@
+# ============================================================
+#  FASTLOG – Ring memory (anonymous mmap, touched on demand)
+# ============================================================
+#
+#  bytearray(n) zero-fills all n bytes up front: a 512 MB ring costs a
+#  visible stall at startup and 512 MB of RSS before the first event
+#  arrives. An anonymous private mapping costs neither: the kernel hands
+#  out zero pages as the ring's write position first reaches them, so
+#  memory is committed as data arrives and a quiet host stays small.
+#
+#  Options:
+#
+#      hugepages   madvise(MADV_HUGEPAGE): back the ring with transparent
+#                  huge pages where the kernel allows it (fewer faults
+#                  and TLB misses once the ring is hot)
+#      prefault    commit every page now (MAP_POPULATE, or one write per
+#                  page), trading the startup stall back for no faults on
+#                  the ingest path
+#
+#  Both are hints: where the kernel refuses one, the ring is still
+#  allocated. Platforms without anonymous private mappings (Windows)
+#  get a plain bytearray.
+#
+#  memory_report() gives the process's RSS and page-fault counters to
+#  check either choice.
+
+import mmap
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+PAGE = mmap.PAGESIZE
+
+
+def allocate(nbytes, hugepages=False, prefault=False):
+    """
+    A zeroed, writable buffer of ``nbytes`` backed by anonymous memory
+    that is committed on first touch (see the module header).
+    """
+    if nbytes <= 0:
+        raise ValueError("nbytes must be positive")
+    if not hasattr(mmap, "MAP_PRIVATE") or not hasattr(mmap, "MAP_ANONYMOUS"):
+        # Zero-filled (and so committed) up front: prefault is implied
+        return bytearray(nbytes)
+    flags = mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS
+    populate = getattr(mmap, "MAP_POPULATE", 0) if prefault and not hugepages else 0
+    buf = mmap.mmap(-1, nbytes, flags | populate)
+    if hugepages and hasattr(mmap, "MADV_HUGEPAGE"):
+        try:
+            buf.madvise(mmap.MADV_HUGEPAGE)
+        except OSError:
+            pass    # THP disabled, or not for this mapping
+    if prefault and not populate:
+        # After the hint, so the faults come in as huge pages
+        buf[::PAGE] = bytes(len(range(0, nbytes, PAGE)))
+    return buf
+
+
+def memory_report():
+    """
+    Resident memory and page-fault counters of this process:
+    rss_bytes, hugepage_bytes (anonymous THP; None where /proc has no
+    rollup), minor_faults and major_faults (None without getrusage).
+    """
+    report = {
+        "rss_bytes": None,
+        "hugepage_bytes": None,
+        "minor_faults": None,
+        "major_faults": None,
+    }
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        report["minor_faults"] = usage.ru_minflt
+        report["major_faults"] = usage.ru_majflt
+    try:
+        with open("/proc/self/statm") as f:
+            report["rss_bytes"] = int(f.read().split()[1]) * PAGE
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("AnonHugePages:"):
+                    report["hugepage_bytes"] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return report
@@ -0,0 +1,451 @@
+# ============================================================
+#  FASTLOG – Shared-memory ingest ring
+# ============================================================
+#
+#  Lets collector processes hand events to the recorder through a
+#  memory-mapped file (normally in /dev/shm) instead of a socket. The
+#  file holds one lane per producer process; each lane is a
+#  single-producer / single-consumer byte ring whose records use the
+#  native ring's slab layout:
+#
+#      [ts: u64 LE][len: u32 LE][payload]
+#
+#  A record never straddles the end of a lane: the producer skips the
+#  rest of the lap (marking it with len = 0xFFFFFFFF when a header
+#  fits there) and continues at offset 0.
+#
+#  Each lane has two monotonic byte counters: ``tail``, advanced only
+#  by its producer once records are fully written, and ``head``,
+#  advanced only by the consumer once it has copied them out. Neither
+#  side writes the other's counter, so no lock or compare-and-swap is
+#  needed: the counters are aligned 8-byte words (one store / load
+#  each) and records are written before ``tail`` moves past them. x86
+#  makes stores visible in program order, so there that is enough.
+#  Other CPUs (arm64, POWER) may reorder them: there each side takes and
+#  drops a record lock on its lane's fence byte between touching the
+#  records and moving a counter. The kernel serializes lock operations
+#  on a file, which orders the two processes' accesses around it.
+#  A producer that dies mid-write leaves ``tail`` where it was, so its
+#  half-written records are never read.
+#
+#  When a lane is full the producer waits up to ``timeout`` for the
+#  consumer, then drops the rest of the batch and counts it.
+#
+#  Lanes are claimed with a POSIX record lock on their control block,
+#  so a lane is released when its producer process exits. The consumer
+#  locks the file header the same way.
+#
+#  File layout:
+#
+#      header     64 bytes             magic, version, lanes, lane_bytes
+#      control    128 bytes per lane   tail, dropped, pushed, pid | head
+#      data       lane_bytes per lane
+
+import fcntl
+import mmap
+import os
+import platform
+import struct
+import tempfile
+import time
+from array import array
+
+MAGIC = b"TTFRSHR1"
+VERSION = 1
+
+_FILE_HDR = struct.Struct("<8sIIQ")   # magic, version, lanes, lane_bytes
+_HEADER = 64
+_CTRL = 128
+# Control words (byte offsets in a lane's block): the producer's cache
+# line, then the consumer's
+_TAIL, _DROPPED, _PUSHED, _PID = 0, 8, 16, 24
+_HEAD = 64
+_FENCE = 72                          # lock byte for the ordering fence, never written
+
+_REC = struct.Struct("<QI")           # record header, as in the native ring slab
+RECORD_HEADER = _REC.size
+_WRAP = 0xFFFFFFFF
+
+# Stores become visible in program order (total store order)
+_TSO = platform.machine().lower() in ("x86_64", "amd64", "i386", "i686", "x86")
+
+DEFAULT_LANES = 16
+DEFAULT_LANE_BYTES = 8 << 20
+DEFAULT_PATH = os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "ttfr-ring"
+)
+
+
+class _Mapping:
+    """A mapped ring file: geometry, control words and lane views."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.map = mmap.mmap(fd, os.fstat(fd).st_size)
+        magic, version, lanes, lane_bytes = _FILE_HDR.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError("not a TTFR shared ring (bad magic or version)")
+        self.lanes = lanes
+        self.lane_bytes = lane_bytes
+        self.data_start = _HEADER + lanes * _CTRL
+        self.view = memoryview(self.map)
+        self.words = self.view[: self.data_start].cast("Q")
+
+    def word(self, lane, field):
+        return self.words[(_HEADER + lane * _CTRL + field) >> 3]
+
+    def set_word(self, lane, field, value):
+        self.words[(_HEADER + lane * _CTRL + field) >> 3] = value
+
+    def fence(self, lane):
+        """
+        Order this process's lane accesses before the call against those
+        after it, as seen from the other end (see the module header).
+        """
+        if not _TSO:
+            at = _HEADER + lane * _CTRL + _FENCE
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, at)
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, at)
+
+    def lane(self, lane):
+        start = self.data_start + lane * self.lane_bytes
+        return self.view[start : start + self.lane_bytes]
+
+    def close(self):
+        self.words.release()
+        self.view.release()
+        self.map.close()
+        os.close(self.fd)
+
+
+def _lock(fd, start, length=1):
+    """Try to take a POSIX record lock; False if another process holds it."""
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, length, start)
+    except OSError:
+        return False
+    return True
+
+
+# ============================================================
+#  Consumer (the recorder)
+# ============================================================
+
+class SharedRing:
+    """
+    The recorder's end: creates (or reopens) the ring file at ``path``
+    and drains every lane.
+
+        ring = SharedRing("/dev/shm/ttfr-ring")
+        while running:
+            if not ring.pump(engine):
+                time.sleep(0.001)
+
+    An existing file with the same geometry is reopened, so events
+    producers wrote while the recorder was down are drained. A file
+    with another geometry is replaced (producers attached to it must
+    reattach).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, lanes=DEFAULT_LANES, lane_bytes=DEFAULT_LANE_BYTES):
+        if lanes <= 0 or lane_bytes < 4 * RECORD_HEADER:
+            raise ValueError("lanes must be positive and lane_bytes at least 48")
+        lane_bytes -= lane_bytes % 8
+        self.path = path
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if not _lock(fd, 0):
+                raise RuntimeError(f"another recorder is draining {path}")
+            head = os.pread(fd, _FILE_HDR.size, 0)
+            if head != _FILE_HDR.pack(MAGIC, VERSION, lanes, lane_bytes):
+                if head:
+                    # Someone may still have the old file mapped: start a new one
+                    os.unlink(path)
+                    os.close(fd)
+                    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+                    _lock(fd, 0)
+                os.ftruncate(fd, _HEADER + lanes * (_CTRL + lane_bytes))
+                os.pwrite(fd, _FILE_HDR.pack(MAGIC, VERSION, lanes, lane_bytes), 0)
+            self._m = _Mapping(fd)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self.lanes = lanes
+        self.lane_bytes = lane_bytes
+        self.drained = 0
+        self._next_lane = 0
+
+    def drain(self, max_events=None):
+        """
+        Copy out the records every producer has published, up to
+        ``max_events``, and free their space. Returns ``(events,
+        stamps)`` in timestamp order.
+        """
+        budget = max_events if max_events is not None else 1 << 62
+        events, stamps = [], []
+        busy = 0
+        # Start after the lane the last capped drain stopped at, so a busy
+        # lane cannot starve the others
+        first = self._next_lane
+        for lane in [*range(first, self.lanes), *range(first)]:
+            n = self._read_lane(lane, budget - len(events), events, stamps)
+            if n:
+                busy += 1
+            if len(events) >= budget:
+                self._next_lane = (lane + 1) % self.lanes
+                break
+
+        if busy > 1:
+            # Each lane is already in order; the sort just interleaves them
+            order = sorted(range(len(stamps)), key=stamps.__getitem__)
+            events = [events[i] for i in order]
+            stamps = [stamps[i] for i in order]
+        self.drained += len(events)
+        return events, array("q", stamps)
+
+    def _read_lane(self, lane, budget, events, stamps):
+        """Append up to ``budget`` of a lane's records; returns how many."""
+        m, cap = self._m, self.lane_bytes
+        head = m.word(lane, _HEAD)
+        tail = m.word(lane, _TAIL)
+        if head == tail:
+            return 0
+        m.fence(lane)   # records up to tail are complete before they are read
+
+        mm, base = m.map, m.data_start + lane * cap
+        unpack = _REC.unpack_from
+        add_event, add_stamp = events.append, stamps.append
+        count = 0
+        while head < tail and count < budget:
+            # Records from head to the tail or the end of this lap
+            pos = p = head % cap
+            stop = min(cap, pos + tail - head)
+            while p + RECORD_HEADER <= stop and count < budget:
+                ts, n = unpack(mm, base + p)
+                if n == _WRAP:
+                    break
+                start = base + p + RECORD_HEADER
+                add_event(mm[start : start + n])
+                add_stamp(ts)
+                p += RECORD_HEADER + n
+                count += 1
+            head += p - pos
+            if head < tail and count < budget:
+                # The rest of the lap was skipped by the producer
+                head += cap - p
+        m.fence(lane)   # copied out before the producer may overwrite them
+        m.set_word(lane, _HEAD, head)
+        return count
+
+    def pump(self, engine, max_events=65536):
+        """Drain into ``engine`` (a TTFR_Engine); returns the events moved."""
+        events, stamps = self.drain(max_events)
+        if events:
+            engine.ingest_many(events, stamps=stamps)
+        return len(events)
+
+    def stats(self):
+        """Counters summed over the lanes."""
+        m = self._m
+        lanes = range(self.lanes)
+        return {
+            "producers": sum(m.word(i, _PID) != 0 for i in lanes),
+            "pushed": sum(m.word(i, _PUSHED) for i in lanes),
+            "dropped": sum(m.word(i, _DROPPED) for i in lanes),
+            "drained": self.drained,
+            "pending_bytes": sum(m.word(i, _TAIL) - m.word(i, _HEAD) for i in lanes),
+        }
+
+    def close(self, unlink=False):
+        if self._m is not None:
+            self._m.close()
+            self._m = None
+        if unlink and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ============================================================
+#  Producer (a collector process)
+# ============================================================
+
+# POSIX record locks belong to the process and are all dropped when any
+# of its descriptors for the file is closed, so producers in one
+# process share a single mapping per file: (dev, ino) -> [mapping, users]
+_MAPPINGS = {}
+
+
+class SharedProducer:
+    """
+    A collector's end: claims a free lane of the ring at ``path`` and
+    writes events into it.
+
+        producer = SharedProducer("/dev/shm/ttfr-ring")
+        producer.push_many(events)
+
+    ``timeout`` is how long a push waits for room when the lane is full
+    before dropping what does not fit (0: drop at once).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, timeout=0.0):
+        self.path = path
+        self.timeout = timeout
+        st = os.stat(path)
+        self._key = (st.st_dev, st.st_ino)
+        entry = _MAPPINGS.get(self._key)
+        if entry is None:
+            fd = os.open(path, os.O_RDWR)
+            try:
+                entry = [_Mapping(fd), set()]
+            except BaseException:
+                os.close(fd)
+                raise
+            _MAPPINGS[self._key] = entry
+        m, claimed = entry
+
+        for lane in range(m.lanes):
+            if lane not in claimed and _lock(m.fd, _HEADER + lane * _CTRL):
+                break
+        else:
+            if not claimed:
+                self._release_mapping()
+            raise RuntimeError(f"all {m.lanes} lanes of {path} are taken")
+        claimed.add(lane)
+        self.lane = lane
+        self._m = m
+        self._data = m.lane(lane)
+        self._cap = m.lane_bytes
+        self._tail = m.word(lane, _TAIL)
+        self._head = m.word(lane, _HEAD)
+        self._last_ts = 0
+        m.set_word(lane, _PID, os.getpid())
+
+    @property
+    def dropped(self):
+        """Events this lane has dropped because it was full."""
+        return self._m.word(self.lane, _DROPPED)
+
+    def push(self, msg, ts=None):
+        """Write one event; False if it was dropped."""
+        return self.push_many((msg,), None if ts is None else (ts,)) == 1
+
+    def push_many(self, events, stamps=None):
+        """
+        Write a batch of events stamped now, or one stamp each from
+        ``stamps`` (ns; raised where needed so they never go
+        backwards). Returns the number written; the rest were dropped.
+        """
+        if not isinstance(events, (list, tuple)):
+            events = list(events)
+        if not events:
+            return 0
+        if stamps is None:
+            stamps = (max(time.time_ns(), self._last_ts),) * len(events)
+        elif len(stamps) != len(events):
+            raise ValueError("stamps must hold one timestamp per event")
+
+        pack = _REC.pack
+        cap, data = self._cap, self._data
+        tail = self._tail
+        last = self._last_ts
+        run, run_start = [], tail
+        written = 0
+        deadline = None
+
+        for ts, msg in zip(stamps, events):
+            size = RECORD_HEADER + len(msg)
+            if size > cap:
+                raise ValueError(f"event of {len(msg)} bytes exceeds lane capacity of {cap} bytes")
+            pos = tail % cap
+            skip = cap - pos if cap - pos < size else 0
+            if tail + skip + size - self._head > cap:
+                # Full: publish what we have, then look again / wait
+                if run:
+                    self._write(run_start, run, tail)
+                    run, run_start = [], tail
+                self._head = self._head_word()
+                while tail + skip + size - self._head > cap:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.timeout
+                    if time.monotonic() >= deadline:
+                        self._drop(len(events) - written)
+                        self._last_ts = last
+                        return written
+                    time.sleep(0.0005)
+                    self._head = self._head_word()
+            if skip or (pos == 0 and run):
+                # A run is copied with one slice, so it ends at the lane end
+                if run:
+                    self._write(run_start, run, tail)
+                    run = []
+                if skip >= RECORD_HEADER:
+                    _REC.pack_into(data, pos, 0, _WRAP)
+                tail += skip
+                run_start = tail
+            if ts < last:
+                ts = last
+            else:
+                last = ts
+            run.append(pack(ts, len(msg)))
+            run.append(msg)
+            tail += size
+            written += 1
+
+        if run:
+            self._write(run_start, run, tail)
+        self._last_ts = last
+        return written
+
+    def _head_word(self):
+        """The consumer's head; the space before it is free once this returns."""
+        head = self._m.word(self.lane, _HEAD)
+        self._m.fence(self.lane)
+        return head
+
+    def _write(self, start, run, tail):
+        """Copy one contiguous run of records and publish it."""
+        pos = start % self._cap
+        blob = b"".join(run)
+        self._data[pos : pos + len(blob)] = blob
+        m, lane = self._m, self.lane
+        m.fence(lane)   # records land before tail moves past them
+        m.set_word(lane, _PUSHED, m.word(lane, _PUSHED) + len(run) // 2)
+        m.set_word(lane, _TAIL, tail)
+        self._tail = tail
+
+    def _drop(self, n):
+        m, lane = self._m, self.lane
+        m.set_word(lane, _DROPPED, m.word(lane, _DROPPED) + n)
+
+    def close(self):
+        """Give the lane back."""
+        if self._m is None:
+            return
+        m, lane = self._m, self.lane
+        m.set_word(lane, _PID, 0)
+        self._data.release()
+        self._m = None
+        claimed = _MAPPINGS[self._key][1]
+        claimed.discard(lane)
+        if claimed:
+            fcntl.lockf(m.fd, fcntl.LOCK_UN, 1, _HEADER + lane * _CTRL)
+        else:
+            self._release_mapping()
+
+    def _release_mapping(self):
+        m, _ = _MAPPINGS.pop(self._key)
+        m.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
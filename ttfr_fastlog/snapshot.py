@@ -0,0 +1,504 @@
+# ============================================================
+#  FASTLOG – Indexed snapshot container
+# ============================================================
+#
+#  A .ttfr snapshot is written block by block, so a flush never holds
+#  more than one block of events in memory:
+#
+#      header   "TTFR" | u16 version | u16 flags
+#      codec    u8 id | u8 0 | i16 level | u32 dictionary size | dictionary
+#      block    u32 length | compress_columns([(ts, msg), ...], codec)
+#      ...
+#      end      u32 0
+#      index    one entry per block (see _ENTRY)
+#      trailer  u64 index offset | u32 blocks | u32 flags | "TTFI"
+#
+#  The footer index lets a reader jump straight to the blocks of a
+#  time window. The codec section (see codec.py for the ids) makes a
+#  snapshot self-describing, dictionary included. Blocks are columnar
+#  (see columnar.py) when the header has the COLUMNAR flag, otherwise
+#  compress_json([{"ts": ..., "msg": ...}, ...], codec).
+#
+#  Version 2 files (JSON LZ4 blocks, no codec section), version 1 files
+#  (no index either) and files written before the container (one
+#  compress_json blob of the whole event list) are still readable.
+
+import mmap
+import multiprocessing
+import os
+import struct
+import threading
+import zlib
+from bisect import bisect_left
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import (
+    FASTLOG_BACKEND,
+    Codec,
+    compress_columns,
+    compress_records,
+    decompress_columns,
+    decompress_json,
+)
+from .arrays import columns_arrays, concat_arrays, events_arrays
+
+MAGIC = b"TTFR"
+INDEX_MAGIC = b"TTFI"
+VERSION = 3
+
+# Header flag: blocks use the columnar encoding
+COLUMNAR = 0x1
+# Trailer flag: block time ranges never overlap and are in file order
+SORTED = 0x1
+
+CHUNK_BYTES = 1 << 20     # raw message bytes per block
+PAGE_EVENTS = 4096        # records copied out of the ring per call
+
+_HEADER = struct.Struct("<4sHH")
+_CODEC = struct.Struct("<BxhI")
+_LEN = struct.Struct("<I")
+# offset of the compressed blob | its size | events | ts_min | ts_max | crc32
+_ENTRY = struct.Struct("<QIIqqI")
+_TRAILER = struct.Struct("<QII4s")
+
+BlockInfo = namedtuple("BlockInfo", "offset size count ts_min ts_max crc")
+
+
+def as_codec(codec):
+    """A Codec from a Codec, a ``"name[:level]"`` spec, or None (LZ4)."""
+    if codec is None:
+        return Codec()
+    if isinstance(codec, str):
+        return Codec(codec)
+    return codec
+
+
+# ------------------------------------------------------------
+#  Block compression pool
+# ------------------------------------------------------------
+#  Blocks are independent, so a writer hands each one to a worker and
+#  writes the results back in order. The Rust codec releases the GIL,
+#  so threads scale and are the default. The pure-python codec holds
+#  it, so it only parallelizes across processes, and only when asked
+#  for explicitly: worker processes start with a fresh interpreter that
+#  re-imports the main module, which needs the usual
+#  ``if __name__ == "__main__"`` guard. Pools are shared by every
+#  writer and created on first use.
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            if FASTLOG_BACKEND == "rust":
+                pool = ThreadPoolExecutor(workers, thread_name_prefix="ttfr-compress")
+            else:
+                methods = multiprocessing.get_all_start_methods()
+                ctx = multiprocessing.get_context(
+                    "forkserver" if "forkserver" in methods else "spawn"
+                )
+                pool = ProcessPoolExecutor(workers, mp_context=ctx)
+            _pools[workers] = pool
+        return pool
+
+
+def iter_records(ring, start_ts=None, end_ts=None, page=PAGE_EVENTS):
+    """
+    Yield ``(ts, raw)`` for the ring's records in ``[start_ts, end_ts)``,
+    copying them out ``page`` at a time.
+
+    Paging goes by sequence number, so writes that land while the
+    caller is busy neither shift nor repeat records; anything evicted
+    meanwhile is simply skipped.
+    """
+    first, end = ring.seq_range(start_ts, end_ts)
+    while first < end:
+        batch = ring.records_seq(first, min(first + page, end))
+        first += page
+        yield from batch
+
+
+class SnapshotWriter:
+    """
+    Write events to a .ttfr file one compressed block at a time.
+
+        with SnapshotWriter(path) as w:
+            for ts, raw in records:
+                w.write(ts, raw)
+
+    Full blocks are compressed on ``workers`` pool workers while the
+    next block fills up (default: one per CPU with the Rust codec,
+    inline with the pure-python one; 0 is always inline).
+    At most two blocks per worker are in flight, so memory stays
+    bounded; blocks land in the file in the order they were written.
+
+    ``codec`` (a Codec or a spec such as ``"zstd:19"``; LZ4 by default)
+    compresses every block and is recorded in the header. Blocks are
+    columnar unless ``columnar=False``, which writes JSON blocks.
+    """
+
+    def __init__(self, path, chunk_bytes=CHUNK_BYTES, workers=None, codec=None, columnar=True):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.codec = as_codec(codec)
+        self.columnar = columnar
+        self._encode = compress_columns if columnar else compress_records
+        if workers is None:
+            workers = (os.cpu_count() or 1) if FASTLOG_BACKEND == "rust" else 0
+        self.workers = workers
+        self.count = 0
+        self._records = []
+        self._inflight = deque()
+        self._pending = 0
+        self._ts_min = self._ts_max = None
+        self._last_ts = float("-inf")
+        self._sorted = True
+        self._index = []
+        dictionary = self.codec.dictionary or b""
+        self._f = open(path, "wb")
+        self._f.write(_HEADER.pack(MAGIC, VERSION, COLUMNAR if columnar else 0))
+        self._f.write(_CODEC.pack(self.codec.id, self.codec.level, len(dictionary)))
+        self._f.write(dictionary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, ts, raw):
+        """Queue one event; a block is compressed once CHUNK_BYTES fill up."""
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        self._records.append((ts, raw))
+        self._pending += len(raw)
+        if self._ts_min is None:
+            self._ts_min = self._ts_max = ts
+        elif ts < self._ts_min:
+            self._ts_min = ts
+        elif ts > self._ts_max:
+            self._ts_max = ts
+        if ts < self._last_ts:
+            self._sorted = False
+        self._last_ts = ts
+        self.count += 1
+        if self._pending >= self.chunk_bytes:
+            self._flush_block()
+
+    def write_many(self, records):
+        """Write every ``(ts, raw)`` pair of an iterable."""
+        for ts, raw in records:
+            self.write(ts, raw)
+
+    def _flush_block(self, last=False):
+        records = self._records
+        if records:
+            meta = (len(records), self._ts_min, self._ts_max)
+            if self.workers and not (last and not self._inflight):
+                blob = _pool(self.workers).submit(self._encode, records, self.codec)
+            else:
+                # Inline when pooled, or for a snapshot of a single block
+                blob = self._encode(records, self.codec)
+            self._inflight.append((blob, meta))
+            self._records = []
+            self._pending = 0
+            self._ts_min = None
+        limit = 0 if last else 2 * self.workers
+        while len(self._inflight) > limit:
+            self._write_block(*self._inflight.popleft())
+
+    def _write_block(self, blob, meta):
+        if not isinstance(blob, bytes):
+            blob = blob.result()
+        self._f.write(_LEN.pack(len(blob)))
+        self._index.append(BlockInfo(self._f.tell(), len(blob), *meta, zlib.crc32(blob)))
+        self._f.write(blob)
+
+    def close(self):
+        if self._f.closed:
+            return
+        try:
+            self._flush_block(last=True)
+            self._f.write(_LEN.pack(0))
+            index_at = self._f.tell()
+            self._f.write(b"".join(_ENTRY.pack(*b) for b in self._index))
+            flags = SORTED if self._sorted else 0
+            self._f.write(_TRAILER.pack(index_at, len(self._index), flags, INDEX_MAGIC))
+        finally:
+            for blob, _ in self._inflight:
+                if not isinstance(blob, bytes):
+                    blob.cancel()
+            self._inflight.clear()
+            self._f.close()
+
+
+def write_snapshot(path, records, chunk_bytes=CHUNK_BYTES, workers=None, codec=None,
+                   columnar=True):
+    """
+    Stream ``(ts, raw)`` records into a .ttfr file, compressing blocks
+    with ``codec`` on ``workers`` pool workers (see SnapshotWriter).
+    Returns the number of events written.
+    """
+    with SnapshotWriter(path, chunk_bytes, workers, codec, columnar) as w:
+        w.write_many(records)
+    return w.count
+
+
+def recompress_snapshot(src, dst, codec="zstd:19", workers=None, samples=100_000):
+    """
+    Rewrite snapshot ``src`` as ``dst`` with another codec, e.g. to
+    archive hot LZ4 snapshots as zstd. A ``"zstd-dict[:level]"`` spec
+    trains its dictionary on up to ``samples`` of the source's events.
+    Returns the number of events written.
+    """
+    if isinstance(codec, str) and codec.partition(":")[0] == "zstd-dict":
+        level = int(codec.partition(":")[2] or 3)
+        with SnapshotReader(src) as snap:
+            sample = []
+            for e in snap.events():
+                sample.append(e.get("msg", "").encode("utf-8"))
+                if len(sample) >= samples:
+                    break
+        codec = Codec.train(sample, level=level)
+
+    with SnapshotReader(src) as snap:
+        records = ((e.get("ts", 0), e.get("msg", "")) for e in snap.events())
+        return write_snapshot(dst, records, workers=workers, codec=codec)
+
+
+class SnapshotReader:
+    """
+    Random access to a .ttfr snapshot through a read-only mmap.
+
+        with SnapshotReader(path) as snap:
+            for event in snap.events(start_ts, end_ts):
+                ...
+
+    Opening only parses the header and footer index; a block is paged
+    in and handed to decompress_json as a memoryview of the mapping
+    when it is read, so memory follows the blocks actually touched
+    rather than the file size.
+
+    ``blocks`` is the footer index (a list of BlockInfo); it is None for
+    files without one, which are then read front to back.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self.codec = None
+        self.columnar = False
+        self.blocks = None
+        self.sorted = False
+        self._start = 0
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap refuses empty files; an empty snapshot has no events anyway
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        try:
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        if self.blocks is None:
+            raise TypeError("snapshot has no index; count it with events()")
+        return sum(b.count for b in self.blocks)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _read_index(self):
+        mm = self._mm
+        if mm is None or len(mm) < _HEADER.size or mm[:4] != MAGIC:
+            return
+
+        _, self.version, flags = _HEADER.unpack_from(mm)
+        if self.version > VERSION:
+            raise ValueError(f"unsupported snapshot version {self.version}")
+        self.columnar = self.version >= 3 and bool(flags & COLUMNAR)
+        self._start = _HEADER.size
+        if self.version >= 3:
+            self.codec, self._start = _read_codec(mm, _HEADER.size, self.path)
+        if self.version < 2:
+            return
+
+        end = len(mm)
+        if end < _HEADER.size + _TRAILER.size:
+            raise ValueError(f"truncated snapshot: {self.path}")
+        index_at, n, flags, magic = _TRAILER.unpack_from(mm, end - _TRAILER.size)
+        if magic != INDEX_MAGIC or index_at + n * _ENTRY.size != end - _TRAILER.size:
+            raise ValueError(f"corrupt snapshot index: {self.path}")
+
+        self.blocks = [
+            BlockInfo(*_ENTRY.unpack_from(mm, index_at + i * _ENTRY.size)) for i in range(n)
+        ]
+        self.sorted = bool(flags & SORTED)
+
+    def _decode(self, offset, size, crc=None, label="block", decode=None):
+        """Decompress ``size`` bytes at ``offset`` straight from the mapping."""
+        if offset + size > len(self._mm):
+            raise ValueError(f"truncated snapshot: {self.path}")
+        if decode is None:
+            decode = decompress_columns if self.columnar else decompress_json
+        with memoryview(self._mm)[offset : offset + size] as blob:
+            if crc is not None and zlib.crc32(blob) != crc:
+                raise ValueError(f"corrupt {label} in snapshot: {self.path}")
+            return decode(blob, self.codec)
+
+    def read_block(self, i):
+        """Decode block ``i`` (checksum verified) into a list of events."""
+        b = self.blocks[i]
+        return self._decode(b.offset, b.size, b.crc, f"block {i}")
+
+    def block_range(self, start_ts=None, end_ts=None):
+        """Indices of the blocks that may hold events in ``[start_ts, end_ts)``."""
+        blocks = self.blocks
+        if self.sorted:
+            lo = 0 if start_ts is None else bisect_left([b.ts_max for b in blocks], start_ts)
+            hi = len(blocks) if end_ts is None else bisect_left([b.ts_min for b in blocks], end_ts)
+            return range(lo, max(lo, hi))
+        return [
+            i for i, b in enumerate(blocks)
+            if (start_ts is None or b.ts_max >= start_ts)
+            and (end_ts is None or b.ts_min < end_ts)
+        ]
+
+    def _scan_blocks(self):
+        """Decode an index-less file front to back, one block at a time."""
+        mm = self._mm
+        if mm is None:
+            return
+        if self.version == 0:
+            # Legacy snapshot: one blob for the whole file
+            yield self._decode(0, len(mm))
+            return
+
+        pos = self._start
+        while True:
+            if pos + _LEN.size > len(mm):
+                raise ValueError(f"truncated snapshot: {self.path}")
+            (n,) = _LEN.unpack_from(mm, pos)
+            pos += _LEN.size
+            if n == 0:
+                return
+            yield self._decode(pos, n)
+            pos += n
+
+    def batches(self, start_ts=None, end_ts=None):
+        """
+        Yield the events stamped in ``[start_ts, end_ts)`` (ns) as one
+        list per block, in file order.
+        """
+        if self.blocks is None:
+            source = self._scan_blocks()
+        else:
+            source = (self.read_block(i) for i in self.block_range(start_ts, end_ts))
+
+        whole = start_ts is None and end_ts is None
+        for events in source:
+            if not whole:
+                events = [
+                    e for e in events
+                    if (start_ts is None or e.get("ts", 0) >= start_ts)
+                    and (end_ts is None or e.get("ts", 0) < end_ts)
+                ]
+            if events:
+                yield events
+
+    def events(self, start_ts=None, end_ts=None):
+        """Yield the events stamped in ``[start_ts, end_ts)`` (ns), in file order."""
+        for events in self.batches(start_ts, end_ts):
+            yield from events
+
+
+    def arrays(self, start_ts=None, end_ts=None):
+        """
+        The events stamped in ``[start_ts, end_ts)`` as EventArrays
+        (needs numpy). Columnar blocks are decoded straight into arrays;
+        older JSON blocks go through their event dicts first.
+        """
+        if self.blocks is None or not self.columnar:
+            return concat_arrays(events_arrays(b) for b in self.batches(start_ts, end_ts))
+        parts = []
+        for i in self.block_range(start_ts, end_ts):
+            b = self.blocks[i]
+            parts.append(self._decode(b.offset, b.size, b.crc, f"block {i}", columns_arrays))
+        ev = concat_arrays(parts)
+        if start_ts is not None or end_ts is not None:
+            ev = ev.between(start_ts, end_ts)
+        return ev
+
+
+def snapshot_arrays(path, start_ts=None, end_ts=None):
+    """The events of a .ttfr file in ``[start_ts, end_ts)`` as EventArrays."""
+    with SnapshotReader(path) as snap:
+        return snap.arrays(start_ts, end_ts)
+
+
+def read_snapshot(path):
+    """
+    Yield the events of a .ttfr file front to back, one block in
+    memory at a time.
+    """
+    with open(path, "rb") as f:
+        head = f.read(_HEADER.size)
+        if len(head) < _HEADER.size or head[:4] != MAGIC:
+            # Legacy snapshot: one blob for the whole file
+            blob = head + f.read()
+            if blob:
+                yield from decompress_json(blob)
+            return
+
+        _, version, flags = _HEADER.unpack(head)
+        if version > VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        decode = decompress_json
+        if version >= 3 and flags & COLUMNAR:
+            decode = decompress_columns
+        codec = None
+        if version >= 3:
+            head = f.read(_CODEC.size)
+            if len(head) < _CODEC.size:
+                raise ValueError(f"truncated snapshot: {path}")
+            codec, _ = _read_codec(head + f.read(_CODEC.unpack(head)[2]), 0, path)
+
+        while True:
+            size = f.read(_LEN.size)
+            if len(size) < _LEN.size:
+                raise ValueError(f"truncated snapshot: {path}")
+            (n,) = _LEN.unpack(size)
+            if n == 0:
+                return
+            blob = f.read(n)
+            if len(blob) < n:
+                raise ValueError(f"truncated snapshot: {path}")
+            yield from decode(blob, codec)
+
+
+def _read_codec(buf, pos, path):
+    """Parse the codec section at ``pos``; returns (Codec, end offset)."""
+    if pos + _CODEC.size > len(buf):
+        raise ValueError(f"truncated snapshot: {path}")
+    codec_id, level, n = _CODEC.unpack_from(buf, pos)
+    pos += _CODEC.size
+    if pos + n > len(buf):
+        raise ValueError(f"truncated snapshot: {path}")
+    dictionary = bytes(buf[pos : pos + n]) if n else None
+    try:
+        return Codec.from_id(codec_id, level, dictionary), pos + n
+    except ValueError as e:
+        raise ValueError(f"{e} in snapshot: {path}")
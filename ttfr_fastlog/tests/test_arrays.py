@@ -0,0 +1,50 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ttfr_fastlog import PyRingBuffer
+from ttfr_fastlog.arrays import EventArrays, events_arrays, ring_arrays
+from ttfr_fastlog.durable import DurableRingBuffer
+
+
+def _messages(ev):
+    return [ev.message(i) for i in range(len(ev))]
+
+
+def test_between_compacts_data():
+    ev = events_arrays({"ts": i, "msg": "x" * 100 if i % 2 else "hb"} for i in range(1000))
+    window = ev.between(10, 14)
+    assert window.ts.tolist() == [10, 11, 12, 13]
+    assert _messages(window) == [b"hb", b"x" * 100, b"hb", b"x" * 100]
+    # Only the window's messages are kept
+    assert len(window.data) == 204
+    assert not np.shares_memory(window.data, ev.data)
+
+
+def test_compact_keeps_shared_messages_once():
+    data = np.frombuffer(b"heartbeatlogin", np.uint8)
+    ev = EventArrays(np.arange(4), np.array([0, 9, 0, 0]), np.array([9, 5, 9, 5]), data)
+    out = ev.compact()
+    assert _messages(out) == [b"heartbeat", b"login", b"heartbeat", b"heart"]
+    assert len(out.data) == 19
+    assert len(ev[:0].compact()) == 0
+
+
+@pytest.mark.parametrize("durable", [False, True])
+def test_ring_arrays_matches_records_across_a_wrap(tmp_path, durable):
+    ring = DurableRingBuffer(str(tmp_path / "ring"), 400) if durable else PyRingBuffer(200)
+    try:
+        for i in range(40):
+            ring.push(b"event-%d" % i + b"." * (i % 5), ts=i)
+        ev = ring_arrays(ring)
+        records = list(ring.records())
+        assert records[0][0] > 0
+        assert ev.ts.tolist() == [ts for ts, _ in records]
+        assert _messages(ev) == [raw for _, raw in records]
+        assert len(ev.data) == sum(len(raw) for _, raw in records)
+
+        ev = ring_arrays(ring, 30, 35)
+        assert _messages(ev) == [raw for ts, raw in records if 30 <= ts < 35]
+    finally:
+        if durable:
+            ring.close()
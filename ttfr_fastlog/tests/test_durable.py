@@ -0,0 +1,185 @@
+import threading
+import time
+
+import pytest
+
+from ttfr_fastlog import PyRingBuffer
+from ttfr_fastlog.durable import _HEADER_BYTES, RECORD_HEADER, DurableRingBuffer
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "ring")
+
+
+def _events(ring):
+    return [raw for _, raw in ring.records()]
+
+
+def test_reopen_recovers_records(path):
+    with DurableRingBuffer(path, 4096, sync_interval=None) as ring:
+        ring.push(b"one", ts=1)
+        ring.push_many([b"two", b"three"], stamps=[2, 3])
+    with DurableRingBuffer(path) as ring:
+        assert list(ring.records()) == [(1, b"one"), (2, b"two"), (3, b"three")]
+        ring.push(b"four", ts=4)
+        assert len(ring) == 4
+    with pytest.raises(ValueError):
+        DurableRingBuffer(path, 8192)
+
+
+def test_recovery_across_wraps(path):
+    with DurableRingBuffer(path, 512, sync_interval=None) as ring:
+        for i in range(100):
+            ring.push(b"event-%03d" % i, ts=i)
+        live = list(ring.records())
+        assert ring.generation > 1 and live[0][0] > 0
+    with DurableRingBuffer(path) as ring:
+        assert list(ring.records()) == live
+
+
+def test_torn_record_costs_only_itself(path):
+    with DurableRingBuffer(path, 4096, sync_interval=None) as ring:
+        ring.push_many([b"aaaa", b"bbbb", b"cccc"], ts=1)
+    with open(path, "r+b") as f:
+        f.seek(_HEADER_BYTES + RECORD_HEADER + 4 + RECORD_HEADER + 1)
+        f.write(b"X")
+    with DurableRingBuffer(path) as ring:
+        assert _events(ring) == [b"aaaa", b"cccc"]
+
+
+def test_push_many_over_capacity_matches_py_ring(path):
+    cap = 10 * (RECORD_HEADER + 20)
+    batch = [bytes([65 + i]) * 20 for i in range(15)]
+    with DurableRingBuffer(path, cap, sync_interval=None) as ring:
+        ref = PyRingBuffer(cap - 10 * RECORD_HEADER)
+        for r in (ring, ref):
+            r.push(b"old" * 5, ts=1)
+            assert r.push_many(batch, ts=2) == 10
+        assert _events(ring) == _events(ref) == batch[5:]
+        assert ring.seq_range() == ref.seq_range() == (6, 16)
+        assert ring.records_seq(0, 6) == []
+
+        # Writing on fills the next lap in order
+        ring.push(b"next", ts=3)
+        assert _events(ring) == batch[6:] + [b"next"]
+
+    # Nothing from before the batch comes back
+    with DurableRingBuffer(path) as ring:
+        assert _events(ring) == batch[6:] + [b"next"]
+
+    with DurableRingBuffer(path) as ring:
+        with pytest.raises(ValueError):
+            ring.push_many([b"x", b"y" * cap])
+        assert _events(ring) == batch[6:] + [b"next"]
+
+
+def test_sync_flushes_only_the_dirty_range(path, monkeypatch):
+    with DurableRingBuffer(path, 64 * 1024, sync_interval=None) as ring:
+        flushed = []
+        real = ring._flush
+        monkeypatch.setattr(ring, "_flush", lambda a, b: (flushed.append((a, b)), real(a, b)))
+
+        ring.push(b"x" * 1000)
+        ring.sync()
+        assert flushed == [(0, 1000 + RECORD_HEADER)]
+
+        flushed.clear()
+        ring.push(b"y" * 1000)
+        ring.sync()
+        assert flushed == [(1024, 2 * (1000 + RECORD_HEADER))]
+
+        # Across one wrap: the rest of the old lap, then the new one
+        flushed.clear()
+        lap_end = ring.write_pos
+        while ring.generation == 0:
+            lap_end = ring.write_pos
+            ring.push(b"z" * 1000)
+        ring.sync()
+        assert flushed == [(2 * (1000 + RECORD_HEADER), lap_end), (0, ring.write_pos)]
+
+
+def test_background_syncer(path, monkeypatch):
+    ring = DurableRingBuffer(path, 4096, sync_interval=0.01)
+    seen = threading.Event()
+    real = ring.sync
+
+    def sync():
+        if threading.current_thread() is ring._syncer:
+            seen.set()
+        real()
+
+    monkeypatch.setattr(ring, "sync", sync)
+    ring.push(b"event")
+    assert seen.wait(5)
+    ring.close()
+    assert not ring._syncer.is_alive()
+    assert ring._synced_pos == ring.write_pos
+
+
+def test_sync_every_write(path, monkeypatch):
+    with DurableRingBuffer(path, 4096, sync_interval=0) as ring:
+        assert ring._syncer is None
+        ring.push(b"a")
+        assert ring._synced_pos == ring.write_pos
+        ring.push_many([b"b", b"c"])
+        assert ring._synced_pos == ring.write_pos
+
+
+def test_syncer_stops_when_ring_is_dropped(path):
+    ring = DurableRingBuffer(path, 4096, sync_interval=0.01)
+    syncer = ring._syncer
+    ring.close()
+    del ring
+    syncer.join(5)
+    assert not syncer.is_alive()
+
+
+def test_concurrent_sync_and_writes(path):
+    with DurableRingBuffer(path, 8192, sync_interval=0.001) as ring:
+        deadline = time.monotonic() + 0.3
+        i = 0
+        while time.monotonic() < deadline:
+            ring.push_many([b"%06d" % (i + k) for k in range(8)], ts=i)
+            i += 8
+        live = list(ring.records())
+    with DurableRingBuffer(path) as ring:
+        assert list(ring.records()) == live
+
+
+def test_syncer_keeps_retrying_after_an_error(path, monkeypatch, caplog):
+    ring = DurableRingBuffer(path, 4096, sync_interval=0.01)
+    failures = []
+    real = ring._flush
+
+    def flush(start, end):
+        if len(failures) < 3:
+            failures.append((start, end))
+            raise OSError(5, "Input/output error")
+        real(start, end)
+
+    monkeypatch.setattr(ring, "_flush", flush)
+    with caplog.at_level("ERROR", logger="ttfr_fastlog.durable"):
+        ring.push(b"event")
+        deadline = time.monotonic() + 5
+        while len(failures) < 3 or ring._synced_pos != ring.write_pos:
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.01)
+    # Logged once, and cleared by the sync that went through
+    assert len(caplog.records) == 1 and "Input/output error" in caplog.text
+    assert ring.sync_error is None and ring._syncer.is_alive()
+
+    def full(start, end):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(ring, "_flush", full)
+    ring.push(b"more")
+    deadline = time.monotonic() + 5
+    while ring.sync_error is None:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    assert ring.sync_error.errno == 28 and ring._syncer.is_alive()
+
+    monkeypatch.setattr(ring, "_flush", real)
+    ring.close()
+    assert not ring._syncer.is_alive() and ring.sync_error is None
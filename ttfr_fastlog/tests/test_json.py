@@ -0,0 +1,16 @@
+import json
+
+import pytest
+
+from ttfr_fastlog import compress_json, decompress_json
+
+
+def test_roundtrip_matches_json_loads():
+    data = {"a": [1, 2.5, 1e16, 1e-05, None, True, "é\n"], "n": 2 ** 64 - 1, "m": -(2 ** 63), "3": "k"}
+    assert decompress_json(compress_json(data)) == json.loads(json.dumps(data))
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), -float("inf")])
+def test_non_finite_floats_are_refused(value):
+    with pytest.raises((ValueError, RuntimeError)):
+        compress_json({"x": value})
@@ -0,0 +1,43 @@
+import mmap
+
+import pytest
+
+from ttfr_fastlog import PyRingBuffer, memory
+from ttfr_fastlog.memory import allocate, memory_report
+
+
+def test_allocate_anonymous_mapping():
+    buf = allocate(1 << 20, prefault=True)
+    assert isinstance(buf, mmap.mmap)
+    assert len(buf) == 1 << 20 and buf[:16] == bytes(16)
+    with pytest.raises(ValueError):
+        allocate(0)
+
+
+def test_allocate_without_anonymous_mappings(monkeypatch):
+    # As on Windows
+    monkeypatch.delattr(mmap, "MAP_ANONYMOUS", raising=False)
+    buf = allocate(4096, hugepages=True, prefault=True)
+    assert isinstance(buf, bytearray) and buf == bytes(4096)
+
+    ring = PyRingBuffer(4096, hugepages=True)
+    ring.push(b"event")
+    assert list(ring.dump()) == [b"event"]
+
+
+def test_hugepage_hint_is_best_effort(monkeypatch):
+    class Refusing(mmap.mmap):
+        def madvise(self, *args):
+            raise OSError(22, "Invalid argument")
+
+    monkeypatch.setattr(memory.mmap, "mmap", Refusing)
+    monkeypatch.setattr(memory.mmap, "MADV_HUGEPAGE", 14, raising=False)
+    buf = allocate(1 << 16, hugepages=True, prefault=True)
+    assert len(buf) == 1 << 16
+
+
+def test_memory_report_without_getrusage(monkeypatch):
+    assert memory_report()["minor_faults"] is not None
+    monkeypatch.setattr(memory, "resource", None)
+    report = memory_report()
+    assert report["minor_faults"] is None and report["major_faults"] is None
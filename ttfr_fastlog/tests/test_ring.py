@@ -0,0 +1,68 @@
+import pytest
+
+from ttfr_fastlog import PyRingBuffer
+
+
+def test_push_many_over_capacity_evicts_older_records_first():
+    ring = PyRingBuffer(100)
+    ring.push(b"A" * 10)
+    assert ring.push_many([b"B" * 60, b"C" * 50]) == 1
+    assert ring.dump() == [b"C" * 50]
+    assert ring.used == 50
+
+
+def test_push_many_over_capacity_keeps_newest_that_fit():
+    ring = PyRingBuffer(100)
+    ring.push_many([b"a" * 30, b"b" * 30])
+    events = [bytes([65 + i]) * 20 for i in range(8)]
+    assert ring.push_many(events) == 5
+    assert ring.dump() == events[3:]
+
+    # The kept batch fills the ring: the next write starts a lap
+    ring.push(b"z" * 10)
+    assert ring.dump() == events[4:] + [b"z" * 10]
+
+
+def test_push_many_over_capacity_with_offsets():
+    ring = PyRingBuffer(10)
+    ring.push(b"old")
+    data = b"aaaabbbbccccdd"
+    assert ring.push_many(data, [0, 4, 8, 12, 14]) == 3
+    assert ring.dump() == [b"bbbb", b"cccc", b"dd"]
+
+
+def test_push_many_event_larger_than_ring():
+    ring = PyRingBuffer(10)
+    with pytest.raises(ValueError, match="exceeds ring capacity"):
+        ring.push_many([b"x" * 11])
+
+
+def test_wrap_evicts_oldest_first():
+    ring = PyRingBuffer(10)
+    for chunk in (b"aaaa", b"bbbb", b"cc"):
+        ring.push(chunk)
+    ring.push(b"dddd")      # wraps over aaaa only
+    assert ring.dump() == [b"bbbb", b"cc", b"dddd"]
+
+
+def test_seq_numbers_survive_an_oversize_batch():
+    ring = PyRingBuffer(100)
+    ring.push(b"A" * 10)
+    ring.push_many([b"B" * 60, b"C" * 50])
+    # A is seq 0, B (dropped with the overflow) 1, C 2
+    assert ring.seq_range() == (2, 3)
+    assert [raw for _, raw in ring.records_seq(0, 3)] == [b"C" * 50]
+    assert ring.records_seq(1, 2) == []
+
+    ring.push(b"D")
+    assert [raw for _, raw in ring.records_seq(3, 4)] == [b"D"]
+
+
+def test_seq_numbers_follow_eviction():
+    ring = PyRingBuffer(10)
+    for i in range(20):
+        ring.push(b"%d" % (i % 10) * 3)
+    first, end = ring.seq_range()
+    assert end == 20
+    assert [raw for _, raw in ring.records_seq(first, end)] == ring.dump()
+    assert ring.records_seq(first, first + 1)[0][1] == ring.dump()[0]
@@ -0,0 +1,80 @@
+import multiprocessing
+
+import pytest
+
+from ttfr_fastlog import shared
+from ttfr_fastlog.shared import RECORD_HEADER, SharedProducer, SharedRing
+
+
+@pytest.fixture(params=[True, False], ids=["tso", "fenced"])
+def ring(request, tmp_path, monkeypatch):
+    # fenced: publish through the lock fence used off x86
+    monkeypatch.setattr(shared, "_TSO", request.param)
+    ring = SharedRing(str(tmp_path / "ring"), lanes=2, lane_bytes=256)
+    yield ring
+    ring.close()
+
+
+def _drain_all(ring):
+    events, stamps = ring.drain()
+    return [bytes(e) for e in events], list(stamps)
+
+
+def test_roundtrip_in_timestamp_order(ring):
+    with SharedProducer(ring.path) as a, SharedProducer(ring.path) as b:
+        assert (a.lane, b.lane) == (0, 1)
+        assert a.push_many([b"a1", b"a3"], stamps=[1, 3]) == 2
+        assert b.push_many([b"b2"], stamps=[2]) == 1
+        assert _drain_all(ring) == ([b"a1", b"b2", b"a3"], [1, 2, 3])
+    assert ring.drain() == ([], shared.array("q"))
+    assert ring.stats()["pushed"] == 3 and ring.stats()["producers"] == 0
+
+
+def test_records_wrap_around_the_lane(ring):
+    with SharedProducer(ring.path) as p:
+        seen = []
+        for i in range(40):
+            msg = b"event-%02d" % i + b"." * (i % 7)
+            assert p.push(msg, ts=i)
+            seen.append(msg)
+            if i % 3 == 2:
+                assert _drain_all(ring)[0] == seen
+                seen = []
+        assert _drain_all(ring)[0] == seen
+
+
+def test_full_lane_drops_and_counts(ring):
+    with SharedProducer(ring.path) as p:
+        msg = b"x" * (64 - RECORD_HEADER)
+        assert p.push_many([msg] * 6) == 4
+        assert p.dropped == 2
+        with pytest.raises(ValueError):
+            p.push(b"y" * 300)
+        assert len(ring.drain()[0]) == 4
+        assert p.push(msg)
+    assert ring.stats()["dropped"] == 2
+
+
+def test_all_lanes_taken(ring):
+    with SharedProducer(ring.path), SharedProducer(ring.path):
+        with pytest.raises(RuntimeError):
+            SharedProducer(ring.path)
+
+
+def _produce(path, n, tso):
+    shared._TSO = tso
+    with SharedProducer(path, timeout=10) as p:
+        for i in range(n):
+            p.push(b"%08d" % i, ts=i)
+
+
+def test_producer_process(ring):
+    n = 2000
+    proc = multiprocessing.get_context("fork").Process(target=_produce, args=(ring.path, n, shared._TSO))
+    proc.start()
+    got = []
+    while proc.is_alive() or ring.stats()["pending_bytes"]:
+        got += _drain_all(ring)[0]
+    proc.join()
+    assert proc.exitcode == 0
+    assert got == [b"%08d" % i for i in range(n)]
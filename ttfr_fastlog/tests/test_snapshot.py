@@ -0,0 +1,143 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from ttfr_fastlog import FASTLOG_BACKEND, PyRingBuffer, compress_json, snapshot
+from ttfr_fastlog.snapshot import (
+    SnapshotReader,
+    SnapshotWriter,
+    iter_records,
+    read_snapshot,
+    recompress_snapshot,
+    snapshot_arrays,
+    write_snapshot,
+)
+
+
+def _records(n=300):
+    return [(1000 + i, f"event {i} " + "x" * (i % 13)) for i in range(n)]
+
+
+def _dicts(records):
+    return [{"ts": ts, "msg": msg} for ts, msg in records]
+
+
+@pytest.mark.parametrize("columnar", [True, False])
+def test_roundtrip_over_several_blocks(tmp_path, columnar):
+    path = str(tmp_path / "s.ttfr")
+    records = _records()
+    assert write_snapshot(path, records, chunk_bytes=512, workers=0, columnar=columnar) == 300
+    with SnapshotReader(path) as snap:
+        assert snap.version == 3 and snap.columnar == columnar
+        assert len(snap.blocks) > 5 and snap.sorted
+        assert len(snap) == 300
+        assert list(snap.events()) == _dicts(records)
+    assert list(read_snapshot(path)) == _dicts(records)
+
+
+def test_window_reads_only_overlapping_blocks(tmp_path):
+    path = str(tmp_path / "s.ttfr")
+    records = _records()
+    write_snapshot(path, records, chunk_bytes=512, workers=0)
+    with SnapshotReader(path) as snap:
+        blocks = snap.block_range(1100, 1150)
+        assert 0 < len(blocks) < len(snap.blocks)
+        assert list(snap.events(1100, 1150)) == _dicts(records[100:150])
+        assert list(snap.events(5000)) == []
+
+
+def test_unsorted_blocks_are_all_considered(tmp_path):
+    path = str(tmp_path / "s.ttfr")
+    records = _records(100)[50:] + _records(100)[:50]
+    write_snapshot(path, records, chunk_bytes=256, workers=0)
+    with SnapshotReader(path) as snap:
+        assert not snap.sorted
+        assert sorted(e["ts"] for e in snap.events(1040, 1060)) == list(range(1040, 1060))
+
+
+def test_codec_is_recorded_and_recompress(tmp_path):
+    pytest.importorskip("zstandard")
+    src, dst = str(tmp_path / "a.ttfr"), str(tmp_path / "b.ttfr")
+    records = _records()
+    write_snapshot(src, records, chunk_bytes=512, workers=0, codec="lz4hc")
+    assert recompress_snapshot(src, dst, codec="zstd:3", workers=0) == 300
+    with SnapshotReader(dst) as snap:
+        assert snap.codec.name == "zstd"
+        assert list(snap.events()) == _dicts(records)
+
+
+def test_corrupt_and_truncated_files(tmp_path):
+    path = str(tmp_path / "s.ttfr")
+    write_snapshot(path, _records(), chunk_bytes=512, workers=0)
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+
+    with SnapshotReader(path) as snap:
+        at = snap.blocks[1].offset + 3
+    data[at] ^= 0xFF
+    bad = tmp_path / "bad.ttfr"
+    bad.write_bytes(bytes(data))
+    with SnapshotReader(str(bad)) as snap:
+        snap.read_block(0)
+        with pytest.raises(ValueError, match="corrupt block 1"):
+            snap.read_block(1)
+
+    cut = tmp_path / "cut.ttfr"
+    cut.write_bytes(bytes(data[:-7]))
+    with pytest.raises(ValueError):
+        SnapshotReader(str(cut))
+
+
+def test_legacy_single_blob(tmp_path):
+    path = tmp_path / "old.ttfr"
+    events = _dicts(_records(10))
+    path.write_bytes(compress_json(events))
+    with SnapshotReader(str(path)) as snap:
+        assert snap.blocks is None
+        assert list(snap.events()) == events
+    assert list(read_snapshot(str(path))) == events
+
+
+def test_writer_streams_a_ring(tmp_path):
+    ring = PyRingBuffer(1 << 16)
+    for i in range(50):
+        ring.push(b"r%d" % i, ts=i)
+    path = str(tmp_path / "s.ttfr")
+    with SnapshotWriter(path, chunk_bytes=64, workers=0) as w:
+        w.write_many(iter_records(ring, 10, 40, page=7))
+    assert [e["msg"] for e in read_snapshot(path)] == [f"r{i}" for i in range(10, 40)]
+
+
+def test_arrays(tmp_path):
+    pytest.importorskip("numpy")
+    path = str(tmp_path / "s.ttfr")
+    records = _records()
+    write_snapshot(path, records, chunk_bytes=512, workers=0)
+    ev = snapshot_arrays(path, 1100, 1110)
+    assert ev.ts.tolist() == list(range(1100, 1110))
+    assert [ev.message(i).decode() for i in range(len(ev))] == [m for _, m in records[100:110]]
+
+
+@pytest.mark.parametrize("columnar", [True, False])
+def test_pool_workers_keep_block_order(tmp_path, columnar):
+    # Threads on the Rust backend, forkserver processes otherwise
+    src, dst = str(tmp_path / "a.ttfr"), str(tmp_path / "b.ttfr")
+    records = _records(2000)
+    assert write_snapshot(src, records, chunk_bytes=512, workers=2, columnar=columnar) == 2000
+    pool = ThreadPoolExecutor if FASTLOG_BACKEND == "rust" else ProcessPoolExecutor
+    assert isinstance(snapshot._pools[2], pool)
+    with SnapshotReader(src) as snap:
+        blocks = snap.blocks
+        assert len(blocks) > 20 and snap.sorted
+        assert sum(b.count for b in blocks) == 2000
+        assert [b.offset for b in blocks] == sorted(b.offset for b in blocks)
+        for i, b in enumerate(blocks):
+            events = snap.read_block(i)
+            assert (b.count, b.ts_min, b.ts_max) == (len(events), events[0]["ts"], events[-1]["ts"])
+        assert list(snap.events()) == _dicts(records)
+
+    assert recompress_snapshot(src, dst, codec="lz4hc", workers=2) == 2000
+    with SnapshotReader(dst) as snap:
+        assert snap.codec.name == "lz4hc" and snap.sorted
+        assert list(snap.events(1500, 1600)) == _dicts(records[500:600])
+        assert list(snap.events()) == _dicts(records)
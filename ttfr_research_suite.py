@@ -102,13 +102,42 @@ def test_ingest():
     print(json.dumps(results, indent=4))
 
 
+def test_ingest_batch(chunk_kb=64):
+    print("\n### BATCH INGEST THROUGHPUT ANALYSIS ###")
+    engine = get_engine()
+
+    message = b"cpu=3% net=14kb msg=heartbeat"
+    size = len(message)
+
+    # One contiguous chunk per call, as read from a socket or pipe
+    per_chunk = (chunk_kb * 1024) // size
+    chunk = message * per_chunk
+    offsets = list(range(0, len(chunk) + 1, size))
+
+    total = 0
+    t0 = time.time()
+    while total < 1_000_000:
+        total += engine.ingest_many(chunk, offsets)
+    dt = time.time() - t0
+
+    results = {
+        "events": total,
+        "chunk_kb": chunk_kb,
+        "seconds": round(dt, 4),
+        "events_per_sec": int(total / dt),
+        "mb_sec": round((total * size) / (1024*1024) / dt, 2)
+    }
+
+    print(json.dumps(results, indent=4))
+
+
 # -----------------------------------------------------------
 # 3 — Snapshot Correctness / MITRE Replay
 # -----------------------------------------------------------
 def test_snapshot_correctness():
     print("\n### SNAPSHOT + MITRE T1059 REPLAY ###")
     engine = get_engine()
-    engine.events.clear()
+    engine.clear()
 
     # Create 200 simulated MITRE attack logs
     for _ in range(200):
@@ -134,7 +163,7 @@ def test_adversarial():
     print("\n### ADVERSARIAL INPUT SAFETY ###")
 
     engine = get_engine()
-    engine.events.clear()
+    engine.clear()
 
     malformed_inputs = [
         b"",
@@ -191,6 +220,7 @@ if __name__ == "__main__":
 
     test_compression()
     test_ingest()
+    test_ingest_batch()
 
     print("\n### MITRE Test ###")
     print(json.dumps(test_snapshot_correctness(), indent=4))